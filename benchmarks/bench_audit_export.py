@@ -0,0 +1,103 @@
+"""
+Export de auditoria: pico de memória e vazão, carregando tudo x streaming (yield_per).
+
+Semeia submission_events e mede, para intervalos de tamanhos crescentes (1/10, 1/2 e todo o
+período), o pico de memória Python (tracemalloc) e o tempo para produzir o NDJSON:
+  - all:    SELECT + .all() e o corpo montado em memória (o SQL ad-hoc de hoje);
+  - stream: o gerador de `api/routers/get/audit_export.py` (cursor no servidor + blocos de 64 KiB).
+Os tempos saem inflados pelo tracemalloc; servem só para comparar os dois modos entre si.
+
+Uso (a partir da raiz do projeto):
+    python -m benchmarks.bench_audit_export
+    python -m benchmarks.bench_audit_export --rows 200000
+"""
+from __future__ import annotations
+import argparse
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta
+
+if "DATABASE_URL" not in os.environ:
+    os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/bench_audit_export.db"
+
+from br.com.certacon.certabot.api.routers.get.audit_export import _stream
+from br.com.certacon.certabot.db import crud
+from br.com.certacon.certabot.db.base import Base
+from br.com.certacon.certabot.db.session import SessionLocal, engine
+
+DAYS = 100
+
+
+def seed(rows: int, batch: int = 100_000) -> None:
+    start = datetime(2025, 1, 1)
+    meta = json.dumps({"from": "QUEUED", "to": "SPLIT_DONE", "counts": {"55": 1234, "65": 56}})
+    raw = engine.raw_connection()
+    try:
+        cur = raw.cursor()
+        cur.execute("INSERT INTO users (username, full_name, role, password_hash) VALUES ('robo', 'Robô', 'operador', 'x')")
+        cur.execute("INSERT INTO service_submissions (job_id, user_id, service_type, base_path, status) VALUES ('job', 1, 'NFE', '/tmp/bench', 'SPLIT_DONE')")
+        done = 0
+        while done < rows:
+            n = min(batch, rows - done)
+            cur.executemany(
+                "INSERT INTO submission_events (submission_id, job_id, user_id, service_type, event_type, message, meta, created_at) VALUES (1, 'job', 1, 'NFE', 'STATUS_CHANGED', 'QUEUED -> SPLIT_DONE', ?, ?)",
+                [(meta, (start + timedelta(seconds=i * DAYS * 86400 // rows)).strftime("%Y-%m-%d %H:%M:%S")) for i in range(done, done + n)],
+            )
+            done += n
+        raw.commit()
+    finally:
+        raw.close()
+
+
+def load_all(filters: dict) -> int:
+    db = SessionLocal()
+    try:
+        cols = crud.AUDIT_EXPORTS["events"]
+        rows = list(crud.iter_audit_rows(db, "events", **filters))
+        body = "".join(
+            json.dumps(dict(zip(cols, [v.isoformat() if isinstance(v, datetime) else v for v in r])), ensure_ascii=False) + "\n"
+            for r in rows
+        ).encode()
+        return len(body)
+    finally:
+        db.close()
+
+
+def stream(filters: dict) -> int:
+    return sum(len(chunk) for chunk in _stream("events", "ndjson", filters))
+
+
+def measure(fn, filters: dict) -> tuple[float, float, int]:
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    n = fn(filters)
+    dt = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return dt, peak / 2**20, n
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=1_000_000)
+    args = ap.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    t0 = time.perf_counter()
+    seed(args.rows)
+    print(f"{args.rows} eventos semeados em {time.perf_counter() - t0:.1f}s ({os.environ['DATABASE_URL']})")
+
+    print(f"{'intervalo':<10} {'modo':<7} {'linhas':>9} {'MB saída':>9} {'pico MB':>9} {'tempo':>8}")
+    first = date(2025, 1, 1)
+    for days in (DAYS // 10, DAYS // 2, DAYS):
+        filters = {"since": first, "until": first + timedelta(days=days - 1)}
+        for name, fn in (("all", load_all), ("stream", stream)):
+            dt, peak, n = measure(fn, filters)
+            print(f"{days:>4} dias  {name:<7} {args.rows * days // DAYS:>9} {n / 2**20:>9.1f} {peak:>9.1f} {dt:>7.1f}s")
+
+
+if __name__ == "__main__":
+    main()
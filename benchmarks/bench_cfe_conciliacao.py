@@ -0,0 +1,85 @@
+"""
+Conciliação do CFE (`utils/planilha_cfe.py`): custo de conciliar a planilha_csv com as chaves
+do TXT dentro do split, com o índice em memória e com o índice em disco (sort/merge), contra
+o split sem planilha. Cada variante roda num processo separado para medir o pico de memória.
+
+Uso (a partir da raiz do projeto):
+    python -m benchmarks.bench_cfe_conciliacao                  # 2M chaves no TXT e 2M linhas na planilha
+    python -m benchmarks.bench_cfe_conciliacao --keys 500000
+"""
+from __future__ import annotations
+import argparse
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+
+def _dv(k43: str) -> str:
+    s, w = 0, 2
+    for ch in reversed(k43):
+        s += int(ch) * w
+        w = 2 if w == 9 else w + 1
+    r = s % 11
+    return "0" if r < 2 else str(11 - r)
+
+
+def _chave(rnd: random.Random) -> str:
+    # cUF AAMM CNPJ mod=59 nº série SAT + nº CF-e + cNF
+    k = f"35{rnd.randint(2401, 2412)}{rnd.randrange(10**14):014d}59{rnd.randrange(10**21):021d}"
+    return k + _dv(k)
+
+
+def _run(txt: str, csv: str, max_keys: int) -> None:
+    os.environ["SPLIT_CACHE"] = "false"
+    from br.com.certacon.certabot.utils.separar_modelos_nfe import processar_arquivo_txt_sem_enviar
+    t0 = time.perf_counter()
+    r = processar_arquivo_txt_sem_enviar(Path(txt), Path(tempfile.mkdtemp()), dedup_max_keys=max_keys,
+                                         particionar=False, comprimir=False, path_csv=Path(csv) if csv != "-" else None)
+    dt = time.perf_counter() - t0
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss >> 10
+    c = r["conciliacao"]
+    if c is None:
+        print(f"{'sem planilha':<14} {dt:>8.2f}s {rss:>7} MB")
+        return
+    print(f"{'índice ' + c['indice']:<14} {dt:>8.2f}s {rss:>7} MB   casadas={c['casadas']['qtd_chaves']:,} "
+          f"txt_sem_csv={c['txt_sem_csv']['qtd_chaves']:,} csv_sem_txt={c['csv_sem_txt']['qtd_chaves']:,}")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--keys", type=int, default=2_000_000)
+    ap.add_argument("--run", nargs=3, help=argparse.SUPPRESS)
+    args = ap.parse_args()
+    if args.run:
+        _run(args.run[0], args.run[1], int(args.run[2]))
+        return
+
+    # metade das chaves do TXT está na planilha; a outra metade da planilha não veio no TXT
+    rnd = random.Random(42)
+    tmp = Path(tempfile.mkdtemp())
+    comuns = args.keys // 2
+    txt, csv = tmp / "chaves.txt", tmp / "planilha.csv"
+    with open(txt, "w") as ft, open(csv, "w", encoding="utf-8") as fc:
+        fc.write("Data;Valor;Chave de Acesso\n")
+        for i in range(args.keys):
+            k = _chave(rnd)
+            ft.write(k + "\n")
+            if i < comuns:
+                fc.write(f"2024-09-01;{rnd.randrange(10**5) / 100:.2f};CFe{k}\n")
+        for _ in range(args.keys - comuns):
+            fc.write(f"2024-09-01;1.00;CFe{_chave(rnd)}\n")
+
+    print(f"--- {args.keys:,} chaves no TXT, {args.keys:,} linhas na planilha ({csv.stat().st_size / 2**20:.0f} MB)")
+    print(f"{'variante':<14} {'tempo':>9} {'pico':>10}")
+    grande, pequeno = args.keys * 2, max(args.keys // 10, 1)
+    for path_csv, max_keys in (("-", grande), (str(csv), grande), (str(csv), pequeno)):
+        subprocess.run([sys.executable, "-m", "benchmarks.bench_cfe_conciliacao", "--run", str(txt), path_csv, str(max_keys)], check=True)
+
+
+if __name__ == "__main__":
+    main()
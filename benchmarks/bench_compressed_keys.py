@@ -0,0 +1,82 @@
+"""
+TXT de chaves puro x comprimido (.txt.gz, .txt.xz, .zip): bytes enviados/guardados, tempo da
+ingestão (grava + sha256 + contagem por modelo, descomprimindo em fluxo) e tempo do split
+lendo o arquivo comprimido (`utils/compressao.py`).
+
+Uso (a partir da raiz do projeto):
+    python -m benchmarks.bench_compressed_keys                 # 2M chaves (~90 MB de texto)
+    python -m benchmarks.bench_compressed_keys --keys 500000
+"""
+from __future__ import annotations
+import argparse
+import gzip
+import io
+import lzma
+import os
+import random
+import tempfile
+import time
+import zipfile
+from pathlib import Path
+
+
+def _dv(k43: str) -> str:
+    s, w = 0, 2
+    for ch in reversed(k43):
+        s += int(ch) * w
+        w = 2 if w == 9 else w + 1
+    r = s % 11
+    return "0" if r < 2 else str(11 - r)
+
+
+def _chaves(n: int, seed: int = 42):
+    # estrutura real: cUF AAMM CNPJ mod série nNF tpEmis cNF DV, com emitentes e numeração repetindo
+    # (lista de um cliente), o que é o que a compressão aproveita
+    rnd = random.Random(seed)
+    emitentes = [(rnd.choice(("35", "41", "31", "33")), f"{rnd.randrange(10**14):014d}") for _ in range(2000)]
+    for _ in range(n):
+        uf, cnpj = rnd.choice(emitentes)
+        k = f"{uf}24{rnd.randint(1, 12):02d}{cnpj}55001{rnd.randrange(10**6):09d}1{rnd.randrange(10**8):08d}"
+        yield (k + _dv(k)).encode()
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--keys", type=int, default=2_000_000)
+    args = ap.parse_args()
+
+    tmp = Path(tempfile.mkdtemp())
+    os.environ["UPLOAD_DIR"] = str(tmp / "uploads")
+    os.environ["SPLIT_CACHE"] = "false"
+    from fastapi import UploadFile
+    from br.com.certacon.certabot.utils.ingest import ingest_upload
+    from br.com.certacon.certabot.utils.separar_modelos_nfe import processar_arquivo_txt_sem_enviar
+
+    plain = b"\n".join(_chaves(args.keys)) + b"\n"
+    zb = io.BytesIO()
+    with zipfile.ZipFile(zb, "w", zipfile.ZIP_DEFLATED) as z:
+        z.writestr("chaves.txt", plain)
+    variantes = {
+        ".txt": plain,
+        ".txt.gz": gzip.compress(plain, compresslevel=6),
+        ".txt.xz": lzma.compress(plain, preset=6),
+        ".zip": zb.getvalue(),
+    }
+
+    print(f"--- {args.keys:,} chaves ({len(plain) / 2**20:.0f} MB de texto)")
+    print(f"{'formato':<9} {'bytes':>12} {'razão':>7} {'ingestão':>10} {'split':>8}")
+    for ext, data in variantes.items():
+        dst = tmp / f"in{ext}"
+        t0 = time.perf_counter()
+        res = ingest_upload(UploadFile(io.BytesIO(data), filename=dst.name), dst, count_models=True)
+        t_ingest = time.perf_counter() - t0
+        assert res.counts["55"] == args.keys
+        t0 = time.perf_counter()
+        out = processar_arquivo_txt_sem_enviar(dst, tmp / f"split{ext}", particionar=False, comprimir=False)
+        t_split = time.perf_counter() - t0
+        assert out["estatisticas"]["rejeitadas"] == 0
+        print(f"{ext:<9} {len(data):>12,} {len(plain) / len(data):>6.1f}x {t_ingest:>9.2f}s {t_split:>7.2f}s")
+
+
+if __name__ == "__main__":
+    main()
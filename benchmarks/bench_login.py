@@ -0,0 +1,82 @@
+"""
+Logins/segundo e impacto no threadpool das rotas, por nível de concorrência.
+
+Compara a verificação de senha (pbkdf2_sha256) de duas formas:
+  - legacy:   no threadpool do AnyIO (como a rota síncrona `def login` fazia);
+  - executor: no executor dedicado de `api/core/security.py` (PASSWORD_HASH_WORKERS threads).
+Durante a rajada, um "probe" mede quanto um `run_in_threadpool` qualquer (ex.: a gravação
+de um upload) espera por uma thread — é a fome que os robôs causavam nas rotas de upload.
+
+Uso (a partir da raiz do projeto):
+    python -m benchmarks.bench_login
+    python -m benchmarks.bench_login --concurrency 1 8 64 --logins 256
+    PASSWORD_PBKDF2_ROUNDS=100000 PASSWORD_HASH_WORKERS=4 python -m benchmarks.bench_login
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import time
+
+from starlette.concurrency import run_in_threadpool
+
+from br.com.certacon.certabot.api.core.config import settings
+from br.com.certacon.certabot.api.core.security import hash_password, pwd_context, verify_and_update_password
+
+
+def _pct(xs: list[float], p: float) -> float:
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(round(p / 100 * (len(xs) - 1))))] if xs else 0.0
+
+
+async def legacy(raw: str, hashed: str) -> None:
+    await run_in_threadpool(pwd_context.verify, raw, hashed)
+
+
+async def executor(raw: str, hashed: str) -> None:
+    await verify_and_update_password(raw, hashed)
+
+
+async def _run(fn, hashed: str, logins: int, concurrency: int) -> tuple[float, list[float]]:
+    sem = asyncio.Semaphore(concurrency)
+    probe: list[float] = []
+    done = asyncio.Event()
+
+    async def one():
+        async with sem:
+            await fn("senha-bench", hashed)
+
+    async def prober():
+        while not done.is_set():
+            t0 = time.perf_counter()
+            await run_in_threadpool(lambda: None)
+            probe.append(time.perf_counter() - t0)
+            await asyncio.sleep(0.005)
+
+    p = asyncio.create_task(prober())
+    t0 = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(logins)))
+    wall = time.perf_counter() - t0
+    done.set()
+    await p
+    return logins / wall, probe
+
+
+async def main_async(args) -> None:
+    hashed = hash_password("senha-bench")
+    print(f"pbkdf2_sha256 rounds={settings.PASSWORD_PBKDF2_ROUNDS}  hash workers={settings.PASSWORD_HASH_WORKERS}  logins={args.logins}")
+    print(f"{'modo':<9} {'conc':>5} {'logins/s':>9} {'threadpool p99':>15} {'max':>9}")
+    for conc in args.concurrency:
+        for nome, fn in (("legacy", legacy), ("executor", executor)):
+            rate, probe = await _run(fn, hashed, args.logins, conc)
+            print(f"{nome:<9} {conc:>5} {rate:>9.1f} {_pct(probe, 99)*1e3:>13.2f}ms {max(probe)*1e3:>7.2f}ms")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 64])
+    ap.add_argument("--logins", type=int, default=200)
+    asyncio.run(main_async(ap.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
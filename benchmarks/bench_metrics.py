@@ -0,0 +1,211 @@
+"""
+Métricas com N submissões semeadas (padrão 1M): nº de consultas e latência, antes/depois.
+
+Cenários (limit_last=200): global e NFE nos últimos 30 dias, global filtrado por status
+num intervalo since/until, e global sem filtro.
+  - antes:           implementação anterior (group-bys sobre service_submissions + lazy load
+                     de `user` na lista "last"), sem os índices compostos;
+  - antes + índices: a mesma implementação, já com os índices (isola o ganho dos índices);
+  - depois:          utils/metrics.py atual (rollup diário + índices + joinedload do usuário).
+A implementação anterior agrupava por CAST(created_at AS DATE), que no SQLite devolve só o
+ano; aqui ela usa date(created_at) no SQLite para conseguir rodar.
+
+Uso (a partir da raiz do projeto):
+    python -m benchmarks.bench_metrics
+    python -m benchmarks.bench_metrics --rows 200000 --repeat 5
+"""
+from __future__ import annotations
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+if "DATABASE_URL" not in os.environ:
+    os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/bench_metrics.db"
+
+from sqlalchemy import Date, cast, event, func, text
+
+from br.com.certacon.certabot.db import models, rollup
+from br.com.certacon.certabot.db.base import Base
+from br.com.certacon.certabot.db.session import SessionLocal, engine
+from br.com.certacon.certabot.utils.metrics import global_metrics, service_metrics
+
+SERVICES = ("NFE", "NFCE", "CTE", "CFE", "SENATRAN")
+STATUSES = ("SPLIT_DONE",) * 14 + ("READY", "REJECTED_MODEL_MISMATCH", "REJECTED_VALIDATION", "ERROR_SPLIT", "ERROR_SAVE", "QUEUED")
+
+
+# --- implementação anterior (para comparação) ---
+
+def _legacy_day():
+    S = models.ServiceSubmission
+    if engine.dialect.name == "sqlite":
+        return func.date(S.created_at).label("day")
+    return cast(S.created_at, Date).label("day")
+
+
+def _legacy_filters(since, until, days):
+    S = models.ServiceSubmission
+    where = []
+    if days and not since and not until:
+        where.append(S.created_at >= (datetime.utcnow() - timedelta(days=days)).date())
+    if since:
+        where.append(S.created_at >= since)
+    if until:
+        where.append(S.created_at < f"{until} 23:59:59.999")
+    return where
+
+
+def _legacy_last(qbase, limit_last):
+    S = models.ServiceSubmission
+    return [{"job_id": s.job_id, "status": s.status, "user": s.user.username if s.user else ""}
+            for s in qbase.order_by(S.created_at.desc()).limit(limit_last).all()]
+
+
+def legacy_global(db, *, since=None, until=None, days=None, status=None, limit_last=20):
+    S = models.ServiceSubmission
+    q = db.query(S)
+    for c in _legacy_filters(since, until, days):
+        q = q.filter(c)
+    if status:
+        q = q.filter(S.status == status)
+    q.with_entities(func.count(S.id)).scalar()
+    q.with_entities(S.service_type, func.count()).group_by(S.service_type).all()
+    q.with_entities(S.status, func.count()).group_by(S.status).all()
+    day = _legacy_day()
+    q.with_entities(day, S.service_type, func.count()).group_by(day, S.service_type).order_by(day, S.service_type).all()
+    return _legacy_last(q, limit_last)
+
+
+def legacy_service(db, service, *, since=None, until=None, days=None, status=None, limit_last=10):
+    S = models.ServiceSubmission
+    q = db.query(S).filter(S.service_type == service)
+    for c in _legacy_filters(since, until, days):
+        q = q.filter(c)
+    if status:
+        q = q.filter(S.status == status)
+    q.with_entities(func.count(S.id)).scalar()
+    q.with_entities(S.status, func.count()).group_by(S.status).all()
+    day = _legacy_day()
+    q.with_entities(day, func.count()).group_by(day).order_by(day).all()
+    return _legacy_last(q, limit_last)
+
+
+# --- carga ---
+
+def seed(rows: int, users: int = 20, batch: int = 100_000) -> None:
+    rnd = random.Random(7)
+    now = datetime.utcnow()
+    raw = engine.raw_connection()
+    try:
+        cur = raw.cursor()
+        cur.executemany(
+            "INSERT INTO users (username, full_name, role, password_hash) VALUES (?, ?, ?, ?)",
+            [(f"robo{i:02d}", f"Robô {i}", "operador", "x") for i in range(users)],
+        )
+        done = 0
+        while done < rows:
+            n = min(batch, rows - done)
+            data = []
+            for i in range(done, done + n):
+                ts = now - timedelta(seconds=rnd.randrange(365 * 86400))
+                data.append((f"job-{i}", rnd.randint(1, users), rnd.choice(SERVICES), "/tmp/bench",
+                             rnd.choice(STATUSES), ts.strftime("%Y-%m-%d %H:%M:%S")))
+            cur.executemany(
+                "INSERT INTO service_submissions (job_id, user_id, service_type, base_path, status, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                data,
+            )
+            done += n
+        raw.commit()
+    finally:
+        raw.close()
+
+
+class QueryCounter:
+    def __init__(self):
+        self.n = 0
+
+    def __call__(self, *args, **kwargs):
+        self.n += 1
+
+
+def measure(fn, repeat: int) -> tuple[int, float]:
+    counter = QueryCounter()
+    times = []
+    for _ in range(repeat):
+        db = SessionLocal()
+        counter.n = 0
+        event.listen(engine, "before_cursor_execute", counter)
+        try:
+            t0 = time.perf_counter()
+            fn(db)
+            times.append(time.perf_counter() - t0)
+        finally:
+            event.remove(engine, "before_cursor_execute", counter)
+            db.close()
+    return counter.n, statistics.median(times)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=1_000_000)
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        for ix in models.ServiceSubmission.__table__.indexes:
+            if ix.name != "ix_service_submissions_job_id":
+                ix.drop(bind=conn, checkfirst=True)
+    t0 = time.perf_counter()
+    seed(args.rows)
+    print(f"{args.rows} submissões semeadas em {time.perf_counter() - t0:.1f}s ({os.environ['DATABASE_URL']})")
+
+    today = datetime.utcnow().date()
+    since, until = (today - timedelta(days=90)).isoformat(), (today - timedelta(days=60)).isoformat()
+    scenarios = {
+        "global 30d":          (lambda db: legacy_global(db, days=30, limit_last=200),
+                                lambda db: global_metrics(db, since=None, until=None, days=30, status=None, limit_last=200)),
+        "NFE 30d":             (lambda db: legacy_service(db, "NFE", days=30, limit_last=200),
+                                lambda db: service_metrics(db, "NFE", since=None, until=None, days=30, status=None, limit_last=200)),
+        "global status+range": (lambda db: legacy_global(db, since=since, until=until, status="ERROR_SPLIT", limit_last=200),
+                                lambda db: global_metrics(db, since=since, until=until, days=None, status="ERROR_SPLIT", limit_last=200)),
+        "global sem filtro":   (lambda db: legacy_global(db, limit_last=200),
+                                lambda db: global_metrics(db, since=None, until=None, days=None, status=None, limit_last=200)),
+    }
+
+    results = {name: [] for name in scenarios}
+    for name, (old, _new) in scenarios.items():
+        results[name].append(measure(old, args.repeat))
+
+    t0 = time.perf_counter()
+    for ix in models.ServiceSubmission.__table__.indexes:
+        ix.create(bind=engine, checkfirst=True)
+    if engine.dialect.name == "sqlite":
+        with engine.begin() as conn:
+            conn.execute(text("ANALYZE"))
+    t_ix = time.perf_counter() - t0
+    for name, (old, _new) in scenarios.items():
+        results[name].append(measure(old, args.repeat))
+
+    t0 = time.perf_counter()
+    db = SessionLocal()
+    try:
+        rollup.rebuild(db)
+    finally:
+        db.close()
+    t_rb = time.perf_counter() - t0
+    for name, (_old, new) in scenarios.items():
+        results[name].append(measure(new, args.repeat))
+
+    print(f"índices criados em {t_ix:.1f}s; rollup reconstruído em {t_rb:.1f}s")
+    print(f"{'cenário':<21} {'antes':>18} {'antes + índices':>18} {'depois':>18}")
+    for name, cols in results.items():
+        cells = [f"{n:>4} q {t*1e3:>9.1f}ms" for n, t in cols]
+        print(f"{name:<21} " + " ".join(f"{c:>18}" for c in cells))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Micro-benchmark do extrator de modelo (posições 20:22 da chave de acesso).
+
+Compara, em linhas/segundo, a implementação anterior (filtro de dígitos com
+"".join sobre str, usada no model guard e no splitter) com o extrator em bytes
+de `utils/chave_modelo.py`.
+
+Uso (a partir da raiz do projeto):
+    python -m benchmarks.bench_model_extractor                 # 1M e 10M linhas
+    python -m benchmarks.bench_model_extractor --sizes 200000 --dirty 0.05
+"""
+from __future__ import annotations
+import argparse
+import random
+import time
+
+from br.com.certacon.certabot.utils.chave_modelo import extract_model
+
+_MODELS = ("55", "65", "57", "59")
+
+
+def legacy_guard(chave: str) -> str | None:
+    s = "".join(ch for ch in chave.strip() if ch.isdigit())
+    if len(s) < 22:
+        return None
+    m = s[20:22]
+    return m if m in _MODELS else None
+
+
+def legacy_splitter(linha: str) -> str | None:
+    chave = linha.strip()
+    if len(chave) > 22:
+        modelo = "".join(c for c in chave if c.isdigit())[20:22] if not chave[20:22].isdigit() else chave[20:22]
+        return modelo if modelo in _MODELS else None
+    return None
+
+
+def synthetic_lines(n: int, dirty_ratio: float, seed: int = 42) -> list[bytes]:
+    rnd = random.Random(seed)
+    out = []
+    for _ in range(n):
+        key = f"{rnd.randint(11, 53):02d}2409{rnd.randrange(10**14):014d}{rnd.choice(_MODELS)}{rnd.randrange(10**22):022d}"
+        if rnd.random() < dirty_ratio:
+            key = f" {key[:10]}-{key[10:30]} {key[30:]} "
+        out.append(key.encode() + b"\n")
+    return out
+
+
+def _rate(fn, lines) -> float:
+    t0 = time.perf_counter()
+    for ln in lines:
+        fn(ln)
+    return len(lines) / (time.perf_counter() - t0)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", type=int, nargs="+", default=[1_000_000, 10_000_000])
+    ap.add_argument("--dirty", type=float, default=0.02, help="fração de linhas com separadores/espaços")
+    args = ap.parse_args()
+
+    for n in args.sizes:
+        raw = synthetic_lines(n, args.dirty)
+        text = [ln.decode() for ln in raw]
+        print(f"--- {n:,} linhas ({args.dirty:.0%} sujas)")
+        results = {
+            "legado guard (str)": _rate(legacy_guard, text),
+            "legado splitter (str)": _rate(legacy_splitter, text),
+            "extract_model (bytes)": _rate(extract_model, raw),
+        }
+        base = results["legado guard (str)"]
+        for name, rate in results.items():
+            print(f"{name:<24} {rate:>14,.0f} linhas/s  ({rate / base:.1f}x)")
+        del raw, text
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Leitura da planilha SENATRAN (`utils/placas.py`): tempo e pico de memória para extrair,
+validar e deduplicar as placas de um .xlsx grande, com o dedup em memória e com o dedup
+em disco (sort/merge).
+
+Uso (a partir da raiz do projeto):
+    python -m benchmarks.bench_placas                  # 1M linhas
+    python -m benchmarks.bench_placas --rows 200000
+"""
+from __future__ import annotations
+import argparse
+import random
+import resource
+import string
+import subprocess
+import sys
+import tempfile
+import time
+import zipfile
+from pathlib import Path
+
+NS = 'xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"'
+NS_REL = 'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships"'
+
+
+def _placas(n: int, seed: int = 42):
+    # metade formato antigo, metade Mercosul; grafias variadas (hífen, minúsculas) e ~1% de lixo
+    rnd = random.Random(seed)
+    L = string.ascii_uppercase
+    for _ in range(n):
+        if rnd.random() < 0.01:
+            yield "SEM PLACA"
+            continue
+        meio = rnd.choice(L) if rnd.random() < 0.5 else str(rnd.randrange(10))
+        p = "".join(rnd.choices(L, k=3)) + str(rnd.randrange(10)) + meio + f"{rnd.randrange(100):02d}"
+        yield p.lower()[:3] + "-" + p[3:] if rnd.random() < 0.2 else p
+
+
+def _xlsx(path: Path, rows: int) -> None:
+    # workbook mínimo, com a aba escrita direto no zip (textos inline)
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as z:
+        z.writestr("[Content_Types].xml", "<Types/>")
+        z.writestr("xl/workbook.xml", f'<workbook {NS} {NS_REL}><sheets><sheet name="Placas" sheetId="1" r:id="rId1"/></sheets></workbook>')
+        z.writestr("xl/_rels/workbook.xml.rels", '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+                   '<Relationship Id="rId1" Target="worksheets/sheet1.xml"/></Relationships>')
+        with z.open("xl/worksheets/sheet1.xml", "w") as f:
+            f.write(f'<worksheet {NS}><sheetData><row r="1"><c r="A1" t="inlineStr"><is><t>Placa</t></is></c></row>'.encode())
+            for i, p in enumerate(_placas(rows), start=2):
+                f.write(f'<row r="{i}"><c r="A{i}" t="inlineStr"><is><t>{p}</t></is></c></row>'.encode())
+            f.write(b"</sheetData></worksheet>")
+
+
+def _run(xlsx: str, dedup_max: int) -> None:
+    # processo separado: o pico de memória (ru_maxrss) é só o da extração
+    from br.com.certacon.certabot.utils.placas import extrair_placas
+    t0 = time.perf_counter()
+    r = extrair_placas(Path(xlsx), Path(tempfile.mkdtemp()), max_linhas=10**9, dedup_max=dedup_max)
+    dt = time.perf_counter() - t0
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss >> 10
+    print(f"{r['dedup']:<8} {dt:>8.2f}s {r['linhas'] / dt:>10,.0f}/s {rss:>7} MB   "
+          f"válidas={r['validas']:,} mercosul={r['mercosul']:,} únicas={r['unicas']:,} inválidas={r['invalidas']:,}")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=1_000_000)
+    ap.add_argument("--run", nargs=2, help=argparse.SUPPRESS)
+    args = ap.parse_args()
+    if args.run:
+        _run(args.run[0], int(args.run[1]))
+        return
+
+    xlsx = Path(tempfile.mkdtemp()) / "placas.xlsx"
+    _xlsx(xlsx, args.rows)
+    print(f"--- {args.rows:,} linhas ({xlsx.stat().st_size / 2**20:.1f} MB de .xlsx)")
+    print(f"{'dedup':<8} {'tempo':>9} {'linhas':>12} {'pico':>10}")
+    for dedup_max in (args.rows * 2, max(args.rows // 10, 1)):
+        subprocess.run([sys.executable, "-m", "benchmarks.bench_placas", "--run", str(xlsx), str(dedup_max)], check=True)
+
+
+if __name__ == "__main__":
+    main()
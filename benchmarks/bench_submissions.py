@@ -0,0 +1,80 @@
+"""
+Listagem de submissões: latência por profundidade de página, OFFSET x keyset (cursor).
+
+Semeia N submissões (padrão 1M, mesma carga de bench_metrics) e mede, para páginas cada vez
+mais fundas, o SELECT equivalente com LIMIT/OFFSET e `crud.search_submissions` com o cursor
+(created_at, id) da página anterior — sem filtro e filtrado por serviço.
+
+Uso (a partir da raiz do projeto):
+    python -m benchmarks.bench_submissions
+    python -m benchmarks.bench_submissions --rows 200000 --limit 100
+"""
+from __future__ import annotations
+import argparse
+import os
+import statistics
+import time
+
+from benchmarks.bench_metrics import seed  # define DATABASE_URL temporário se não houver
+
+from sqlalchemy.orm import joinedload
+
+from br.com.certacon.certabot.db import crud, models
+from br.com.certacon.certabot.db.base import Base
+from br.com.certacon.certabot.db.session import SessionLocal, engine
+
+
+def offset_page(db, *, service, offset, limit):
+    S = models.ServiceSubmission
+    q = db.query(S).options(joinedload(S.user))
+    if service:
+        q = q.filter(S.service_type == service)
+    return q.order_by(S.created_at.desc(), S.id.desc()).offset(offset).limit(limit).all()
+
+
+def timed(fn, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return statistics.median(times) * 1e3
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=1_000_000)
+    ap.add_argument("--limit", type=int, default=50)
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    t0 = time.perf_counter()
+    seed(args.rows)
+    print(f"{args.rows} submissões semeadas em {time.perf_counter() - t0:.1f}s ({os.environ['DATABASE_URL']})")
+
+    print(f"{'filtro':<8} {'offset':>9} {'OFFSET':>11} {'keyset':>11}")
+    db = SessionLocal()
+    try:
+        for service in (None, "NFE"):
+            total = args.rows if service is None else db.query(models.ServiceSubmission).filter_by(service_type=service).count()
+            for depth in (0, 1_000, 10_000, 100_000, total // 2, total - args.limit):
+                if depth < 0 or depth > total - args.limit:
+                    continue
+                # cursor = última linha da página anterior (como o cliente recebe em next_cursor)
+                after = None
+                if depth:
+                    prev = offset_page(db, service=service, offset=depth - 1, limit=1)[0]
+                    after = (prev.created_at, prev.id)
+                t_off = timed(lambda: offset_page(db, service=service, offset=depth, limit=args.limit), args.repeat)
+                t_key = timed(lambda: crud.search_submissions(db, service_type=service, after=after, limit=args.limit), args.repeat)
+                a = [s.id for s in offset_page(db, service=service, offset=depth, limit=args.limit)]
+                b = [s.id for s in crud.search_submissions(db, service_type=service, after=after, limit=args.limit)]
+                assert a == b, "keyset e OFFSET divergem"
+                print(f"{service or '-':<8} {depth:>9} {t_off:>9.2f}ms {t_key:>9.2f}ms")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+Latência (p50/p99) de submits concorrentes: camada de banco síncrona vs async.
+
+Reproduz a sequência de escritas de auditoria de um submit (criação da submissão,
+eventos, movimentos de arquivo e trocas de status) com N submits, C por vez, no
+mesmo event loop:
+  - sync:  `Session` + `crud` chamados direto de uma coroutine (como as rotas faziam);
+  - async: `AsyncSession` + `crud_async` (aiosqlite / aioodbc), um commit por linha;
+  - uow:   `AsyncSession` + `AuditUnitOfWork` (um commit por etapa, como o pipeline atual).
+Em paralelo roda um "probe" (sleep de 1 ms em loop) que mede quanto o event loop
+fica travado — é o que as demais requisições sentem durante os commits.
+
+Uso (a partir da raiz do projeto):
+    python -m benchmarks.bench_submit_latency
+    python -m benchmarks.bench_submit_latency --submits 400 --concurrency 32
+    DATABASE_URL=mssql+pyodbc://... python -m benchmarks.bench_submit_latency
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+if "DATABASE_URL" not in os.environ:
+    os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/bench.db"
+
+from br.com.certacon.certabot.db import crud, crud_async
+from br.com.certacon.certabot.db.base import Base
+from br.com.certacon.certabot.db.session import SessionLocal, AsyncSessionLocal, engine, async_engine
+from br.com.certacon.certabot.utils.audit import AuditUnitOfWork, start_submission_async
+
+_EVENTS = ("SUBMISSION_CREATED", "MODEL_ENFORCED")
+_FILES = ("INPUT_TXT", "INPUT_PFX")
+_STATUS = ("FILES_SAVED", "QUEUED")
+
+
+def _pct(xs: list[float], p: float) -> float:
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(round(p / 100 * (len(xs) - 1))))]
+
+
+def _submission_kwargs(user_id: int, service: str) -> dict:
+    return dict(job_id=str(uuid.uuid4()), user_id=user_id, service_type=service, base_path="/tmp/bench",
+                chave_txt_path=None, pfx_path=None, csv_path=None, xlsx_path=None, gov_cpf=None)
+
+
+async def submit_sync(user_id: int) -> None:
+    db = SessionLocal()
+    try:
+        sub = crud.create_submission(db, **_submission_kwargs(user_id, "NFE"))
+        for ev in _EVENTS:
+            crud.create_submission_event(db, submission_id=sub.id, job_id=sub.job_id, user_id=user_id, service_type="NFE", event_type=ev, meta={"bench": True})
+        for role in _FILES:
+            crud.create_file_movement(db, submission_id=sub.id, job_id=sub.job_id, file_role=role, file_name=role, file_path=role, mime_type=None, size_bytes=1, sha256="0" * 64)
+        for st in _STATUS:
+            crud.update_submission_status(db, sub.id, st)
+    finally:
+        db.close()
+
+
+async def submit_async(user_id: int) -> None:
+    async with AsyncSessionLocal() as db:
+        sub = await crud_async.create_submission(db, **_submission_kwargs(user_id, "NFE"))
+        for ev in _EVENTS:
+            await crud_async.create_submission_event(db, submission_id=sub.id, job_id=sub.job_id, user_id=user_id, service_type="NFE", event_type=ev, meta={"bench": True})
+        for role in _FILES:
+            await crud_async.create_file_movement(db, submission_id=sub.id, job_id=sub.job_id, file_role=role, file_name=role, file_path=role, mime_type=None, size_bytes=1, sha256="0" * 64)
+        for st in _STATUS:
+            await crud_async.update_submission_status(db, sub.id, st)
+
+
+class _User:
+    def __init__(self, user_id: int):
+        self.id = user_id
+
+
+async def submit_uow(user_id: int) -> None:
+    async with AsyncSessionLocal() as db:
+        base = Path("/tmp/bench") / str(uuid.uuid4())
+        sub = await start_submission_async(db, user=_User(user_id), service="NFE", base_path=base)
+        uow = AuditUnitOfWork(sub)
+        for ev in _EVENTS[1:]:
+            uow.event(ev, meta={"bench": True})
+        for role in _FILES:
+            uow.file(file_role=role, path=base / role, size_bytes=1, sha256="0" * 64)
+        for st in _STATUS:
+            uow.status(st)
+        await uow.flush_async(db)
+
+
+async def _run(fn, user_id: int, submits: int, concurrency: int) -> tuple[list[float], list[float], float]:
+    sem = asyncio.Semaphore(concurrency)
+    lat: list[float] = []
+    probe: list[float] = []
+    done = asyncio.Event()
+
+    async def one():
+        # latência vista pelo cliente: todos chegam juntos (rajada) em t0,
+        # então entra a espera na fila (semáforo / loop travado)
+        async with sem:
+            await fn(user_id)
+        lat.append(time.perf_counter() - t0)
+
+    async def prober():
+        while not done.is_set():
+            t0 = time.perf_counter()
+            await asyncio.sleep(0.001)
+            probe.append(time.perf_counter() - t0 - 0.001)
+
+    p = asyncio.create_task(prober())
+    await asyncio.sleep(0)
+    t0 = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(submits)))
+    wall = time.perf_counter() - t0
+    done.set()
+    await p
+    return lat, probe, wall
+
+
+async def main_async(args) -> None:
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        user = crud.get_user_by_username(db, "bench") or crud.create_user(db, "bench", "bench", role="operador")
+        user_id = user.id
+    finally:
+        db.close()
+
+    print(f"DATABASE_URL={os.environ['DATABASE_URL']}  submits={args.submits}  concurrency={args.concurrency}")
+    print(f"{'modo':<6} {'submit p50':>11} {'submit p99':>11} {'loop p99':>10} {'loop max':>10} {'submits/s':>10}")
+    for nome, fn in (("sync", submit_sync), ("async", submit_async), ("uow", submit_uow)):
+        await fn(user_id)  # aquecimento (conexões / metadados)
+        lat, probe, wall = await _run(fn, user_id, args.submits, args.concurrency)
+        print(f"{nome:<6} {statistics.median(lat)*1e3:>9.1f}ms {_pct(lat, 99)*1e3:>9.1f}ms "
+              f"{_pct(probe, 99)*1e3:>8.1f}ms {max(probe)*1e3:>8.1f}ms {args.submits / wall:>10.1f}")
+    await async_engine.dispose()
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--submits", type=int, default=200)
+    ap.add_argument("--concurrency", type=int, default=16)
+    asyncio.run(main_async(ap.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
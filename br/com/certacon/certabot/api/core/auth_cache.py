@@ -0,0 +1,69 @@
+# br/com/certacon/certabot/api/core/auth_cache.py
+from __future__ import annotations
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+import time
+
+from jose import jwt
+from sqlalchemy import event, inspect
+
+from br.com.certacon.certabot.api.core.config import settings
+from br.com.certacon.certabot.db import models
+from br.com.certacon.certabot.utils.cache import TTLCache
+
+# Cache dos tokens já decodificados (token -> claims) e dos usuários resolvidos
+# (username -> snapshot), para as rotas protegidas não irem ao banco a cada request.
+# A invalidação é local ao processo: com vários workers, AUTH_CACHE_TTL_SECONDS limita
+# por quanto tempo um worker pode enxergar um papel/usuário antigo.
+
+
+@dataclass(frozen=True)
+class CachedUser:
+    """Snapshot do usuário autenticado (o que as rotas usam: id, username, role)."""
+    id: int
+    username: str
+    role: str
+    full_name: Optional[str] = None
+
+
+token_cache = TTLCache(settings.AUTH_CACHE_MAX_TOKENS, settings.AUTH_CACHE_TTL_SECONDS)
+user_cache = TTLCache(settings.AUTH_CACHE_MAX_USERS, settings.AUTH_CACHE_TTL_SECONDS)
+
+
+def decode_token(token: str) -> Dict[str, Any]:
+    """
+    jwt.decode com cache; nunca guarda o token além do `exp`. Levanta JWTError se inválido.
+    """
+    claims = token_cache.get(token)
+    if claims is None:
+        claims = jwt.decode(token, settings.JWT_SECRET, algorithms=[settings.JWT_ALG])
+        exp = claims.get("exp")
+        token_cache.set(token, claims, ttl=(exp - time.time()) if exp else None)
+    return claims
+
+
+def get_cached_user(username: str) -> Optional[CachedUser]:
+    return user_cache.get(username)
+
+
+def cache_user(user: models.User) -> CachedUser:
+    snap = CachedUser(id=user.id, username=user.username, role=user.role, full_name=user.full_name)
+    user_cache.set(snap.username, snap)
+    return snap
+
+
+def invalidate_user(username: str) -> None:
+    """
+    Remove o usuário do cache. Chamado automaticamente em update/delete via ORM;
+    chame à mão depois de UPDATE/DELETE em massa (query.update / SQL direto).
+    """
+    user_cache.pop(username)
+
+
+@event.listens_for(models.User, "after_update")
+@event.listens_for(models.User, "after_delete")
+def _on_user_changed(mapper, connection, target) -> None:
+    invalidate_user(target.username)
+    # troca de username: invalida também o nome antigo
+    for old in inspect(target).attrs.username.history.deleted or ():
+        invalidate_user(old)
@@ -1,4 +1,5 @@
 from pathlib import Path
+from typing import Dict
 from pydantic.v1 import BaseSettings
 
 
@@ -7,10 +8,54 @@ class Settings(BaseSettings):
     JWT_SECRET: str = "change-me-super-secret"
     JWT_ALG: str = "HS256"
     JWT_EXPIRE_MIN: int = 60
+    # hash de senha (pbkdf2_sha256): rounds atuais (hashes antigos são refeitos no login) e threads dedicadas
+    PASSWORD_PBKDF2_ROUNDS: int = 29_000
+    PASSWORD_HASH_WORKERS: int = 2
+    # cache de autenticação (tokens decodificados e usuários) — por processo
+    AUTH_CACHE_TTL_SECONDS: int = 60
+    AUTH_CACHE_MAX_USERS: int = 1024
+    AUTH_CACHE_MAX_TOKENS: int = 10_000
 
     DATABASE_URL: str = "sqlite:///./app.db"
+    # engine async das rotas `async def`; vazio = derivado do DATABASE_URL (sqlite+aiosqlite / mssql+aioodbc)
+    ASYNC_DATABASE_URL: str = ""
     UPLOAD_DIR: Path = Path("./uploads").resolve()
 
+    # split: acima deste nº de chaves distintas o dedup troca o set em memória por sort/merge em disco
+    SPLIT_DEDUP_MAX_KEYS: int = 2_000_000
+    # split particionado: modelo_XX/uf=UU/aamm=AAMM/part-NNNN.txt + manifest.json
+    SPLIT_PARTITION: bool = False
+    SPLIT_SHARD_SIZE: int = 50_000
+    # grava também modelo_XX.txt.gz (servido no download p/ quem envia Accept-Encoding: gzip)
+    SPLIT_GZIP: bool = False
+    # reaproveita o split de um TXT idêntico já processado (UPLOAD_DIR/_split_cache)
+    SPLIT_CACHE: bool = True
+
+    # admissão do TXT de chaves (lido em fluxo na ingestão): conteúdo descomprimido, linhas, tamanho de
+    # linha; fail-fast recusa quando as primeiras GUARD_SAMPLE_LINES linhas passam de GUARD_FOREIGN_RATIO
+    # de chaves de outro modelo. Por serviço: GUARD_LIMITS='{"CFE": {"max_lines": 1000000}}'
+    GUARD_MAX_BYTES: int = 2 * 1024**3
+    GUARD_MAX_LINES: int = 40_000_000
+    GUARD_MAX_LINE_LENGTH: int = 4096
+    GUARD_SAMPLE_LINES: int = 10_000
+    GUARD_FOREIGN_RATIO: float = 0.5
+    GUARD_LIMITS: Dict[str, Dict[str, float]] = {}
+
+    # jobs assíncronos: nº de processos do pool de split e idade p/ considerar RECEIVED abandonado
+    JOB_WORKERS: int = 2
+    JOB_STALE_MINUTES: int = 60
+    # submit em lote: máximo de arquivos por requisição e de submissões processadas ao mesmo tempo
+    BATCH_MAX_FILES: int = 500
+    BATCH_MAX_PARALLEL: int = 4
+    # upload retomável (/mvp/uploads): tamanho máximo do arquivo, de cada PUT e validade da sessão
+    UPLOAD_SESSION_MAX_BYTES: int = 4 * 1024**3
+    UPLOAD_CHUNK_MAX_BYTES: int = 64 * 1024**2
+    UPLOAD_SESSION_TTL_HOURS: int = 24
+
+    # cache das rotas de métricas (por processo): validade curta e nº máximo de combinações rota+filtros
+    METRICS_CACHE_TTL_SECONDS: int = 5
+    METRICS_CACHE_MAX_ENTRIES: int = 256
+
     class Config:
         env_file = ".env"
 
@@ -0,0 +1,63 @@
+# br/com/certacon/certabot/api/core/response_cache.py
+from __future__ import annotations
+from typing import Any, Callable, Hashable, Optional, Tuple, Type
+import hashlib
+
+from fastapi import Request, Response
+from pydantic import BaseModel
+
+from br.com.certacon.certabot.api.core.config import settings
+from br.com.certacon.certabot.utils.cache import SingleFlight, TTLCache
+
+# Cache de respostas JSON já serializadas (chave -> (corpo, ETag)) das rotas de métricas,
+# que os dashboards consultam a cada poucos segundos com os mesmos parâmetros.
+#   - requests idênticos e simultâneos compartilham um único cálculo (SingleFlight);
+#   - ETag = hash do corpo: If-None-Match igual -> 304 sem corpo, mesmo depois do TTL expirar
+#     se o resultado não mudou.
+# Local ao processo; METRICS_CACHE_TTL_SECONDS limita a defasagem (0 desliga o cache, o ETag continua).
+
+response_cache = TTLCache(settings.METRICS_CACHE_MAX_ENTRIES, settings.METRICS_CACHE_TTL_SECONDS)
+_flight = SingleFlight()
+
+Entry = Tuple[bytes, str]
+
+
+def _etag(body: bytes) -> str:
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    If-None-Match: lista separada por vírgula, aceita "*" e ETags fracos (W/"...").
+    """
+    if not if_none_match:
+        return False
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*" or tag.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+def _compute(key: Hashable, compute: Callable[[], Any], model: Type[BaseModel]) -> Entry:
+    # quem esperou na fila pode chegar depois do líder anterior já ter gravado
+    entry = response_cache.get(key)
+    if entry is None:
+        body = model.model_validate(compute()).model_dump_json().encode()
+        entry = (body, _etag(body))
+        response_cache.set(key, entry)
+    return entry
+
+
+def cached_json(request: Request, key: Hashable, compute: Callable[[], Any], model: Type[BaseModel]) -> Response:
+    """
+    Resposta JSON de `compute()` (validada por `model`) com cache, single-flight e ETag.
+    """
+    entry = response_cache.get(key)
+    if entry is None:
+        entry = _flight.do(key, lambda: _compute(key, compute, model))
+    body, etag = entry
+    headers = {"ETag": etag, "Cache-Control": f"private, max-age={settings.METRICS_CACHE_TTL_SECONDS}"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
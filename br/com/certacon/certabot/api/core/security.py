@@ -1,9 +1,25 @@
 from jose import jwt
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+from typing import Optional, Tuple
+import asyncio
 from passlib.context import CryptContext
 from br.com.certacon.certabot.api.core.config import settings
 
-pwd_context = CryptContext(schemes=["pbkdf2_sha256"], deprecated="auto")
+# min == max == default: qualquer hash com outro nº de rounds (maior ou menor) "precisa de update",
+# e é refeito no próximo login bem-sucedido (verify_and_update).
+_ROUNDS = settings.PASSWORD_PBKDF2_ROUNDS
+pwd_context = CryptContext(
+    schemes=["pbkdf2_sha256"],
+    deprecated="auto",
+    pbkdf2_sha256__default_rounds=_ROUNDS,
+    pbkdf2_sha256__min_rounds=_ROUNDS,
+    pbkdf2_sha256__max_rounds=_ROUNDS,
+)
+
+# executor dedicado e limitado: rajadas de login não ocupam o threadpool das rotas de upload
+# (o pbkdf2 do hashlib solta o GIL, então os workers rodam em paralelo de verdade)
+_hash_executor = ThreadPoolExecutor(max_workers=settings.PASSWORD_HASH_WORKERS, thread_name_prefix="pwd-hash")
 
 def hash_password(raw: str) -> str:
     return pwd_context.hash(raw)
@@ -11,6 +27,16 @@ def hash_password(raw: str) -> str:
 def verify_password(raw: str, hashed: str) -> bool:
     return pwd_context.verify(raw, hashed)
 
+async def hash_password_async(raw: str) -> str:
+    return await asyncio.get_running_loop().run_in_executor(_hash_executor, pwd_context.hash, raw)
+
+async def verify_and_update_password(raw: str, hashed: str) -> Tuple[bool, Optional[str]]:
+    """
+    Confere a senha no executor de hash. Retorna (ok, novo_hash); `novo_hash` vem preenchido
+    quando o hash salvo usa parâmetros diferentes dos atuais e deve ser regravado.
+    """
+    return await asyncio.get_running_loop().run_in_executor(_hash_executor, pwd_context.verify_and_update, raw, hashed)
+
 def create_access_token(sub: str, role: str) -> str:
     expire = datetime.utcnow() + timedelta(minutes=settings.JWT_EXPIRE_MIN)
     payload = {"sub": sub, "role": role, "exp": int(expire.timestamp())}
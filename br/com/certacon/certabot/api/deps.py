@@ -1,11 +1,10 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer
-from jose import jwt, JWTError
-from sqlalchemy.orm import Session
+from jose import JWTError
 
-from br.com.certacon.certabot.api.core.config import settings
-from br.com.certacon.certabot.db import models
-from br.com.certacon.certabot.db.session import SessionLocal
+from br.com.certacon.certabot.api.core.auth_cache import CachedUser, cache_user, decode_token, get_cached_user
+from br.com.certacon.certabot.db import crud_async
+from br.com.certacon.certabot.db.session import SessionLocal, AsyncSessionLocal
 
 security = HTTPBearer()
 
@@ -16,27 +15,38 @@ def get_db():
     finally:
         db.close()
 
-async def get_current_user(token: any = Depends(security), db: Session = Depends(get_db)):
+async def get_async_db():
+    # sessão async: para rotas `async def` (não bloqueia o event loop nos commits)
+    async with AsyncSessionLocal() as db:
+        yield db
+
+async def get_current_user(token: any = Depends(security)) -> CachedUser:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Não autorizado",
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(token.credentials, settings.JWT_SECRET, algorithms=[settings.JWT_ALG])
+        payload = decode_token(token.credentials)
         username: str = payload.get("sub")
         if not username:
             raise credentials_exception
     except JWTError:
         raise credentials_exception
 
-    user = db.query(models.User).filter(models.User.username == username).first()
-    if not user:
-        raise credentials_exception
+    user = get_cached_user(username)
+    if user is None:
+        # miss: uma sessão só para o lookup (no hit nem se abre conexão)
+        async with AsyncSessionLocal() as db:
+            row = await crud_async.get_user_by_username(db, username)
+        if not row:
+            raise credentials_exception
+        user = cache_user(row)
     return user
 
 def require_roles(*allowed: str):
-    async def checker(user: models.User = Depends(get_current_user)):
+    # autoriza pelo papel do usuário em cache, sem tocar no banco
+    async def checker(user: CachedUser = Depends(get_current_user)):
         if user.role not in allowed:
             raise HTTPException(status_code=403, detail="Acesso negado para sua função")
         return user
@@ -2,9 +2,9 @@
 from fastapi import APIRouter, Depends, HTTPException, Request
 from fastapi.security import OAuth2PasswordRequestForm
 from pydantic import BaseModel
-from sqlalchemy.orm import Session
-from br.com.certacon.certabot.api.deps import get_db
-from br.com.certacon.certabot.db import crud
+from sqlalchemy.ext.asyncio import AsyncSession
+from br.com.certacon.certabot.api.deps import get_async_db
+from br.com.certacon.certabot.db import crud_async
 from br.com.certacon.certabot.db.schemas.auth import TokenOut
 from br.com.certacon.certabot.api.core.security import create_access_token
 from br.com.certacon.certabot.db.schemas.common import ErrorResponse
@@ -36,19 +36,19 @@ router = APIRouter(prefix="/auth", tags=["auth"])
         400: {"model": ErrorResponse, "description": "Credenciais inválidas"},
     },
 )
-def login(
+async def login(
     request: Request,
     form_data: UserData,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    user = crud.get_user_by_username(db, form_data.username)
-    if not user or not crud.verify_user_password(user, form_data.password):
+    user = await crud_async.get_user_by_username(db, form_data.username)
+    if not user or not await crud_async.verify_user_password(db, user, form_data.password):
         if user:
-            crud.create_login_log(db, user_id=user.id, ip=request.client.host if request.client else None,
+            await crud_async.create_login_log(db, user_id=user.id, ip=request.client.host if request.client else None,
                                   user_agent=request.headers.get("User-Agent",""), success=False)
         raise HTTPException(status_code=400, detail="Usuário ou senha inválidos")
 
-    crud.create_login_log(db, user_id=user.id, ip=request.client.host if request.client else None,
+    await crud_async.create_login_log(db, user_id=user.id, ip=request.client.host if request.client else None,
                           user_agent=request.headers.get("User-Agent",""), success=True)
 
     token = create_access_token(sub=user.username, role=user.role)
@@ -0,0 +1,94 @@
+from datetime import date, datetime
+from typing import Iterator, Literal, Optional
+import csv
+import io
+import json
+
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
+
+from br.com.certacon.certabot.api.deps import require_roles
+from br.com.certacon.certabot.db import crud
+from br.com.certacon.certabot.db.schemas.mvp import ServiceType
+from br.com.certacon.certabot.db.session import SessionLocal
+
+router = APIRouter(tags=["audit"])
+
+Format = Literal["ndjson", "csv"]
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv; charset=utf-8"}
+CHUNK_BYTES = 64 * 1024
+
+def _value(v):
+    return v.isoformat() if isinstance(v, datetime) else v
+
+def _stream(kind: str, fmt: str, filters: dict) -> Iterator[bytes]:
+    # sessão própria: as dependências com yield já foram encerradas quando o corpo começa a ser enviado
+    cols = crud.AUDIT_EXPORTS[kind]
+    buf = io.StringIO()
+    writer = csv.writer(buf) if fmt == "csv" else None
+    if writer:
+        writer.writerow(cols)
+    db = SessionLocal()
+    try:
+        for row in crud.iter_audit_rows(db, kind, **filters):
+            values = [_value(v) for v in row]
+            if "meta" in cols:
+                i = cols.index("meta")
+                values[i] = crud.load_meta(values[i])
+            if writer:
+                if "meta" in cols and values[i] is not None:
+                    values[i] = json.dumps(values[i], ensure_ascii=False)
+                writer.writerow(values)
+            else:
+                buf.write(json.dumps(dict(zip(cols, values)), ensure_ascii=False))
+                buf.write("\n")
+            # envia em blocos de ~64 KiB (uma escrita por linha custaria caro no socket)
+            if buf.tell() >= CHUNK_BYTES:
+                yield buf.getvalue().encode()
+                buf.seek(0)
+                buf.truncate()
+        if buf.tell():
+            yield buf.getvalue().encode()
+    finally:
+        db.close()
+
+def _response(kind: str, fmt: str, since: Optional[date], until: Optional[date], **filters) -> StreamingResponse:
+    period = f"_{since or ''}_{until or ''}" if since or until else ""
+    filename = f"{kind}{period}.{fmt}"
+    return StreamingResponse(
+        _stream(kind, fmt, dict(filters, since=since, until=until)),
+        media_type=MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+@router.get("/events", summary="Exporta submission_events (NDJSON/CSV, streaming)")
+def export_events(
+    format: Format = Query("ndjson"),
+    since: Optional[date] = Query(None, description="YYYY-MM-DD"),
+    until: Optional[date] = Query(None, description="YYYY-MM-DD (inclusive)"),
+    service_type: Optional[ServiceType] = Query(None),
+    event_type: Optional[str] = Query(None, description="Ex.: STATUS_CHANGED, SPLIT_DONE, ERROR"),
+    _=Depends(require_roles("admin")),
+):
+    return _response("events", format, since, until, service_type=service_type, event_type=event_type)
+
+@router.get("/files", summary="Exporta file_movements (NDJSON/CSV, streaming)")
+def export_files(
+    format: Format = Query("ndjson"),
+    since: Optional[date] = Query(None, description="YYYY-MM-DD"),
+    until: Optional[date] = Query(None, description="YYYY-MM-DD (inclusive)"),
+    service_type: Optional[ServiceType] = Query(None),
+    file_role: Optional[str] = Query(None, description="Ex.: INPUT_TXT, INPUT_PFX, SPLIT_55"),
+    _=Depends(require_roles("admin")),
+):
+    return _response("files", format, since, until, service_type=service_type, file_role=file_role)
+
+@router.get("/logins", summary="Exporta login_logs (NDJSON/CSV, streaming)")
+def export_logins(
+    format: Format = Query("ndjson"),
+    since: Optional[date] = Query(None, description="YYYY-MM-DD"),
+    until: Optional[date] = Query(None, description="YYYY-MM-DD (inclusive)"),
+    user: Optional[str] = Query(None, description="Username"),
+    _=Depends(require_roles("admin")),
+):
+    return _response("logins", format, since, until, username=user)
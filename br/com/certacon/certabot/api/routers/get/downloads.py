@@ -0,0 +1,86 @@
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from typing import Literal
+import os
+
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.responses import FileResponse
+from sqlalchemy.orm import Session
+
+from br.com.certacon.certabot.api.core.response_cache import etag_matches
+from br.com.certacon.certabot.api.deps import get_db, require_roles
+from br.com.certacon.certabot.db import crud
+from br.com.certacon.certabot.db.schemas.common import ErrorResponse
+
+router = APIRouter(tags=["downloads"])
+
+Modelo = Literal["modelo_55", "modelo_65", "modelo_57", "modelo_59"]
+
+def _accepts_gzip(request: Request) -> bool:
+    for enc in request.headers.get("accept-encoding", "").split(","):
+        name, _, params = enc.partition(";")
+        if name.strip().lower() != "gzip":
+            continue
+        q = params.strip().removeprefix("q=")
+        try:
+            return not q or float(q) > 0
+        except ValueError:
+            return False
+    return False
+
+def _not_modified(request: Request, headers) -> bool:
+    # If-None-Match tem precedência; If-Modified-Since só vale sem ele (RFC 9110 13.2.2)
+    inm = request.headers.get("if-none-match")
+    if inm is not None:
+        return etag_matches(inm, headers["etag"])
+    ims = request.headers.get("if-modified-since")
+    if ims:
+        try:
+            return parsedate_to_datetime(headers["last-modified"]) <= parsedate_to_datetime(ims)
+        except (TypeError, ValueError):
+            return False
+    return False
+
+@router.api_route(
+    "/download/{modelo}/{job_id}",
+    methods=["GET", "HEAD"],
+    response_class=FileResponse,
+    responses={200: {"content": {"text/plain": {}}}, 206: {"description": "Parte do arquivo (Range)"},
+               304: {"description": "Não modificado"}, 404: {"model": ErrorResponse}},
+    summary="Baixa o TXT de um modelo gerado pelo split (Range, ETag, gzip opcional)",
+)
+def download_split(
+    modelo: Modelo,
+    job_id: str,
+    request: Request,
+    db: Session = Depends(get_db),
+    user=Depends(require_roles("admin", "operador")),
+):
+    sub = crud.get_submission_by_job_id(db, job_id)
+    if sub is None or (user.role != "admin" and sub.user_id != user.id):
+        raise HTTPException(status_code=404, detail="Job não encontrado")
+    db.close()  # o envio pode demorar: não segura a conexão
+
+    path = Path(sub.base_path) / "split" / job_id / modelo / f"{modelo}.txt"
+    encoding = None
+    # variante .gz (SPLIT_GZIP) só no download inteiro: com Range os clientes que descomprimem sozinhos
+    # (requests/httpx) quebram num pedaço de gzip, então a retomada usa sempre o TXT original
+    gz = path.with_name(path.name + ".gz")
+    if "range" not in request.headers and _accepts_gzip(request) and gz.is_file():
+        path, encoding = gz, "gzip"
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Arquivo não encontrado")
+
+    # FileResponse: Range/If-Range, ETag/Last-Modified, e envio zero-copy quando o servidor ASGI
+    # oferece a extensão http.response.pathsend (senão lê em blocos, sem carregar o arquivo)
+    resp = FileResponse(path, media_type="text/plain", filename=f"{modelo}_{job_id}.txt", stat_result=st)
+    resp.headers["Cache-Control"] = "private, no-cache"
+    resp.headers["Vary"] = "Accept-Encoding"
+    if encoding:
+        resp.headers["Content-Encoding"] = encoding
+    if _not_modified(request, resp.headers):
+        headers = {k: resp.headers[k] for k in ("etag", "last-modified", "cache-control", "vary")}
+        return Response(status_code=304, headers=headers)
+    return resp
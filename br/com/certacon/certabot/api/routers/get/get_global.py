@@ -1,41 +1,63 @@
-from fastapi import APIRouter, Depends, Query
+from datetime import date
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy.orm import Session
 from typing import Optional
 from br.com.certacon.certabot.api.deps import get_db, require_roles
+from br.com.certacon.certabot.api.core.response_cache import cached_json
 from br.com.certacon.certabot.db.schemas.metrics import GlobalMetricsOut, ServiceMetricsOut
 from br.com.certacon.certabot.utils.metrics import service_metrics, global_metrics
 
 router = APIRouter(tags=["metrics"])
 
+# respostas com ETag: If-None-Match igual devolve 304 (ver api/core/response_cache.py)
+NOT_MODIFIED = {304: {"description": "Não modificado (If-None-Match igual ao ETag atual)"}}
+
 def qparams(
-    since: Optional[str] = Query(None, description="YYYY-MM-DD"),
-    until: Optional[str] = Query(None, description="YYYY-MM-DD"),
+    since: Optional[str] = Query(None, pattern=r"^\d{4}-\d{2}-\d{2}$", description="YYYY-MM-DD"),
+    until: Optional[str] = Query(None, pattern=r"^\d{4}-\d{2}-\d{2}$", description="YYYY-MM-DD (inclusive)"),
     days: Optional[int] = Query(None, ge=1, le=365, description="Últimos N dias (ignora since/until)"),
     status: Optional[str] = Query(None, description="Filtrar por status"),
     limit_last: int = Query(10, ge=0, le=200, description="Qtde de últimos registros a retornar"),
 ):
+    # a regex só confere o formato: 2024-13-45 passa por ela
+    for nome, valor in (("since", since), ("until", until)):
+        if valor:
+            try:
+                date.fromisoformat(valor)
+            except ValueError:
+                raise HTTPException(422, detail=f"{nome}: data inválida '{valor}'")
     return dict(since=since, until=until, days=days, status=status, limit_last=limit_last)
 
-@router.get("/mvp/metrics", response_model=GlobalMetricsOut, summary="Métricas gerais (todos os serviços)")
-def get_metrics_global(params: dict = Depends(qparams), db: Session = Depends(get_db), _=Depends(require_roles("admin","operador"))):
-    return global_metrics(db, **params)
+def _key(scope: str, params: dict) -> tuple:
+    # filtros equivalentes -> mesma chave: `days` só vale sem since/until; status vazio = sem filtro
+    p = dict(params, status=params["status"] or None)
+    if p["since"] or p["until"]:
+        p["days"] = None
+    return (scope, tuple(sorted(p.items())))
+
+def _service(request: Request, service: str, params: dict, db: Session):
+    return cached_json(request, _key(service, params), lambda: service_metrics(db, service, **params), ServiceMetricsOut)
+
+@router.get("/mvp/metrics", response_model=GlobalMetricsOut, responses=NOT_MODIFIED, summary="Métricas gerais (todos os serviços)")
+def get_metrics_global(request: Request, params: dict = Depends(qparams), db: Session = Depends(get_db), _=Depends(require_roles("admin","operador"))):
+    return cached_json(request, _key("GLOBAL", params), lambda: global_metrics(db, **params), GlobalMetricsOut)
 
-@router.get("/mvp/nfe/metrics", response_model=ServiceMetricsOut, summary="Métricas NFE")
-def get_metrics_nfe(params: dict = Depends(qparams), db: Session = Depends(get_db), _=Depends(require_roles("admin","operador"))):
-    return service_metrics(db, "NFE", **params)
+@router.get("/mvp/nfe/metrics", response_model=ServiceMetricsOut, responses=NOT_MODIFIED, summary="Métricas NFE")
+def get_metrics_nfe(request: Request, params: dict = Depends(qparams), db: Session = Depends(get_db), _=Depends(require_roles("admin","operador"))):
+    return _service(request, "NFE", params, db)
 
-@router.get("/mvp/nfce/metrics", response_model=ServiceMetricsOut, summary="Métricas NFCE")
-def get_metrics_nfce(params: dict = Depends(qparams), db: Session = Depends(get_db), _=Depends(require_roles("admin","operador"))):
-    return service_metrics(db, "NFCE", **params)
+@router.get("/mvp/nfce/metrics", response_model=ServiceMetricsOut, responses=NOT_MODIFIED, summary="Métricas NFCE")
+def get_metrics_nfce(request: Request, params: dict = Depends(qparams), db: Session = Depends(get_db), _=Depends(require_roles("admin","operador"))):
+    return _service(request, "NFCE", params, db)
 
-@router.get("/mvp/cte/metrics", response_model=ServiceMetricsOut, summary="Métricas CTE")
-def get_metrics_cte(params: dict = Depends(qparams), db: Session = Depends(get_db), _=Depends(require_roles("admin","operador"))):
-    return service_metrics(db, "CTE", **params)
+@router.get("/mvp/cte/metrics", response_model=ServiceMetricsOut, responses=NOT_MODIFIED, summary="Métricas CTE")
+def get_metrics_cte(request: Request, params: dict = Depends(qparams), db: Session = Depends(get_db), _=Depends(require_roles("admin","operador"))):
+    return _service(request, "CTE", params, db)
 
-@router.get("/mvp/cfe/metrics", response_model=ServiceMetricsOut, summary="Métricas CFE")
-def get_metrics_cfe(params: dict = Depends(qparams), db: Session = Depends(get_db), _=Depends(require_roles("admin","operador"))):
-    return service_metrics(db, "CFE", **params)
+@router.get("/mvp/cfe/metrics", response_model=ServiceMetricsOut, responses=NOT_MODIFIED, summary="Métricas CFE")
+def get_metrics_cfe(request: Request, params: dict = Depends(qparams), db: Session = Depends(get_db), _=Depends(require_roles("admin","operador"))):
+    return _service(request, "CFE", params, db)
 
-@router.get("/mvp/senatran/metrics", response_model=ServiceMetricsOut, summary="Métricas SENATRAN")
-def get_metrics_senatran(params: dict = Depends(qparams), db: Session = Depends(get_db), _=Depends(require_roles("admin","operador"))):
-    return service_metrics(db, "SENATRAN", **params)
+@router.get("/mvp/senatran/metrics", response_model=ServiceMetricsOut, responses=NOT_MODIFIED, summary="Métricas SENATRAN")
+def get_metrics_senatran(request: Request, params: dict = Depends(qparams), db: Session = Depends(get_db), _=Depends(require_roles("admin","operador"))):
+    return _service(request, "SENATRAN", params, db)
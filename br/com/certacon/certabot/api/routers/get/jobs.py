@@ -0,0 +1,29 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+
+from br.com.certacon.certabot.api.deps import get_db, require_roles
+from br.com.certacon.certabot.db import crud
+from br.com.certacon.certabot.db.schemas.mvp import JobStatusOut
+from br.com.certacon.certabot.db.schemas.common import ErrorResponse
+
+router = APIRouter(tags=["mvp"])
+
+@router.get("/{job_id}", response_model=JobStatusOut, responses={404: {"model": ErrorResponse}}, summary="Status de um job (submit assíncrono)")
+def get_job_status(job_id: str, db: Session = Depends(get_db), user=Depends(require_roles("admin", "operador"))):
+    sub = crud.get_submission_by_job_id(db, job_id)
+    if sub is None or (user.role != "admin" and sub.user_id != user.id):
+        raise HTTPException(status_code=404, detail="Job não encontrado")
+
+    split = None
+    if sub.status == "SPLIT_DONE":
+        ev = crud.get_last_event(db, sub.id, "SPLIT_DONE")
+        split = crud.load_meta(ev.meta) if ev else None
+
+    return {
+        "job_id": sub.job_id,
+        "service_type": sub.service_type,
+        "status": sub.status,
+        "created_at": sub.created_at.isoformat() if sub.created_at else "",
+        "user": sub.user.username,
+        "split": split,
+    }
@@ -0,0 +1,12 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+
+from br.com.certacon.certabot.api.deps import get_db, require_roles
+from br.com.certacon.certabot.db import blobs
+from br.com.certacon.certabot.db.schemas.mvp import BlobStatsOut
+
+router = APIRouter(tags=["storage"])
+
+@router.get("/blobs", response_model=BlobStatsOut, summary="Blob store: conteúdos únicos, referências e bytes economizados")
+def get_blob_stats(db: Session = Depends(get_db), _=Depends(require_roles("admin"))):
+    return blobs.stats(db)
@@ -0,0 +1,69 @@
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import date, datetime
+from typing import Optional
+import json
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+
+from br.com.certacon.certabot.api.deps import get_db, require_roles
+from br.com.certacon.certabot.db import crud
+from br.com.certacon.certabot.db.schemas.mvp import ServiceType, SubmissionPageOut
+from br.com.certacon.certabot.db.schemas.common import ErrorResponse
+
+router = APIRouter(tags=["mvp"])
+
+def _encode_cursor(created_at: datetime, sub_id: int) -> str:
+    raw = json.dumps([created_at.isoformat(), sub_id]).encode()
+    return urlsafe_b64encode(raw).decode().rstrip("=")
+
+def _decode_cursor(cursor: str):
+    try:
+        created_at, sub_id = json.loads(urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        return datetime.fromisoformat(created_at), int(sub_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+
+@router.get("", response_model=SubmissionPageOut, responses={400: {"model": ErrorResponse}}, summary="Lista submissões (paginação por cursor)")
+def list_submissions(
+    user: Optional[str] = Query(None, description="Username (só admin; operador vê apenas as próprias)"),
+    service_type: Optional[ServiceType] = Query(None),
+    status: Optional[str] = Query(None, description="Filtrar por status"),
+    since: Optional[date] = Query(None, description="YYYY-MM-DD"),
+    until: Optional[date] = Query(None, description="YYYY-MM-DD (inclusive)"),
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="`next_cursor` da página anterior"),
+    db: Session = Depends(get_db),
+    current=Depends(require_roles("admin", "operador")),
+):
+    user_id = current.id
+    if current.role == "admin":
+        user_id = None
+        if user:
+            u = crud.get_user_by_username(db, user)
+            if u is None:
+                return {"items": [], "next_cursor": None}
+            user_id = u.id
+
+    rows = crud.search_submissions(
+        db,
+        user_id=user_id,
+        service_type=service_type,
+        status=status,
+        since=since,
+        until=until,
+        after=_decode_cursor(cursor) if cursor else None,
+        limit=limit + 1,
+    )
+    # uma linha a mais só para saber se existe próxima página
+    next_cursor = _encode_cursor(rows[limit - 1].created_at, rows[limit - 1].id) if len(rows) > limit else None
+    return {
+        "items": [{
+            "job_id": s.job_id,
+            "service_type": s.service_type,
+            "status": s.status,
+            "created_at": s.created_at.isoformat() if s.created_at else "",
+            "user": s.user.username if s.user else "",
+        } for s in rows[:limit]],
+        "next_cursor": next_cursor,
+    }
@@ -0,0 +1,86 @@
+from fastapi import APIRouter, Depends, File, Form, Query, Request, Response, UploadFile
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.requests import ClientDisconnect
+from typing import Optional
+
+from br.com.certacon.certabot.api.deps import require_roles, get_async_db
+from br.com.certacon.certabot.db.schemas.mvp import SubmitOut, UploadSessionIn, UploadSessionOut
+from br.com.certacon.certabot.db.schemas.common import ErrorResponse
+from br.com.certacon.certabot.service import upload_sessions
+
+router = APIRouter(tags=["uploads"])
+
+ERRORS = {400: {"model": ErrorResponse}, 404: {"model": ErrorResponse}, 409: {"model": ErrorResponse}, 410: {"model": ErrorResponse}}
+
+@router.post("", response_model=UploadSessionOut, status_code=201, responses={400: {"model": ErrorResponse}},
+             summary="Abre um upload retomável do insumo grande (chave_txt / placa_xlsx)")
+async def create_upload(
+    body: UploadSessionIn,
+    user = Depends(require_roles("admin", "operador")),
+    db: AsyncSession = Depends(get_async_db),
+):
+    up = await upload_sessions.create(db, user=user, service=body.service_type, filename=body.filename, size_bytes=body.size_bytes)
+    return upload_sessions.to_out(up)
+
+@router.put(
+    "/{upload_id}",
+    response_model=UploadSessionOut,
+    responses={**ERRORS, 413: {"model": ErrorResponse}, 416: {"model": ErrorResponse}},
+    openapi_extra={"requestBody": {"required": True, "content": {"application/octet-stream": {"schema": {"type": "string", "format": "binary"}}}}},
+    summary="Envia um pedaço do arquivo (corpo cru) a partir de `offset`",
+)
+async def put_chunk(
+    upload_id: str,
+    request: Request,
+    offset: int = Query(..., ge=0, description="Posição (bytes) do primeiro byte do corpo"),
+    user = Depends(require_roles("admin", "operador")),
+    db: AsyncSession = Depends(get_async_db),
+):
+    up = await upload_sessions.get_owned(db, upload_id, user)
+    try:
+        await upload_sessions.write_chunk(db, up, offset, request.stream())
+    except ClientDisconnect:
+        return Response(status_code=400)  # ninguém lê; o que chegou já foi registrado
+    return upload_sessions.to_out(up)
+
+@router.get("/{upload_id}", response_model=UploadSessionOut, responses=ERRORS, summary="Intervalos recebidos e faltantes")
+async def get_upload(
+    upload_id: str,
+    user = Depends(require_roles("admin", "operador")),
+    db: AsyncSession = Depends(get_async_db),
+):
+    return upload_sessions.to_out(await upload_sessions.get_owned(db, upload_id, user))
+
+@router.delete("/{upload_id}", status_code=204, responses=ERRORS, summary="Cancela o upload e apaga o que foi recebido")
+async def delete_upload(
+    upload_id: str,
+    user = Depends(require_roles("admin", "operador")),
+    db: AsyncSession = Depends(get_async_db),
+):
+    await upload_sessions.abort(db, await upload_sessions.get_owned(db, upload_id, user))
+    return Response(status_code=204)
+
+@router.post(
+    "/{upload_id}/finalize",
+    response_model=SubmitOut,
+    status_code=202,
+    responses=ERRORS,
+    summary="Fecha o upload e submete o job com os demais campos do serviço",
+)
+async def finalize_upload(
+    upload_id: str,
+    request: Request,
+    sha256: Optional[str] = Form(None, description="sha256 do arquivo inteiro (opcional): confere a montagem"),
+    pfx_file: Optional[UploadFile] = File(None, description="Certificado .pfx"),
+    pfx_password: Optional[str] = Form(None, description="Senha do .pfx (não é armazenada)"),
+    planilha_csv: Optional[UploadFile] = File(None, description="CSV (obrigatório para CFE)"),
+    gov_cpf: Optional[str] = Form(None, description="SENATRAN: CPF gov.br (alternativa ao PFX)"),
+    gov_password: Optional[str] = Form(None),
+    user = Depends(require_roles("admin", "operador")),
+    db: AsyncSession = Depends(get_async_db),
+):
+    up = await upload_sessions.get_owned(db, upload_id, user)
+    return await upload_sessions.finalize(
+        db, up, request=request, user=user, sha256=sha256, pfx_file=pfx_file, pfx_password=pfx_password,
+        planilha_csv=planilha_csv, gov_cpf=gov_cpf, gov_password=gov_password,
+    )
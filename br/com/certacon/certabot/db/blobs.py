@@ -0,0 +1,131 @@
+# br/com/certacon/certabot/db/blobs.py
+"""
+Contagem de referências do blob store (`content_blobs`).
+
+Cada file_movement de insumo (INPUT_*) com sha256 soma 1 ao blob daquele conteúdo, na mesma
+transação do INSERT (eventos de mapper: cobre crud, crud_async e o AuditUnitOfWork); remover o
+movimento subtrai 1. Economia = Σ tamanho × (referências − 1).
+
+Limpeza de blobs sem nenhum job apontando (hardlinks apagados junto com as pastas dos jobs):
+    python -m br.com.certacon.certabot.db.blobs gc
+"""
+from __future__ import annotations
+from datetime import timedelta
+from typing import Dict, List
+import sys
+import time
+
+from sqlalchemy import delete, event, func, select
+from sqlalchemy.orm import Session
+
+from br.com.certacon.certabot.db import models
+from br.com.certacon.certabot.db.upsert import increment
+from br.com.certacon.certabot.utils import blobstore
+
+B = models.ContentBlob
+F = models.FileMovement
+
+TMP_MAX_AGE = timedelta(hours=1)
+DELETE_BATCH = 500
+
+
+def _counts(target) -> bool:
+    return bool(target.sha256) and (target.file_role or "").startswith("INPUT_")
+
+
+def apply(conn, sha256: str, size_bytes: int, delta: int) -> None:
+    increment(
+        conn, B, {"sha256": sha256}, "ref_count", delta,
+        also={"last_ref_at": func.now()},
+        insert_values={"size_bytes": size_bytes or 0} if delta > 0 else None,
+    )
+
+
+@event.listens_for(F, "after_insert")
+def _blob_ref(mapper, connection, target) -> None:
+    if _counts(target):
+        apply(connection, target.sha256, target.size_bytes, +1)
+
+
+@event.listens_for(F, "after_delete")
+def _blob_unref(mapper, connection, target) -> None:
+    if _counts(target):
+        apply(connection, target.sha256, target.size_bytes, -1)
+
+
+def stats(db: Session) -> Dict[str, int]:
+    row = db.execute(
+        select(
+            func.count(B.sha256),
+            func.coalesce(func.sum(B.size_bytes), 0),
+            func.coalesce(func.sum(B.size_bytes * B.ref_count), 0),
+            func.coalesce(func.sum(B.ref_count), 0),
+        ).where(B.ref_count > 0)
+    ).one()
+    blobs, unique_bytes, referenced_bytes, refs = (int(v) for v in row)
+    return {
+        "blobs": blobs,
+        "references": refs,
+        "unique_bytes": unique_bytes,
+        "referenced_bytes": referenced_bytes,
+        "bytes_saved": referenced_bytes - unique_bytes,
+    }
+
+
+def gc(db: Session) -> Dict[str, int]:
+    """
+    Apaga os blobs que nenhuma pasta de job referencia mais (hardlink count 1), com as linhas
+    deles, e as linhas sem referência; remove temporários de uploads interrompidos. Onde o store caiu para cópia, o
+    blob também tem link count 1: apagá-lo só faz o próximo upload igual gravar de novo.
+    Rodar em janela sem uploads: um blob sendo reaproveitado naquele instante pode sumir entre o
+    `put` e o `link` da ingestão.
+    """
+    removed_files = removed_bytes = 0
+    removidos: List[str] = []
+    for sha in db.execute(select(B.sha256).execution_options(yield_per=1000)).scalars():
+        p = blobstore.blob_path(sha)
+        try:
+            st = p.stat()
+        except FileNotFoundError:
+            continue
+        if st.st_nlink <= 1:
+            p.unlink()
+            removidos.append(sha)
+            removed_files += 1
+            removed_bytes += st.st_size
+    # sem o arquivo, a linha só inflaria o stats (mesmo com ref_count > 0: as pastas já sumiram)
+    removed_rows = 0
+    for i in range(0, len(removidos), DELETE_BATCH):
+        removed_rows += db.execute(delete(B).where(B.sha256.in_(removidos[i:i + DELETE_BATCH]))).rowcount
+    removed_rows += db.execute(delete(B).where(B.ref_count <= 0)).rowcount
+    db.commit()
+
+    tmp_removed = 0
+    tmp_dir = blobstore.blob_dir() / "tmp"
+    if tmp_dir.is_dir():
+        limit = time.time() - TMP_MAX_AGE.total_seconds()
+        for p in tmp_dir.iterdir():
+            if p.stat().st_mtime < limit:
+                p.unlink(missing_ok=True)
+                tmp_removed += 1
+    return {"files_removed": removed_files, "bytes_freed": removed_bytes, "rows_removed": removed_rows, "tmp_removed": tmp_removed}
+
+
+def main(argv=None) -> None:
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] not in (["gc"], ["stats"]):
+        print("uso: python -m br.com.certacon.certabot.db.blobs gc|stats")
+        sys.exit(2)
+    from br.com.certacon.certabot.db.base import Base
+    from br.com.certacon.certabot.db.session import engine, SessionLocal
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        out = gc(db) if argv[0] == "gc" else stats(db)
+    finally:
+        db.close()
+    print(out)
+
+
+if __name__ == "__main__":
+    main()
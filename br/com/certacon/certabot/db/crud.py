@@ -1,7 +1,9 @@
 import json
-from typing import Optional, Any, Dict
-from sqlalchemy.orm import Session
-from br.com.certacon.certabot.db import models
+from datetime import date, datetime, timedelta
+from typing import Optional, Any, Dict, List, Tuple
+from sqlalchemy import String, literal, or_, select
+from sqlalchemy.orm import Session, joinedload
+from br.com.certacon.certabot.db import models, rollup
 from br.com.certacon.certabot.api.core.security import hash_password, verify_password
 
 def get_user_by_username(db: Session, username: str) -> Optional[models.User]:
@@ -14,6 +16,17 @@ def _meta_to_text(meta):
         return json.dumps(meta, ensure_ascii=False)
     return str(meta)
 
+def load_meta(meta):
+    """
+    Inverso de _meta_to_text: meta pode vir como texto JSON (às vezes codificado duas vezes).
+    """
+    while isinstance(meta, str):
+        try:
+            meta = json.loads(meta)
+        except ValueError:
+            return None
+    return meta
+
 def create_user(db: Session, username: str, password: str, role: str, full_name: str = "") -> models.User:
     u = models.User(
         username=username,
@@ -88,6 +101,144 @@ def update_submission_status(db: Session, submission_id: int, new_status: str, *
     db.refresh(sub)
     return sub
 
+def claim_submission_status(db: Session, submission_id: int, *, expected: str, new_status: str, message: str = "") -> bool:
+    """
+    Compare-and-set do status: só troca se o status atual ainda for `expected`.
+    Retorna False se outro processo já mudou a submissão.
+    """
+    n = (
+        db.query(models.ServiceSubmission)
+        .filter(models.ServiceSubmission.id == submission_id, models.ServiceSubmission.status == expected)
+        .update({"status": new_status}, synchronize_session=False)
+    )
+    if not n:
+        db.rollback()
+        return False
+    sub = db.query(models.ServiceSubmission).filter(models.ServiceSubmission.id == submission_id).first()
+    # UPDATE em massa não passa pelo flush: o rollup é ajustado aqui
+    rollup.move(db.connection(), created_at=sub.created_at, service_type=sub.service_type, old_status=expected, new_status=new_status)
+    db.add(models.SubmissionEvent(
+        submission_id=submission_id,
+        job_id=sub.job_id,
+        user_id=sub.user_id,
+        service_type=sub.service_type,
+        event_type="STATUS_CHANGED",
+        message=message or f"{expected} -> {new_status}",
+        meta={"from": expected, "to": new_status},
+    ))
+    db.commit()
+    return True
+
+def get_submission_by_job_id(db: Session, job_id: str) -> Optional[models.ServiceSubmission]:
+    return db.query(models.ServiceSubmission).filter(models.ServiceSubmission.job_id == job_id).first()
+
+def _ts(db: Session, value: datetime):
+    # SQLite guarda o server_default como texto 'YYYY-MM-DD HH:MM:SS' e o bind do DateTime sempre leva
+    # '.ffffff': com os dois no mesmo formato a comparação (inclusive a igualdade do cursor) fica exata
+    if db.get_bind().dialect.name != "sqlite":
+        return value
+    text = value.strftime("%Y-%m-%d %H:%M:%S") + (f".{value.microsecond:06d}" if value.microsecond else "")
+    return literal(text, String)
+
+def _date_range(db: Session, col, since: Optional[date], until: Optional[date]) -> list:
+    # intervalo semiaberto [since 00:00, until+1 00:00)
+    where = []
+    if since:
+        where.append(col >= _ts(db, datetime(since.year, since.month, since.day)))
+    if until:
+        where.append(col < _ts(db, datetime(until.year, until.month, until.day) + timedelta(days=1)))
+    return where
+
+def search_submissions(
+    db: Session,
+    *,
+    user_id: Optional[int] = None,
+    service_type: Optional[str] = None,
+    status: Optional[str] = None,
+    since: Optional[date] = None,
+    until: Optional[date] = None,
+    after: Optional[Tuple[datetime, int]] = None,
+    limit: int = 50,
+) -> List[models.ServiceSubmission]:
+    """
+    Submissões em ordem (created_at, id) decrescente. Paginação keyset: `after` é o (created_at, id)
+    da última linha da página anterior — o custo não cresce com a profundidade, ao contrário de OFFSET.
+    """
+    S = models.ServiceSubmission
+    q = db.query(S).options(joinedload(S.user))
+    if user_id is not None:
+        q = q.filter(S.user_id == user_id)
+    if service_type:
+        q = q.filter(S.service_type == service_type)
+    if status:
+        q = q.filter(S.status == status)
+    for cond in _date_range(db, S.created_at, since, until):
+        q = q.filter(cond)
+    if after:
+        created_at, last_id = after
+        ts = _ts(db, created_at)
+        # created_at <= ts como faixa do índice; o empate no mesmo instante é desfeito pelo id
+        q = q.filter(S.created_at <= ts, or_(S.created_at < ts, S.id < last_id))
+    return q.order_by(S.created_at.desc(), S.id.desc()).limit(limit).all()
+
+# colunas de cada export de auditoria (também o cabeçalho do CSV)
+AUDIT_EXPORTS = {
+    "events": ("id", "created_at", "submission_id", "job_id", "user_id", "service_type", "event_type", "message", "meta"),
+    "files": ("id", "created_at", "submission_id", "job_id", "service_type", "file_role", "file_name", "file_path", "mime_type", "size_bytes", "sha256"),
+    "logins": ("id", "created_at", "user_id", "username", "ip", "user_agent", "success"),
+}
+
+def iter_audit_rows(
+    db: Session,
+    kind: str,
+    *,
+    since: Optional[date] = None,
+    until: Optional[date] = None,
+    service_type: Optional[str] = None,
+    event_type: Optional[str] = None,
+    file_role: Optional[str] = None,
+    username: Optional[str] = None,
+    batch: int = 1000,
+):
+    """
+    Linhas de auditoria (tuplas na ordem de AUDIT_EXPORTS[kind]) em ordem (created_at, id), lidas com
+    cursor no servidor (`yield_per`): a memória fica em ~`batch` linhas, qualquer que seja o intervalo.
+    """
+    if kind == "events":
+        T = models.SubmissionEvent
+        stmt = select(T.id, T.created_at, T.submission_id, T.job_id, T.user_id, T.service_type, T.event_type, T.message, T.meta)
+        if service_type:
+            stmt = stmt.where(T.service_type == service_type)
+        if event_type:
+            stmt = stmt.where(T.event_type == event_type)
+    elif kind == "files":
+        T, S = models.FileMovement, models.ServiceSubmission
+        stmt = (
+            select(T.id, T.created_at, T.submission_id, T.job_id, S.service_type, T.file_role, T.file_name, T.file_path, T.mime_type, T.size_bytes, T.sha256)
+            .join(S, S.id == T.submission_id)
+        )
+        if service_type:
+            stmt = stmt.where(S.service_type == service_type)
+        if file_role:
+            stmt = stmt.where(T.file_role == file_role)
+    elif kind == "logins":
+        T, U = models.LoginLog, models.User
+        stmt = select(T.id, T.created_at, T.user_id, U.username, T.ip, T.user_agent, T.success).join(U, U.id == T.user_id)
+        if username:
+            stmt = stmt.where(U.username == username)
+    else:
+        raise ValueError(f"export desconhecido: {kind}")
+    stmt = stmt.where(*_date_range(db, T.created_at, since, until)).order_by(T.created_at, T.id)
+    yield from db.execute(stmt.execution_options(yield_per=batch))
+
+def get_last_event(db: Session, submission_id: int, event_type: str) -> Optional[models.SubmissionEvent]:
+    return (
+        db.query(models.SubmissionEvent)
+        .filter(models.SubmissionEvent.submission_id == submission_id, models.SubmissionEvent.event_type == event_type)
+        .order_by(models.SubmissionEvent.id.desc())
+        .first()
+    )
+
 def create_submission_event(
     db: Session,
     *,
@@ -0,0 +1,182 @@
+from typing import Optional, Any, Dict
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from br.com.certacon.certabot.db import models, rollup
+from br.com.certacon.certabot.db.crud import _meta_to_text
+from br.com.certacon.certabot.api.core.security import hash_password_async, verify_and_update_password
+
+# Equivalentes async de db/crud.py (mesmos nomes e argumentos), para as rotas `async def`.
+
+async def get_user_by_username(db: AsyncSession, username: str) -> Optional[models.User]:
+    res = await db.execute(select(models.User).where(models.User.username == username))
+    return res.scalars().first()
+
+async def create_user(db: AsyncSession, username: str, password: str, role: str, full_name: str = "") -> models.User:
+    u = models.User(
+        username=username,
+        password_hash=await hash_password_async(password),
+        role=role,
+        full_name=full_name
+    )
+    db.add(u)
+    await db.commit()
+    await db.refresh(u)
+    return u
+
+async def verify_user_password(db: AsyncSession, user: models.User, password: str) -> bool:
+    """
+    Confere a senha fora do event loop. Se o hash salvo usa parâmetros antigos, o novo hash
+    fica pendente na sessão e é gravado no próximo commit (ex.: o do login log).
+    """
+    ok, new_hash = await verify_and_update_password(password, user.password_hash)
+    if ok and new_hash:
+        user.password_hash = new_hash
+        db.add(user)
+    return ok
+
+async def create_login_log(db: AsyncSession, user_id: int, ip: str, user_agent: str, success: bool = True) -> models.LoginLog:
+    log = models.LoginLog(user_id=user_id, ip=ip, user_agent=user_agent, success=1 if success else 0)
+    db.add(log)
+    await db.commit()
+    await db.refresh(log)
+    return log
+
+async def create_submission(
+    db: AsyncSession,
+    *,
+    job_id: str,
+    user_id: int,
+    service_type: str,
+    base_path: str,
+    chave_txt_path: Optional[str],
+    pfx_path: Optional[str],
+    csv_path: Optional[str],
+    xlsx_path: Optional[str],
+    gov_cpf: Optional[str],
+) -> models.ServiceSubmission:
+    sub = models.ServiceSubmission(
+        job_id=job_id,
+        user_id=user_id,
+        service_type=service_type,
+        base_path=base_path,
+        chave_txt_path=chave_txt_path,
+        pfx_path=pfx_path,
+        csv_path=csv_path,
+        xlsx_path=xlsx_path,
+        gov_cpf=gov_cpf,
+        status="RECEIVED",
+    )
+    db.add(sub)
+    await db.commit()
+    await db.refresh(sub)
+    return sub
+
+async def get_submission_by_job_id(db: AsyncSession, job_id: str) -> Optional[models.ServiceSubmission]:
+    res = await db.execute(select(models.ServiceSubmission).where(models.ServiceSubmission.job_id == job_id))
+    return res.scalars().first()
+
+async def get_last_event(db: AsyncSession, submission_id: int, event_type: str) -> Optional[models.SubmissionEvent]:
+    res = await db.execute(
+        select(models.SubmissionEvent)
+        .where(models.SubmissionEvent.submission_id == submission_id, models.SubmissionEvent.event_type == event_type)
+        .order_by(models.SubmissionEvent.id.desc())
+        .limit(1)
+    )
+    return res.scalars().first()
+
+async def update_submission_status(db: AsyncSession, submission_id: int, new_status: str, *, message: str = "", meta: Dict[str, Any] | None = None) -> models.ServiceSubmission:
+    sub = await db.get(models.ServiceSubmission, submission_id)
+    if not sub:
+        return None
+    old = sub.status
+    sub.status = new_status
+    db.add(sub)
+    # linha de evento
+    ev = models.SubmissionEvent(
+        submission_id=submission_id,
+        job_id=sub.job_id,
+        user_id=sub.user_id,
+        service_type=sub.service_type,
+        event_type="STATUS_CHANGED",
+        message=message or f"{old} -> {new_status}",
+        meta=meta or {"from": old, "to": new_status},
+    )
+    db.add(ev)
+    await db.commit()
+    return sub
+
+async def claim_submission_status(db: AsyncSession, submission_id: int, *, expected: str, new_status: str, message: str = "") -> bool:
+    """
+    Compare-and-set do status (ver crud.claim_submission_status).
+    """
+    S = models.ServiceSubmission
+    res = await db.execute(
+        update(S).where(S.id == submission_id, S.status == expected).values(status=new_status).execution_options(synchronize_session=False)
+    )
+    if not res.rowcount:
+        await db.rollback()
+        return False
+    sub = await db.get(S, submission_id)
+    conn = await db.connection()
+    await conn.run_sync(lambda c: rollup.move(c, created_at=sub.created_at, service_type=sub.service_type, old_status=expected, new_status=new_status))
+    db.add(models.SubmissionEvent(
+        submission_id=submission_id,
+        job_id=sub.job_id,
+        user_id=sub.user_id,
+        service_type=sub.service_type,
+        event_type="STATUS_CHANGED",
+        message=message or f"{expected} -> {new_status}",
+        meta={"from": expected, "to": new_status},
+    ))
+    await db.commit()
+    return True
+
+async def create_submission_event(
+    db: AsyncSession,
+    *,
+    submission_id: int,
+    job_id: str,
+    user_id: int,
+    service_type: str,
+    event_type: str,
+    message: str = "",
+    meta: Dict[str, Any] | None = None,
+) -> models.SubmissionEvent:
+    ev = models.SubmissionEvent(
+        submission_id=submission_id,
+        job_id=job_id,
+        user_id=user_id,
+        service_type=service_type,
+        event_type=event_type,
+        message=message,
+        meta=_meta_to_text(meta),
+    )
+    db.add(ev)
+    await db.commit()
+    return ev
+
+async def create_file_movement(
+    db: AsyncSession,
+    *,
+    submission_id: int,
+    job_id: str,
+    file_role: str,
+    file_name: str,
+    file_path: str,
+    mime_type: Optional[str],
+    size_bytes: Optional[int],
+    sha256: Optional[str],
+) -> models.FileMovement:
+    f = models.FileMovement(
+        submission_id=submission_id,
+        job_id=job_id,
+        file_role=file_role,
+        file_name=file_name,
+        file_path=file_path,
+        mime_type=mime_type,
+        size_bytes=size_bytes,
+        sha256=sha256,
+    )
+    db.add(f)
+    await db.commit()
+    return f
@@ -1,7 +1,7 @@
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from br.com.certacon.certabot.db.base import Base
-from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, JSON
+from sqlalchemy import BigInteger, Column, Integer, String, DateTime, Text, ForeignKey, JSON, Index
 
 class User(Base):
     __tablename__ = "users"
@@ -22,7 +22,7 @@ class LoginLog(Base):
     ip = Column(String(64))
     user_agent = Column(String(255))
     success = Column(Integer, default=1)  # 1 ok / 0 falha
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
 
     user = relationship("User", back_populates="logins")
 
@@ -45,6 +45,16 @@ class ServiceSubmission(Base):
     events = relationship("SubmissionEvent", back_populates="submission", cascade="all, delete-orphan")
     files = relationship("FileMovement", back_populates="submission", cascade="all, delete-orphan")
 
+    # filtros das métricas/listagens: por serviço, status ou usuário dentro de um intervalo de datas,
+    # e "últimas submissões" (ORDER BY created_at DESC LIMIT n) sem filtro. O id (PK) já vai junto
+    # em cada índice (rowid no SQLite, chave clusterizada no MSSQL), o que serve à paginação keyset.
+    __table_args__ = (
+        Index("ix_service_submissions_service_created", "service_type", "created_at"),
+        Index("ix_service_submissions_status_created", "status", "created_at"),
+        Index("ix_service_submissions_user_created", "user_id", "created_at"),
+        Index("ix_service_submissions_created", "created_at"),
+    )
+
 class SubmissionEvent(Base):
     """
     Linha do tempo/auditoria de uma submissão.
@@ -59,7 +69,7 @@ class SubmissionEvent(Base):
     event_type = Column(String(64), nullable=False)
     message = Column(Text, nullable=True)
     meta = Column(JSON, nullable=True)  # detalhes (contagens por modelo, paths, HTTP status, etc.)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)  # indexado: filtro por data dos exports de auditoria
 
     submission = relationship("ServiceSubmission", back_populates="events")
 
@@ -77,6 +87,48 @@ class FileMovement(Base):
     mime_type = Column(String(128), nullable=True)
     size_bytes = Column(Integer, nullable=True)
     sha256 = Column(String(64), nullable=True)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
 
     submission = relationship("ServiceSubmission", back_populates="files")
+
+class SubmissionDailyRollup(Base):
+    """
+    Contagem de submissões por (dia de criação, serviço, status atual), mantida a cada
+    criação/troca de status (ver db/rollup.py). É de onde saem as métricas agregadas.
+    """
+    __tablename__ = "submission_daily_rollup"
+    day = Column(String(10), primary_key=True)           # YYYY-MM-DD (de created_at)
+    service_type = Column(String(16), primary_key=True)
+    status = Column(String(32), primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+class ContentBlob(Base):
+    """
+    Conteúdo único do blob store (UPLOAD_DIR/_blobs, ver utils/blobstore.py) e quantos
+    insumos de jobs (file_movements INPUT_*) apontam para ele (ver db/blobs.py).
+    """
+    __tablename__ = "content_blobs"
+    sha256 = Column(String(64), primary_key=True)
+    size_bytes = Column(Integer, nullable=False)
+    ref_count = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    last_ref_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class UploadSession(Base):
+    """
+    Upload retomável de um insumo grande (chave_txt ou placa_xlsx): os pedaços chegam em qualquer
+    ordem para <pasta do job>/upload/<arquivo>.part; `received` guarda os intervalos [início, fim)
+    já gravados. O finalize entrega o arquivo montado ao pipeline de submit (service/upload_sessions.py).
+    """
+    __tablename__ = "upload_sessions"
+    id = Column(String(32), primary_key=True)                # upload_id (uuid hex)
+    user_id = Column(Integer, ForeignKey("users.id"), index=True, nullable=False)
+    service_type = Column(String(16), nullable=False)
+    job_id = Column(String(64), nullable=False)              # pasta do job criada na abertura
+    base_path = Column(Text, nullable=False)
+    filename = Column(String(255), nullable=False)
+    size_bytes = Column(BigInteger, nullable=False)          # tamanho total declarado
+    received = Column(JSON, nullable=False, default=list)    # [[início, fim), ...] ordenados e sem sobreposição
+    version = Column(Integer, nullable=False, default=0)     # compare-and-set entre workers
+    status = Column(String(16), nullable=False, default="OPEN")  # OPEN | FINALIZING | FINALIZED
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
@@ -0,0 +1,159 @@
+# br/com/certacon/certabot/db/rollup.py
+"""
+Manutenção incremental de `submission_daily_rollup` (dia, serviço, status) -> contagem.
+
+Listeners `before_flush`/`after_flush` em todas as sessões (sync e async) aplicam, na mesma
+transação, +1/-1 para cada submissão criada, com status alterado ou removida — cobre crud,
+crud_async e o AuditUnitOfWork. UPDATEs em massa não passam pelo flush: quem fizer um deve chamar
+`move()` (ver crud.claim_submission_status).
+
+Reconstrução completa (ex.: primeira implantação ou correção de divergência):
+    python -m br.com.certacon.certabot.db.rollup rebuild
+"""
+from __future__ import annotations
+from collections import Counter
+from datetime import date, datetime
+from typing import Dict, Optional, Tuple
+import sys
+
+from sqlalchemy import event, insert, inspect, select, delete, func
+from sqlalchemy.orm import Session
+
+from br.com.certacon.certabot.db import models
+from br.com.certacon.certabot.db.upsert import increment
+
+S = models.ServiceSubmission
+R = models.SubmissionDailyRollup
+
+Key = Tuple[str, str, str]
+
+
+def day_of(created_at) -> str:
+    if isinstance(created_at, datetime):
+        return created_at.date().isoformat()
+    if isinstance(created_at, date):
+        return created_at.isoformat()
+    return str(created_at)[:10]
+
+
+def apply(conn, deltas: Dict[Key, int]) -> None:
+    """
+    Soma os deltas no rollup: UPDATE count = count + d; se a linha não existe, INSERT (ver db/upsert.py).
+    """
+    for (day, service, status), d in deltas.items():
+        if d:
+            increment(conn, R, {"day": day, "service_type": service, "status": status}, "count", d, insert_values={})
+
+
+def move(conn, *, created_at, service_type: str, old_status: Optional[str], new_status: Optional[str]) -> None:
+    day = day_of(created_at)
+    deltas: Counter = Counter()
+    if old_status:
+        deltas[(day, service_type, old_status)] -= 1
+    if new_status:
+        deltas[(day, service_type, new_status)] += 1
+    apply(conn, deltas)
+
+
+def _stored(session: Session, sub) -> Tuple[object, Optional[str]]:
+    # (created_at, status) como estão no banco — usado quando o objeto não tem o valor carregado
+    row = session.connection().execute(select(S.created_at, S.status).where(S.id == sub.id)).first()
+    return (row[0], row[1]) if row else (None, None)
+
+
+@event.listens_for(Session, "before_flush")
+def _rollup_before_flush(session: Session, flush_context, instances) -> None:
+    # trocas de status e remoções: o banco ainda tem o valor antigo aqui
+    deltas: Counter = Counter()
+    for obj in session.dirty:
+        if not isinstance(obj, S) or obj.id is None:
+            continue
+        hist = inspect(obj).attrs.status.history
+        if not hist.added:
+            continue
+        created_at = obj.__dict__.get("created_at")
+        old = hist.deleted[0] if hist.deleted else None
+        if created_at is None or not hist.deleted:
+            db_created_at, db_status = _stored(session, obj)
+            created_at = created_at or db_created_at
+            old = old if hist.deleted else db_status
+        new = hist.added[0]
+        if old == new:
+            continue
+        day = day_of(created_at)
+        deltas[(day, obj.service_type, old)] -= 1
+        deltas[(day, obj.service_type, new)] += 1
+    for obj in session.deleted:
+        if isinstance(obj, S):
+            created_at, status = _stored(session, obj)
+            if status:
+                deltas[(day_of(created_at), obj.service_type, status)] -= 1
+    if deltas:
+        session.info.setdefault("_rollup_deltas", Counter()).update(deltas)
+
+
+@event.listens_for(Session, "after_flush")
+def _rollup_after_flush(session: Session, flush_context) -> None:
+    # inserções: created_at (server_default) só existe depois do INSERT
+    deltas: Counter = session.info.pop("_rollup_deltas", None) or Counter()
+    for obj in session.new:
+        if isinstance(obj, S) and obj.status:
+            created_at = obj.__dict__.get("created_at") or _stored(session, obj)[0]
+            deltas[(day_of(created_at), obj.service_type, obj.status)] += 1
+    if deltas:
+        apply(session.connection(), deltas)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _rollup_discard(session: Session, previous_transaction) -> None:
+    session.info.pop("_rollup_deltas", None)
+
+
+def rebuild(db: Session, *, batch: int = 50_000) -> int:
+    """
+    Recalcula o rollup inteiro a partir de service_submissions (agregação em Python,
+    portável entre SQLite e MSSQL). Retorna o nº de linhas do rollup.
+    """
+    counts: Counter = Counter()
+    rows = db.execute(select(S.created_at, S.service_type, S.status).execution_options(yield_per=batch))
+    for created_at, service, status in rows:
+        counts[(day_of(created_at), service, status)] += 1
+    db.execute(delete(R))
+    if counts:
+        db.execute(insert(R), [
+            {"day": d, "service_type": svc, "status": st, "count": c}
+            for (d, svc, st), c in counts.items()
+        ])
+    db.commit()
+    return len(counts)
+
+
+def ensure(db: Session) -> Optional[int]:
+    """
+    Startup: se o rollup está vazio mas já existem submissões (tabela recém-criada), reconstrói.
+    """
+    if db.execute(select(R.day).limit(1)).first() is not None:
+        return None
+    if db.execute(select(func.count(S.id))).scalar():
+        return rebuild(db)
+    return None
+
+
+def main(argv=None) -> None:
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] != ["rebuild"]:
+        print("uso: python -m br.com.certacon.certabot.db.rollup rebuild")
+        sys.exit(2)
+    from br.com.certacon.certabot.db.base import Base
+    from br.com.certacon.certabot.db.session import engine, SessionLocal
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        n = rebuild(db)
+    finally:
+        db.close()
+    print(f"rollup reconstruído: {n} linha(s)")
+
+
+if __name__ == "__main__":
+    main()
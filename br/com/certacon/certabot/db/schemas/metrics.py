@@ -4,7 +4,7 @@ from pydantic import BaseModel
 
 StatusStr = Literal[
     "RECEIVED", "REJECTED_MODEL_MISMATCH", "REJECTED_VALIDATION",
-    "FILES_SAVED", "SPLIT_DONE", "READY",
+    "FILES_SAVED", "QUEUED", "REQUEUED", "SPLIT_DONE", "READY",
     "ERROR_SAVE", "ERROR_SPLIT", "ERROR_UNHANDLED"
 ]
 
@@ -1,4 +1,4 @@
-from typing import Literal
+from typing import Any, Dict, List, Literal, Optional
 from pydantic import BaseModel
 
 ServiceType = Literal["NFE", "CTE", "NFCE", "CFE", "SENATRAN"]
@@ -9,3 +9,66 @@ class SubmitOut(BaseModel):
     service_type: ServiceType
     stored_at: str
     user: str
+    status: Optional[str] = None
+    status_url: Optional[str] = None
+
+class BatchItemOut(BaseModel):
+    filename: str
+    status_code: int                # 202 = aceito; demais = motivo em `detail`
+    job_id: Optional[str] = None
+    status: Optional[str] = None
+    status_url: Optional[str] = None
+    detail: Optional[str] = None
+
+class BatchSubmitOut(BaseModel):
+    service_type: ServiceType
+    total: int
+    accepted: int
+    rejected: int
+    user: str
+    results: List[BatchItemOut]
+
+class UploadSessionIn(BaseModel):
+    service_type: ServiceType
+    filename: str           # nome original (a extensão define o formato, ex.: chaves.txt.gz)
+    size_bytes: int         # tamanho total do arquivo
+
+class UploadSessionOut(BaseModel):
+    upload_id: str
+    job_id: str
+    service_type: ServiceType
+    field: str              # campo do submit que o upload substitui (chave_txt | placa_xlsx)
+    filename: str
+    size_bytes: int
+    received: List[List[int]]   # intervalos [início, fim) já gravados
+    received_bytes: int
+    missing: List[List[int]]    # o que falta enviar
+    complete: bool
+    status: str             # OPEN | FINALIZED
+    expires_at: str
+
+class JobStatusOut(BaseModel):
+    job_id: str
+    service_type: ServiceType
+    status: str
+    created_at: str
+    user: str
+    split: Optional[Dict[str, Any]] = None
+
+class SubmissionItem(BaseModel):
+    job_id: str
+    service_type: ServiceType
+    status: str
+    created_at: str
+    user: str
+
+class SubmissionPageOut(BaseModel):
+    items: List[SubmissionItem]
+    next_cursor: Optional[str] = None   # None = última página
+
+class BlobStatsOut(BaseModel):
+    blobs: int              # conteúdos únicos referenciados
+    references: int         # insumos de jobs apontando para eles
+    unique_bytes: int       # bytes efetivamente em disco
+    referenced_bytes: int   # bytes que os jobs ocupariam sem dedup
+    bytes_saved: int
@@ -0,0 +1,44 @@
+# br/com/certacon/certabot/db/upsert.py
+"""
+Contador por chave (rollup diário, refcount dos blobs) sem corrida entre transações.
+
+UPDATE col = col + delta; se a linha não existe, INSERT dentro de um SAVEPOINT. Duas transações
+que criam a mesma chave ao mesmo tempo (MSSQL, vários workers): a que perde recebe
+IntegrityError, desfaz só o SAVEPOINT e repete o UPDATE, que agora acha a linha.
+"""
+from __future__ import annotations
+from typing import Any, Dict, Optional
+
+from sqlalchemy import and_, insert, update
+from sqlalchemy.exc import IntegrityError
+
+TENTATIVAS = 3
+
+
+def increment(
+    conn,
+    model,
+    key: Dict[str, Any],
+    column: str,
+    delta: int,
+    *,
+    also: Optional[Dict[str, Any]] = None,
+    insert_values: Optional[Dict[str, Any]] = None,
+) -> None:
+    """
+    Soma `delta` em `column` da linha `key` (e grava `also` junto). Sem linha: INSERT de
+    key + insert_values + column=delta; `insert_values=None` não cria a linha.
+    """
+    t = model.__table__
+    where = and_(*(t.c[k] == v for k, v in key.items()))
+    for tentativa in range(TENTATIVAS):
+        res = conn.execute(update(t).where(where).values({column: t.c[column] + delta, **(also or {})}))
+        if res.rowcount or insert_values is None:
+            return
+        try:
+            with conn.begin_nested():
+                conn.execute(insert(t).values({**key, **insert_values, column: delta}))
+            return
+        except IntegrityError:
+            if tentativa == TENTATIVAS - 1:
+                raise
@@ -0,0 +1,176 @@
+# br/com/certacon/certabot/service/job_runner.py
+from __future__ import annotations
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Optional
+import multiprocessing
+import threading
+
+from sqlalchemy import func, select
+
+from br.com.certacon.certabot.api.core.config import settings
+from br.com.certacon.certabot.db import crud, models
+from br.com.certacon.certabot.db.session import SessionLocal
+from br.com.certacon.certabot.utils.audit import AuditUnitOfWork, bump_status
+from br.com.certacon.certabot.utils.fs import run_separator_using_jobid
+from br.com.certacon.certabot.utils.planilha_cfe import resumo as resumo_conciliacao
+
+# Execução assíncrona dos jobs: o submit só persiste os insumos e responde 202;
+# o split roda aqui, num pool local de processos com JOB_WORKERS workers.
+# O status avança QUEUED -> SPLIT_DONE | ERROR_SPLIT pelo callback (no processo da API).
+
+SPLIT_SERVICES = ("NFE", "NFCE", "CTE", "CFE")
+RECOVERABLE_STATUS = ("FILES_SAVED", "QUEUED")
+
+_executor: Optional[ProcessPoolExecutor] = None
+_lock = threading.Lock()
+# callbacks gravam no banco pela sessão síncrona: nunca no thread de quem submeteu. Com o cache de
+# splits o future pode já estar pronto no add_done_callback, que então roda o callback na hora,
+# dentro do event loop, e trava contra a transação async aberta no mesmo loop (SQLite: database is locked)
+_callbacks = ThreadPoolExecutor(max_workers=1, thread_name_prefix="split-done")
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    with _lock:
+        if _executor is None:
+            # spawn: mesmo comportamento no Windows e no Linux (fork com threads do servidor é frágil)
+            _executor = ProcessPoolExecutor(
+                max_workers=settings.JOB_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _executor
+
+
+def _drop_executor(broken: ProcessPoolExecutor) -> None:
+    # worker morto (OOM, kill): o pool fica quebrado para sempre; o próximo _get_executor sobe outro
+    global _executor
+    with _lock:
+        if _executor is broken:
+            _executor = None
+    broken.shutdown(wait=False, cancel_futures=True)
+
+
+def start() -> None:
+    """
+    Sobe o pool e re-enfileira os jobs que ficaram pela metade (startup da API).
+    """
+    _get_executor()
+    recover_pending_jobs()
+
+
+def shutdown() -> None:
+    global _executor
+    with _lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+
+def _submit_split(
+    submission_id: int,
+    job_id: str,
+    chave_txt_path: str,
+    base_path: str,
+    sha256: Optional[str] = None,
+    csv_path: Optional[str] = None,
+    csv_sha256: Optional[str] = None,
+) -> None:
+    kwargs = dict(
+        path_txt=Path(chave_txt_path),
+        folder_base=Path(base_path) / "split",
+        job_id=job_id,
+        sha256=sha256,
+        path_csv=Path(csv_path) if csv_path else None,
+        csv_sha256=csv_sha256,
+    )
+    executor = _get_executor()
+    try:
+        fut = executor.submit(run_separator_using_jobid, **kwargs)
+    except BrokenProcessPool:
+        _drop_executor(executor)
+        executor = _get_executor()
+        fut = executor.submit(run_separator_using_jobid, **kwargs)
+    fut.add_done_callback(lambda f: _callbacks.submit(_on_split_done, submission_id, f, executor))
+
+
+def enqueue_split(sub, *, sha256: Optional[str] = None, csv_sha256: Optional[str] = None) -> None:
+    """
+    Envia o split para o pool. O QUEUED já deve estar gravado pelo chamador.
+    `sha256` do TXT (da ingestão) evita reler o arquivo só para a chave do cache de splits;
+    idem `csv_sha256` da planilha do CFE (sub.csv_path), conciliada com as chaves no split.
+    """
+    _submit_split(sub.id, sub.job_id, sub.chave_txt_path, sub.base_path, sha256, sub.csv_path, csv_sha256)
+
+
+def _on_split_done(submission_id: int, fut: Future, executor: Optional[ProcessPoolExecutor] = None) -> None:
+    if executor is not None and not fut.cancelled() and isinstance(fut.exception(), BrokenProcessPool):
+        # os jobs em andamento no pool quebrado vão para ERROR_SPLIT; os próximos usam um pool novo
+        _drop_executor(executor)
+    db = SessionLocal()
+    try:
+        sub = db.get(models.ServiceSubmission, submission_id)
+        if sub is None:
+            return
+        uow = AuditUnitOfWork(sub)
+        try:
+            split = fut.result()
+        except Exception as e:
+            uow.event("ERROR", "Falha no split", {"error": f"{e.__class__.__name__}: {e}"})
+            uow.status("ERROR_SPLIT", message="Falha no split")
+        else:
+            cache = split.get("cache") or {}
+            if cache.get("hit"):
+                uow.event("SPLIT_CACHE_HIT", "Split reaproveitado do cache", cache)
+            uow.event("SPLIT_DONE", "Split finalizado", split)
+            conciliacao = (split.get("Resultado") or {}).get("conciliacao")
+            if conciliacao:
+                uow.event("CSV_JOINED", "Conciliação TXT x planilha_csv", resumo_conciliacao(conciliacao))
+            uow.status("SPLIT_DONE")
+        uow.flush(db)
+    finally:
+        db.close()
+
+
+def recover_pending_jobs() -> int:
+    """
+    Recupera jobs em estado não terminal deixados por um processo anterior:
+      - FILES_SAVED/QUEUED com TXT em disco -> REQUEUED e volta para o pool;
+        a troca é um compare-and-set no status, então só um worker da API reivindica cada job;
+      - sem TXT em disco, ou RECEIVED há mais de JOB_STALE_MINUTES -> ERROR_UNHANDLED;
+      - REQUEUED sem troca de status há mais de JOB_STALE_MINUTES (caiu de novo depois de
+        recuperado) -> ERROR_UNHANDLED: uma única nova tentativa por job. Os mais recentes podem
+        estar rodando em outro worker da API que acabou de subir; ficam para o próximo startup.
+    """
+    db = SessionLocal()
+    requeued = 0
+    try:
+        S = models.ServiceSubmission
+        E = models.SubmissionEvent
+        cutoff = datetime.utcnow() - timedelta(minutes=settings.JOB_STALE_MINUTES)
+        ultima_troca = (
+            select(func.max(E.created_at))
+            .where(E.submission_id == S.id, E.event_type == "STATUS_CHANGED")
+            .scalar_subquery()
+        )
+        perdidos = db.query(S.id).filter(S.status == "REQUEUED", ultima_troca < crud._ts(db, cutoff)).all()
+        for (sub_id,) in perdidos:
+            crud.claim_submission_status(db, sub_id, expected="REQUEUED", new_status="ERROR_UNHANDLED", message="Job interrompido de novo após ser recuperado")
+
+        pending = db.query(S).filter(S.service_type.in_(SPLIT_SERVICES), S.status.in_(RECOVERABLE_STATUS)).all()
+        for sub in pending:
+            if not sub.chave_txt_path or not Path(sub.chave_txt_path).exists():
+                bump_status(db, sub, "ERROR_UNHANDLED", message="Job interrompido sem TXT salvo")
+                continue
+            if crud.claim_submission_status(db, sub.id, expected=sub.status, new_status="REQUEUED", message="Job recuperado no startup"):
+                _submit_split(sub.id, sub.job_id, sub.chave_txt_path, sub.base_path, csv_path=sub.csv_path)
+                requeued += 1
+
+        stale = db.query(S).filter(S.status == "RECEIVED", S.created_at < cutoff).all()
+        for sub in stale:
+            crud.claim_submission_status(db, sub.id, expected="RECEIVED", new_status="ERROR_UNHANDLED", message="Submissão interrompida antes de salvar os arquivos")
+    finally:
+        db.close()
+    return requeued
@@ -1,8 +1,9 @@
 import os
-import shutil
 import requests
 from datetime import datetime
 
+from br.com.certacon.certabot.utils.chave_modelo import extract_model
+
 
 def processar_arquivo_txt(file, pasta_saida):
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -12,21 +13,13 @@ def processar_arquivo_txt(file, pasta_saida):
     os.makedirs(pasta_modelo_55, exist_ok=True)
     os.makedirs(pasta_modelo_65, exist_ok=True)
 
-    caminho_temporario = f"temp_{timestamp}.txt"
-    with open(caminho_temporario, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
-
-    chaves_modelo_55 = []
-    chaves_modelo_65 = []
-    with open(caminho_temporario, "r") as f:
-        for linha in f.readlines():
-            chave = linha.strip()
-            if len(chave) > 20:
-                modelo = chave[20:22]
-                if modelo == "55":
-                    chaves_modelo_55.append(chave)
-                elif modelo == "65":
-                    chaves_modelo_65.append(chave)
+    # lê direto do UploadFile, linha a linha (sem cópia temporária no CWD e sem readlines)
+    qtd = {"55": 0, "65": 0}
+    file.file.seek(0)
+    for linha in file.file:
+        modelo = extract_model(linha)
+        if modelo in qtd:
+            qtd[modelo] += 1
 
     caminho_modelo_55 = os.path.join(pasta_modelo_55, "modelo_55.txt")
     caminho_modelo_65 = os.path.join(pasta_modelo_65, "modelo_65.txt")
@@ -35,11 +28,11 @@ def processar_arquivo_txt(file, pasta_saida):
         "mensagem": "Separação concluída!",
         "timestamp": timestamp,
         "modelo_55": {
-            "qtd_chaves": len(chaves_modelo_55),
+            "qtd_chaves": qtd["55"],
             "download": None
         },
         "modelo_65": {
-            "qtd_chaves": len(chaves_modelo_65),
+            "qtd_chaves": qtd["65"],
             "download": None
         }
     }
@@ -69,7 +62,6 @@ def processar_arquivo_txt(file, pasta_saida):
     #         f.writelines([ch + "\n" for ch in chaves_modelo_65])
     #     links["modelo_65"]["download"] = f"/nfe-55-65/download/modelo_65/{timestamp}"
 
-    os.remove(caminho_temporario)
     return links
 
 
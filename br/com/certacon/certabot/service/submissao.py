@@ -0,0 +1,313 @@
+# br/com/certacon/certabot/service/submissao.py
+from __future__ import annotations
+from pathlib import Path
+from typing import Callable, List, Optional, Tuple, Union
+import asyncio
+import io
+import uuid
+import zipfile
+
+from fastapi import HTTPException, Request, UploadFile
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+
+from br.com.certacon.certabot.api.core.config import settings
+from br.com.certacon.certabot.db import crud_async
+from br.com.certacon.certabot.db.session import AsyncSessionLocal
+from br.com.certacon.certabot.service import job_runner
+from br.com.certacon.certabot.utils.ingest import StagedFile, ingest, ingest_upload
+from br.com.certacon.certabot.utils.fs import suffix
+from br.com.certacon.certabot.utils.model_guard import AdmissionGuard, AdmissionRejected, GuardLimits, enforce_model_counts
+from br.com.certacon.certabot.utils.placas import extrair_placas
+from br.com.certacon.certabot.utils.planilha_cfe import detectar_layout_upload
+from br.com.certacon.certabot.utils.validation import validate_senatran
+from br.com.certacon.certabot.utils.audit import AuditUnitOfWork, make_job_folder, start_submission_async
+
+# Pipeline comum dos submits com TXT de chaves (NFE/NFCE/CTE/CFE) e do SENATRAN.
+# A rota só persiste os insumos e responde 202; o split roda no job_runner.
+# O insumo grande pode vir de um upload retomável (StagedFile, já em disco na pasta do job).
+
+EXPECTED_MODEL = {"NFE": "55", "NFCE": "65", "CTE": "57", "CFE": "59"}
+
+
+def job_status_url(job_id: str) -> str:
+    return f"/mvp/jobs/{job_id}"
+
+
+def client_info(request: Request) -> tuple[str, str]:
+    ip = request.client.host if request.client else "-"
+    ua = request.headers.get("user-agent", "-")
+    return ip, ua
+
+
+async def submeter_chaves(
+    db: AsyncSession,
+    *,
+    request: Request,
+    user,
+    service: str,
+    validar: Callable[[], None],
+    chave_txt: Union[UploadFile, StagedFile],
+    pfx_file: UploadFile,
+    planilha_csv: Optional[UploadFile] = None,
+    job_id: Optional[str] = None,
+) -> dict:
+    """
+    Valida, grava (uma leitura por arquivo: disco + sha256 + tamanho + contagem por modelo),
+    aplica o model guard, registra os movimentos e enfileira o split.
+    A gravação roda no threadpool e o banco vai pela AsyncSession: nada prende o event loop.
+    A auditoria é acumulada num AuditUnitOfWork: no caminho feliz são 2 commits até o 202.
+    """
+    expected = EXPECTED_MODEL[service]
+    ip, ua = client_info(request)
+
+    # (1) criar job e submissão ANTES das validações (1 commit)
+    job_id, dest = make_job_folder(service, user.username, job_id)
+    sub = await start_submission_async(db, user=user, service=service, base_path=dest, ip=ip, ua=ua)
+    uow = AuditUnitOfWork(sub)
+
+    # (2) VALIDAÇÃO DE INSUMOS (CFE: coluna da chave na planilha_csv, lendo só o começo do upload)
+    layout = None
+    try:
+        validar()
+        if planilha_csv is not None:
+            layout = detectar_layout_upload(planilha_csv)
+    except HTTPException as e:
+        await uow.fail_async(db, status="REJECTED_VALIDATION", http_status=e.status_code, msg="Validation error", meta={"detail": e.detail}, detail=e.detail)
+
+    # (3) INGESTÃO do TXT (.txt.gz/.xz/.zip fica comprimido; a contagem descomprime em fluxo)
+    #     com o guard de admissão: tamanho declarado recusado antes de ler; limites e fail-fast
+    #     de modelo interrompem a leitura no meio
+    guard = AdmissionGuard.for_service(service, expected)
+    try:
+        guard.check_size(getattr(chave_txt, "size", None))
+        txt = await run_in_threadpool(ingest, chave_txt, dest / f"chaves{suffix(chave_txt)}", guard=guard)
+    except AdmissionRejected as e:
+        msg = "Model mismatch" if e.status == "REJECTED_MODEL_MISMATCH" else "Validation error"
+        meta = {"detail": e.detail, "lines_read": guard.lines, "bytes_read": guard.raw_bytes, "counts": guard.counts}
+        await uow.fail_async(db, status=e.status, http_status=e.status_code, msg=msg, meta=meta, detail=e.detail)
+    except HTTPException as e:
+        await uow.fail_async(db, status="REJECTED_VALIDATION", http_status=e.status_code, msg="Validation error", meta={"detail": e.detail}, detail=e.detail)
+    except Exception as e:
+        await uow.fail_async(db, status="ERROR_SAVE", http_status=500, msg="Falha ao salvar arquivos", meta={"error": str(e)})
+
+    # (4) ENFORCE MODELO (sobre as contagens da ingestão); recusado, o TXT sai da pasta do job
+    #     e o blob, sem nenhum link, fica para o gc do blob store
+    try:
+        enforce_model_counts(txt.counts, expected_model=expected)
+        meta = {"counts": txt.counts}
+        if txt.compression:
+            meta.update(compression=txt.compression, size_bytes=txt.size_bytes, raw_bytes=txt.raw_bytes)
+        uow.event("MODEL_ENFORCED", f"Modelo esperado: {expected}", meta)
+    except HTTPException as e:
+        Path(txt.path).unlink(missing_ok=True)
+        await uow.fail_async(db, status="REJECTED_MODEL_MISMATCH", http_status=e.status_code, msg="Model mismatch", meta={"detail": e.detail}, detail=e.detail)
+
+    # (5) SALVAR DEMAIS ARQUIVOS + MOVIMENTOS + QUEUED (1 commit)
+    try:
+        pfx = await run_in_threadpool(ingest_upload, pfx_file, dest / f"cert{suffix(pfx_file)}")
+        csv = None
+        if planilha_csv is not None:
+            csv = await run_in_threadpool(ingest_upload, planilha_csv, dest / f"planilha{suffix(planilha_csv)}")
+            uow.event("CSV_VALIDATED", "Coluna da chave na planilha_csv", layout.as_dict())
+
+        sub.chave_txt_path, sub.pfx_path = txt.path, pfx.path
+        uow.file(file_role="INPUT_TXT", path=Path(txt.path), size_bytes=txt.size_bytes, sha256=txt.sha256)
+        uow.file(file_role="INPUT_PFX", path=Path(pfx.path), size_bytes=pfx.size_bytes, sha256=pfx.sha256)
+        if csv is not None:
+            sub.csv_path = csv.path
+            uow.file(file_role="INPUT_CSV", path=Path(csv.path), size_bytes=csv.size_bytes, sha256=csv.sha256)
+        uow.status("FILES_SAVED")
+        uow.status("QUEUED", message="Split enfileirado")
+        await uow.flush_async(db)
+    except Exception as e:
+        await uow.fail_async(db, status="ERROR_SAVE", http_status=500, msg="Falha ao salvar arquivos", meta={"error": str(e)})
+
+    # (6) SPLIT -> pool de processos (só depois do QUEUED gravado, para o callback não ser sobrescrito)
+    try:
+        job_runner.enqueue_split(sub, sha256=txt.sha256, csv_sha256=csv.sha256 if csv is not None else None)
+    except Exception as e:
+        await uow.fail_async(db, status="ERROR_SPLIT", http_status=500, msg="Falha ao enfileirar split", meta={"error": str(e)})
+
+    return {
+        "message": "Submissão recebida",
+        "job_id": job_id,
+        "service_type": service,
+        "stored_at": str(dest),
+        "status": "QUEUED",
+        "status_url": job_status_url(job_id),
+        "user": user.username,
+    }
+
+
+async def submeter_senatran(
+    db: AsyncSession,
+    *,
+    request: Request,
+    user,
+    placa_xlsx: Union[UploadFile, StagedFile],
+    pfx_file: Optional[UploadFile],
+    pfx_password: Optional[str],
+    gov_cpf: Optional[str],
+    gov_password: Optional[str],
+    job_id: Optional[str] = None,
+) -> dict:
+    """
+    SENATRAN: valida planilha + método de autenticação, grava os insumos, extrai as placas da
+    planilha (placas.txt normalizado e sem repetidas; contagens no VALIDATED) e deixa o job READY.
+    Planilha ilegível ou sem nenhuma placa válida é recusada aqui, não no robô.
+    """
+    service = "SENATRAN"
+    ip, ua = client_info(request)
+
+    job_id, dest = make_job_folder(service, user.username, job_id)
+    sub = await start_submission_async(db, user=user, service=service, base_path=dest, ip=ip, ua=ua)
+    uow = AuditUnitOfWork(sub)
+
+    try:
+        validate_senatran(placa_xlsx=placa_xlsx, pfx_file=pfx_file, pfx_password=pfx_password, gov_cpf=gov_cpf, gov_password=gov_password)
+    except HTTPException as e:
+        await uow.fail_async(db, status="REJECTED_VALIDATION", http_status=e.status_code, msg="Validation error", meta={"detail": e.detail}, detail=e.detail)
+
+    try:
+        xlsx = await run_in_threadpool(ingest, placa_xlsx, dest / f"placas{suffix(placa_xlsx)}")
+    except Exception as e:
+        await uow.fail_async(db, status="ERROR_SAVE", http_status=500, msg="Falha ao salvar arquivos", meta={"error": str(e)})
+
+    # placas: leitura em fluxo da planilha já gravada
+    try:
+        max_linhas = GuardLimits.for_service(service).max_lines
+        placas = await run_in_threadpool(extrair_placas, Path(xlsx.path), dest, max_linhas=max_linhas, dedup_max=settings.SPLIT_DEDUP_MAX_KEYS)
+        if not placas["unicas"]:
+            raise HTTPException(400, detail=f"placa_xlsx: nenhuma placa válida (formatos ABC1234 / ABC1D23); {placas['invalidas']} inválida(s)")
+        uow.event("VALIDATED", "Planilha + método de autenticação ok", placas)
+    except HTTPException as e:
+        for recusado in (Path(xlsx.path), dest / "placas.txt", dest / "placas_rejeitadas.txt"):
+            recusado.unlink(missing_ok=True)
+        await uow.fail_async(db, status="REJECTED_VALIDATION", http_status=e.status_code, msg="Validation error", meta={"detail": e.detail}, detail=e.detail)
+
+    try:
+        pfx  = await run_in_threadpool(ingest_upload, pfx_file, dest / f"cert{suffix(pfx_file)}") if pfx_file else None
+        saved_xlsx = xlsx.path
+        saved_pfx  = pfx.path if pfx else None
+
+        sub.xlsx_path = saved_xlsx
+        sub.pfx_path  = saved_pfx
+        sub.gov_cpf   = gov_cpf
+
+        uow.file(file_role="INPUT_XLSX", path=Path(saved_xlsx), size_bytes=xlsx.size_bytes, sha256=xlsx.sha256)
+        if pfx:
+            uow.file(file_role="INPUT_PFX", path=Path(saved_pfx), size_bytes=pfx.size_bytes, sha256=pfx.sha256)
+        uow.file(file_role="PLACAS_TXT", path=Path(placas["path"]))
+        if placas["rejeitadas_path"]:
+            uow.file(file_role="PLACAS_REJEITADAS", path=Path(placas["rejeitadas_path"]))
+
+        uow.status("FILES_SAVED")
+        uow.status("READY", message="Aguardando processamento SENATRAN")
+        await uow.flush_async(db)
+    except Exception as e:
+        await uow.fail_async(db, status="ERROR_SAVE", http_status=500, msg="Falha ao salvar arquivos", meta={"error": str(e)})
+
+    return {
+        "message": "Submissão recebida",
+        "job_id": job_id,
+        "service_type": service,
+        "stored_at": str(dest),
+        "status": "READY",
+        "status_url": job_status_url(job_id),
+        "user": user.username,
+    }
+
+
+def _zip_members(zf: zipfile.ZipFile) -> List[Tuple[str, UploadFile]]:
+    # cada .txt do ZIP vira um UploadFile lido direto do arquivo compactado (sem extrair para disco);
+    # o ZipFile serializa o acesso ao arquivo por baixo, então membros podem ser lidos em paralelo
+    out = []
+    for info in zf.infolist():
+        if info.is_dir() or info.filename.startswith("__MACOSX/"):
+            continue
+        out.append((info.filename, UploadFile(zf.open(info), filename=Path(info.filename).name, size=info.file_size)))
+    return out
+
+
+async def _registrar_erro(job_id: str, e: Exception) -> None:
+    # erro fora dos caminhos previstos do pipeline: o texto vai para a trilha, não para o cliente
+    try:
+        async with AsyncSessionLocal() as db:
+            sub = await crud_async.get_submission_by_job_id(db, job_id)
+            if sub is None:
+                return
+            uow = AuditUnitOfWork(sub)
+            uow.event("ERROR", "Erro inesperado no lote", {"error": f"{e.__class__.__name__}: {e}"})
+            uow.status("ERROR_UNHANDLED", message="Erro inesperado no lote")
+            await uow.flush_async(db)
+    except Exception:
+        pass
+
+
+async def submeter_lote(
+    *,
+    request: Request,
+    user,
+    service: str,
+    validar: Callable[[UploadFile, UploadFile], None],
+    chave_txts: Optional[List[UploadFile]],
+    zip_file: Optional[UploadFile],
+    pfx_file: UploadFile,
+) -> dict:
+    """
+    Vários TXT (multipart e/ou um ZIP) com o mesmo PFX: uma submissão por arquivo, cada uma pelo
+    pipeline de `submeter_chaves` com sessão própria, no máximo BATCH_MAX_PARALLEL ao mesmo tempo.
+    Erro num arquivo não derruba os demais: o resultado traz status_code/detail por arquivo.
+    O PFX é lido uma vez; o blob store grava um único conteúdo para todos os jobs.
+    """
+    itens: List[Tuple[str, UploadFile]] = [(up.filename or "", up) for up in chave_txts or []]
+    zf = None
+    try:
+        if zip_file is not None:
+            if Path(zip_file.filename or "").suffix.lower() != ".zip":
+                raise HTTPException(400, detail=f"{service}: zip_file deve ser um arquivo .zip")
+            try:
+                zf = await run_in_threadpool(zipfile.ZipFile, zip_file.file)
+            except zipfile.BadZipFile:
+                raise HTTPException(400, detail=f"{service}: zip_file inválido")
+            itens += _zip_members(zf)
+        if not itens:
+            raise HTTPException(400, detail=f"{service}: envie ao menos um TXT (chave_txts) ou um ZIP (zip_file)")
+        if len(itens) > settings.BATCH_MAX_FILES:
+            raise HTTPException(400, detail=f"{service}: no máximo {settings.BATCH_MAX_FILES} arquivos por lote (recebidos {len(itens)})")
+
+        pfx_bytes = await pfx_file.read() if pfx_file else b""
+        sem = asyncio.Semaphore(settings.BATCH_MAX_PARALLEL)
+
+        async def um(nome: str, txt: UploadFile) -> dict:
+            pfx = UploadFile(io.BytesIO(pfx_bytes), filename=pfx_file.filename if pfx_file else None, size=len(pfx_bytes))
+            job_id = str(uuid.uuid4())  # conhecido aqui para auditar o erro inesperado
+            async with sem, AsyncSessionLocal() as db:
+                try:
+                    out = await submeter_chaves(
+                        db, request=request, user=user, service=service,
+                        validar=lambda: validar(txt, pfx),
+                        chave_txt=txt, pfx_file=pfx, job_id=job_id,
+                    )
+                except HTTPException as e:
+                    return {"filename": nome, "status_code": e.status_code, "detail": str(e.detail)}
+                except Exception as e:
+                    await _registrar_erro(job_id, e)
+                    return {"filename": nome, "status_code": 500, "detail": "Internal Server Error"}
+            return {"filename": nome, "status_code": 202, "job_id": out["job_id"], "status": out["status"], "status_url": out["status_url"]}
+
+        resultados = await asyncio.gather(*(um(nome, txt) for nome, txt in itens))
+    finally:
+        if zf is not None:
+            zf.close()
+
+    aceitos = sum(1 for r in resultados if r["status_code"] == 202)
+    return {
+        "service_type": service,
+        "total": len(resultados),
+        "accepted": aceitos,
+        "rejected": len(resultados) - aceitos,
+        "user": user.username,
+        "results": resultados,
+    }
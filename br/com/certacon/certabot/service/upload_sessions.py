@@ -0,0 +1,453 @@
+# br/com/certacon/certabot/service/upload_sessions.py
+"""
+Upload retomável dos insumos grandes (chave_txt dos serviços de chaves, placa_xlsx do SENATRAN).
+
+    POST   /mvp/uploads                    abre a sessão (serviço, nome, tamanho) e reserva a pasta do job
+    PUT    /mvp/uploads/{id}?offset=N      grava o corpo a partir de N (qualquer ordem, reenvio idempotente)
+    GET    /mvp/uploads/{id}               intervalos recebidos / faltantes
+    POST   /mvp/uploads/{id}/finalize      demais campos do submit (PFX, senha, CSV...) -> pipeline normal
+
+Os pedaços vão direto para <pasta do job>/upload/<id>.part, na posição certa. O sha256 avança
+sobre o prefixo contíguo conforme os pedaços chegam (relendo do page cache só o trecho novo), então
+no finalize o hash já está pronto; o arquivo montado vira blob por link, sem cópia (ingest_staged).
+Expiradas (UPLOAD_SESSION_TTL_HOURS) são limpas com:
+    python -m br.com.certacon.certabot.service.upload_sessions gc
+"""
+from __future__ import annotations
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import AsyncIterator, Dict, List, Optional
+import asyncio
+import hashlib
+import shutil
+import sys
+import threading
+import uuid
+
+from fastapi import HTTPException, Request, UploadFile
+from sqlalchemy import delete, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+from starlette.concurrency import run_in_threadpool
+
+from br.com.certacon.certabot.api.core.config import settings
+from br.com.certacon.certabot.db import crud, models
+from br.com.certacon.certabot.service.submissao import submeter_chaves, submeter_senatran
+from br.com.certacon.certabot.utils.audit import make_job_folder
+from br.com.certacon.certabot.utils.compressao import KEY_EXTENSIONS, key_suffix
+from br.com.certacon.certabot.utils.ingest import StagedFile
+from br.com.certacon.certabot.utils.model_guard import GuardLimits
+from br.com.certacon.certabot.utils.planilha_cfe import detectar_layout_upload
+from br.com.certacon.certabot.utils.validation import validate_cfe, validate_nfe_like, validate_senatran
+
+U = models.UploadSession
+
+# campo do submit que a sessão substitui, por serviço
+SESSION_FIELD = {"NFE": "chave_txt", "NFCE": "chave_txt", "CTE": "chave_txt", "CFE": "chave_txt", "SENATRAN": "placa_xlsx"}
+ALLOWED_EXT = {"chave_txt": KEY_EXTENSIONS, "placa_xlsx": (".xlsx",)}
+WRITE_BUFFER = 1024 * 1024
+
+
+# ---------------------------------------------------------------- intervalos [início, fim)
+
+def merge_range(ranges: List[List[int]], start: int, end: int) -> List[List[int]]:
+    out: List[List[int]] = []
+    for s, e in sorted([*(tuple(r) for r in ranges), (start, end)]):
+        if out and s <= out[-1][1]:
+            out[-1][1] = max(out[-1][1], e)
+        else:
+            out.append([s, e])
+    return out
+
+
+def missing_ranges(ranges: List[List[int]], size: int) -> List[List[int]]:
+    out, pos = [], 0
+    for s, e in ranges:
+        if s > pos:
+            out.append([pos, s])
+        pos = max(pos, e)
+    if pos < size:
+        out.append([pos, size])
+    return out
+
+
+def contiguous_end(ranges: List[List[int]]) -> int:
+    return ranges[0][1] if ranges and ranges[0][0] == 0 else 0
+
+
+# ---------------------------------------------------------------- sha256 incremental
+
+@dataclass
+class _Hasher:
+    h: "hashlib._Hash" = field(default_factory=hashlib.sha256)
+    pos: int = 0
+    lock: threading.Lock = field(default_factory=threading.Lock)
+    versao: int = 0  # versão da sessão após o último _record deste processo; -1 = houve gravação fora dele
+    escrevendo: int = 0  # PUTs deste processo com o .part aberto
+
+    def reset(self) -> None:
+        with self.lock:
+            self.h, self.pos = hashlib.sha256(), 0
+
+
+_hashers: Dict[str, _Hasher] = {}
+_hashers_lock = threading.Lock()
+
+
+def _hasher(upload_id: str) -> _Hasher:
+    # por processo: se outro worker da API gravou pedaços desta sessão, `versao` não bate com a
+    # da sessão e o finalize refaz o hash do .part inteiro
+    with _hashers_lock:
+        return _hashers.setdefault(upload_id, _Hasher())
+
+
+def _advance(hs: _Hasher, path: Path, upto: int) -> None:
+    """
+    Leva o hash até `upto` (fim do prefixo contíguo). Reenvio sobre trecho já hasheado zera o
+    hash antes (write_chunk), para o digest nunca divergir do arquivo.
+    """
+    with hs.lock:
+        if hs.pos >= upto:
+            return
+        with open(path, "rb") as f:
+            f.seek(hs.pos)
+            while hs.pos < upto:
+                b = f.read(min(WRITE_BUFFER, upto - hs.pos))
+                if not b:
+                    break
+                hs.h.update(b)
+                hs.pos += len(b)
+
+
+# ---------------------------------------------------------------- sessão
+
+def part_path(up: models.UploadSession) -> Path:
+    return Path(up.base_path) / "upload" / f"{up.id}.part"
+
+
+def expires_at(up: models.UploadSession) -> datetime:
+    created = up.created_at.replace(tzinfo=None) if up.created_at else datetime.utcnow()
+    return created + timedelta(hours=settings.UPLOAD_SESSION_TTL_HOURS)
+
+
+def to_out(up: models.UploadSession) -> dict:
+    received = up.received or []
+    return {
+        "upload_id": up.id,
+        "job_id": up.job_id,
+        "service_type": up.service_type,
+        "field": SESSION_FIELD[up.service_type],
+        "filename": up.filename,
+        "size_bytes": up.size_bytes,
+        "received": received,
+        "received_bytes": sum(e - s for s, e in received),
+        "missing": missing_ranges(received, up.size_bytes),
+        "complete": contiguous_end(received) >= up.size_bytes,
+        "status": up.status,
+        "expires_at": expires_at(up).isoformat(timespec="seconds") + "Z",
+    }
+
+
+def _create_part(path: Path, size: int) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "wb") as f:
+        f.truncate(size)  # esparso: os PUTs só escrevem nas posições
+
+
+async def create(db: AsyncSession, *, user, service: str, filename: str, size_bytes: int) -> models.UploadSession:
+    campo = SESSION_FIELD[service]
+    ext = key_suffix(filename)
+    if ext not in ALLOWED_EXT[campo]:
+        raise HTTPException(400, detail=f"{campo}: extensão inválida '{ext}'. Permitidas: {sorted(ALLOWED_EXT[campo])}")
+    if not 0 < size_bytes <= settings.UPLOAD_SESSION_MAX_BYTES:
+        raise HTTPException(400, detail=f"size_bytes deve estar entre 1 e {settings.UPLOAD_SESSION_MAX_BYTES}")
+    if campo == "chave_txt":
+        # limite do guard de admissão já na abertura: nem começa um upload que seria recusado
+        max_bytes = GuardLimits.for_service(service).max_bytes
+        if size_bytes > max_bytes:
+            raise HTTPException(413, detail=f"TXT com {size_bytes} bytes excede o limite de {max_bytes} bytes")
+
+    job_id, dest = make_job_folder(service, user.username)
+    up = U(
+        id=uuid.uuid4().hex, user_id=user.id, service_type=service, job_id=job_id, base_path=str(dest),
+        filename=Path(filename).name, size_bytes=size_bytes, received=[], version=0, status="OPEN",
+    )
+    await run_in_threadpool(_create_part, part_path(up), size_bytes)
+    db.add(up)
+    await db.commit()
+    await db.refresh(up)
+    return up
+
+
+async def get_owned(db: AsyncSession, upload_id: str, user) -> models.UploadSession:
+    up = await db.get(U, upload_id)
+    if up is None or (user.role != "admin" and up.user_id != user.id):
+        raise HTTPException(404, detail="Sessão de upload não encontrada")
+    return up
+
+
+def _synced(up: models.UploadSession, **values) -> None:
+    # espelha no objeto o que o UPDATE gravou, sem marcá-lo como alterado na sessão
+    for k, v in values.items():
+        set_committed_value(up, k, v)
+
+
+def _require_open(up: models.UploadSession) -> None:
+    if up.status == "FINALIZING":
+        raise HTTPException(409, detail="Sessão de upload em finalização")
+    if up.status != "OPEN":
+        raise HTTPException(409, detail="Sessão de upload já finalizada")
+    if datetime.utcnow() >= expires_at(up):
+        raise HTTPException(410, detail="Sessão de upload expirada")
+
+
+async def _record(db: AsyncSession, up: models.UploadSession, start: int, end: int) -> None:
+    # compare-and-set na versão: PUTs paralelos (inclusive em outro worker) não se sobrescrevem
+    hs = _hasher(up.id)
+    while True:
+        ranges = merge_range(up.received or [], start, end)
+        res = await db.execute(
+            update(U).where(U.id == up.id, U.version == up.version, U.status == "OPEN")
+            .values(received=ranges, version=up.version + 1)
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+        if res.rowcount:
+            hs.versao = up.version + 1 if hs.versao == up.version else -1
+            _synced(up, received=ranges, version=up.version + 1)
+            return
+        await db.refresh(up)
+        _require_open(up)
+
+
+async def _check_open(db: AsyncSession, up: models.UploadSession) -> None:
+    # antes de cada escrita física: com a sessão em finalização o .part pode já ser o blob
+    status = (await db.execute(select(U.status).where(U.id == up.id))).scalar_one()
+    if status != "OPEN":
+        _synced(up, status=status)
+        _require_open(up)
+
+
+def _open_at(path: Path, offset: int):
+    f = open(path, "r+b")
+    f.seek(offset)
+    return f
+
+
+async def write_chunk(db: AsyncSession, up: models.UploadSession, offset: int, body: AsyncIterator[bytes]) -> None:
+    """
+    Grava o corpo em `offset`. O que chegou até uma queda de conexão (ou até estourar o limite)
+    é registrado mesmo assim: o cliente retoma a partir dos intervalos faltantes.
+    """
+    _require_open(up)
+    if not 0 <= offset < up.size_bytes:
+        raise HTTPException(416, detail=f"offset fora do arquivo (0..{up.size_bytes - 1})")
+    limite = min(up.size_bytes - offset, settings.UPLOAD_CHUNK_MAX_BYTES)
+
+    path = part_path(up)
+    hs = _hasher(up.id)
+    hs.escrevendo += 1
+    f = await run_in_threadpool(_open_at, path, offset)
+    written = 0
+    buf = bytearray()
+    try:
+        async for piece in body:
+            if written + len(buf) + len(piece) > limite:
+                if offset + written + len(buf) + len(piece) > up.size_bytes:
+                    raise HTTPException(416, detail=f"pedaço ultrapassa o tamanho declarado ({up.size_bytes} bytes)")
+                raise HTTPException(413, detail=f"pedaço maior que {settings.UPLOAD_CHUNK_MAX_BYTES} bytes")
+            buf += piece
+            if len(buf) >= WRITE_BUFFER:
+                await _check_open(db, up)
+                await run_in_threadpool(f.write, buf)
+                written += len(buf)
+                buf = bytearray()
+    finally:
+        try:
+            if buf:
+                await _check_open(db, up)
+                await run_in_threadpool(f.write, buf)
+                written += len(buf)
+        finally:
+            await run_in_threadpool(f.close)
+            hs.escrevendo -= 1
+        if written:
+            if offset < hs.pos:
+                hs.reset()  # trecho já hasheado foi regravado
+            await _record(db, up, offset, offset + written)
+            await run_in_threadpool(_advance, hs, path, contiguous_end(up.received))
+
+
+def _validar_campos(
+    up: models.UploadSession,
+    staged: StagedFile,
+    *,
+    pfx_file: Optional[UploadFile],
+    pfx_password: Optional[str],
+    planilha_csv: Optional[UploadFile],
+    gov_cpf: Optional[str],
+    gov_password: Optional[str],
+) -> None:
+    # os mesmos validadores do submit, antes de fechar a sessão: campo faltando ou errado não
+    # custa o upload, o cliente corrige e chama o finalize de novo
+    service = up.service_type
+    if service == "SENATRAN":
+        validate_senatran(placa_xlsx=staged, pfx_file=pfx_file, pfx_password=pfx_password, gov_cpf=gov_cpf, gov_password=gov_password)
+    elif service == "CFE":
+        validate_cfe(chave_txt=staged, pfx_file=pfx_file, pfx_password=pfx_password, planilha_csv=planilha_csv)
+        detectar_layout_upload(planilha_csv)
+    else:
+        validate_nfe_like(service, chave_txt=staged, pfx_file=pfx_file, pfx_password=pfx_password)
+
+
+async def _set_status(db: AsyncSession, up: models.UploadSession, expected: str, new: str, **values) -> bool:
+    res = await db.execute(
+        update(U).where(U.id == up.id, U.version == up.version, U.status == expected)
+        .values(status=new, version=up.version + 1, **values)
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    if res.rowcount:
+        _synced(up, status=new, version=up.version + 1, **values)
+    return bool(res.rowcount)
+
+
+async def _reabrir(db: AsyncSession, up: models.UploadSession) -> None:
+    """
+    Submissão recusada com o .part ainda inteiro (ex.: guard de admissão): a sessão volta a OPEN
+    numa pasta de job nova — a antiga fica com a submissão recusada — e o cliente pode tentar de novo.
+    """
+    antiga = Path(up.base_path)
+    job_id = str(uuid.uuid4())
+    nova = antiga.parent / job_id
+    await run_in_threadpool(_mover_upload, antiga / "upload", nova / "upload")
+    await _set_status(db, up, "FINALIZING", "OPEN", job_id=job_id, base_path=str(nova))
+
+
+def _mover_upload(src: Path, dst: Path) -> None:
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    shutil.move(str(src), str(dst))
+
+
+async def finalize(
+    db: AsyncSession,
+    up: models.UploadSession,
+    *,
+    request: Request,
+    user,
+    sha256: Optional[str],
+    pfx_file: Optional[UploadFile],
+    pfx_password: Optional[str],
+    planilha_csv: Optional[UploadFile],
+    gov_cpf: Optional[str],
+    gov_password: Optional[str],
+) -> dict:
+    """
+    Arquivo completo -> mesmo pipeline do submit do serviço, na pasta do job reservada na abertura.
+    OPEN -> FINALIZING (nenhum PUT grava mais) -> FINALIZED quando o .part foi consumido pela
+    ingestão; recusa com o .part intacto reabre a sessão (ver _reabrir).
+    """
+    _require_open(up)
+    falta = missing_ranges(up.received or [], up.size_bytes)
+    if falta:
+        raise HTTPException(409, detail={"message": "Upload incompleto", "missing": falta[:100]})
+
+    path = part_path(up)
+    staged = StagedFile(path=path, filename=up.filename, size=up.size_bytes)
+    _validar_campos(up, staged, pfx_file=pfx_file, pfx_password=pfx_password, planilha_csv=planilha_csv, gov_cpf=gov_cpf, gov_password=gov_password)
+
+    hs = _hasher(up.id)
+    inteiro = hs.versao == up.version  # todas as gravações passaram por este processo
+    if not await _set_status(db, up, "OPEN", "FINALIZING"):
+        raise HTTPException(409, detail="Sessão de upload alterada durante o finalize; tente de novo")
+    while hs.escrevendo:
+        await asyncio.sleep(0.01)  # PUT em curso para na próxima escrita (_check_open)
+
+    if not inteiro:
+        hs.reset()
+    await run_in_threadpool(_advance, hs, path, up.size_bytes)
+    digest = hs.h.hexdigest()
+    if sha256 and sha256.lower() != digest:
+        await _set_status(db, up, "FINALIZING", "OPEN")
+        raise HTTPException(400, detail=f"sha256 não confere: recebido {digest}")
+    staged.sha256 = digest
+
+    service = up.service_type
+    try:
+        if service == "SENATRAN":
+            out = await submeter_senatran(
+                db, request=request, user=user, placa_xlsx=staged, pfx_file=pfx_file, pfx_password=pfx_password,
+                gov_cpf=gov_cpf, gov_password=gov_password, job_id=up.job_id,
+            )
+        else:
+            if service == "CFE":
+                validar = lambda: validate_cfe(chave_txt=staged, pfx_file=pfx_file, pfx_password=pfx_password, planilha_csv=planilha_csv)
+            else:
+                validar = lambda: validate_nfe_like(service, chave_txt=staged, pfx_file=pfx_file, pfx_password=pfx_password)
+            out = await submeter_chaves(
+                db, request=request, user=user, service=service, validar=validar,
+                chave_txt=staged, pfx_file=pfx_file, planilha_csv=planilha_csv if service == "CFE" else None, job_id=up.job_id,
+            )
+    except Exception:
+        if path.exists():
+            await _reabrir(db, up)
+            raise
+        await _encerrar(db, up)
+        raise
+    await _encerrar(db, up)
+    return out
+
+
+async def _encerrar(db: AsyncSession, up: models.UploadSession) -> None:
+    # o .part já virou blob: a pasta de upload não serve mais
+    await _set_status(db, up, "FINALIZING", "FINALIZED")
+    with _hashers_lock:
+        _hashers.pop(up.id, None)
+    await run_in_threadpool(shutil.rmtree, part_path(up).parent, True)
+
+
+async def abort(db: AsyncSession, up: models.UploadSession) -> None:
+    _require_open(up)
+    await db.execute(delete(U).where(U.id == up.id))
+    await db.commit()
+    with _hashers_lock:
+        _hashers.pop(up.id, None)
+    await run_in_threadpool(shutil.rmtree, up.base_path, True)
+
+
+def gc(db: Session) -> Dict[str, int]:
+    """
+    Sessões vencidas: abertas perdem a pasta do job (nada foi submetido nela); em finalização, só
+    o .part; finalizadas só a linha (a pasta é do job).
+    """
+    cutoff = crud._ts(db, datetime.utcnow() - timedelta(hours=settings.UPLOAD_SESSION_TTL_HOURS))
+    abertas = db.execute(select(U.id, U.base_path).where(U.status == "OPEN", U.created_at < cutoff)).all()
+    for _, base in abertas:
+        shutil.rmtree(base, ignore_errors=True)
+    # FINALIZING vencida: o processo caiu no meio do finalize; a pasta pode já ter a submissão
+    for (base,) in db.execute(select(U.base_path).where(U.status == "FINALIZING", U.created_at < cutoff)).all():
+        shutil.rmtree(Path(base) / "upload", ignore_errors=True)
+    removidas = db.execute(delete(U).where(U.created_at < cutoff)).rowcount
+    db.commit()
+    return {"open_removed": len(abertas), "rows_removed": removidas}
+
+
+def main(argv=None) -> None:
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] != ["gc"]:
+        print("uso: python -m br.com.certacon.certabot.service.upload_sessions gc")
+        sys.exit(2)
+    from br.com.certacon.certabot.db.base import Base
+    from br.com.certacon.certabot.db.session import engine, SessionLocal
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        print(gc(db))
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
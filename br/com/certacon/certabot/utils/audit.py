@@ -4,36 +4,50 @@ from pathlib import Path
 import uuid
 from typing import Optional, Dict, Any
 from fastapi import HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from br.com.certacon.certabot.api.core.config import settings
-from br.com.certacon.certabot.db import crud
+from br.com.certacon.certabot.db import crud, models
 from br.com.certacon.certabot.utils.filemeta import file_sha256, file_size, guess_mime
 
-def make_job_folder(service: str, username: str) -> tuple[str, Path]:
-    job_id = str(uuid.uuid4())
+def make_job_folder(service: str, username: str, job_id: Optional[str] = None) -> tuple[str, Path]:
+    # job_id já existente: pasta reservada antes (upload retomável)
+    job_id = job_id or str(uuid.uuid4())
     dest = Path(settings.UPLOAD_DIR) / service / username / job_id
     dest.mkdir(parents=True, exist_ok=True)
     return job_id, dest
 
-def start_submission(db: Session, *, user, service: str, base_path: Path, ip: str = "-", ua: str = "-"):
-    sub = crud.create_submission(
-        db,
+def _new_submission(*, user, service: str, base_path: Path) -> models.ServiceSubmission:
+    return models.ServiceSubmission(
         job_id=base_path.name,
         user_id=user.id,
         service_type=service,
         base_path=str(base_path),
-        chave_txt_path=None,
-        pfx_path=None,
-        csv_path=None,
-        xlsx_path=None,
-        gov_cpf=None,
+        status="RECEIVED",
     )
-    crud.create_submission_event(
-        db,
-        submission_id=sub.id, job_id=sub.job_id, user_id=sub.user_id, service_type=service,
-        event_type="SUBMISSION_CREATED", message=f"IP={ip}", meta={"user_agent": ua},
+
+def _created_event(sub, *, ip: str, ua: str) -> models.SubmissionEvent:
+    return models.SubmissionEvent(
+        submission_id=sub.id, job_id=sub.job_id, user_id=sub.user_id, service_type=sub.service_type,
+        event_type="SUBMISSION_CREATED", message=f"IP={ip}", meta=crud._meta_to_text({"user_agent": ua}),
     )
+
+def start_submission(db: Session, *, user, service: str, base_path: Path, ip: str = "-", ua: str = "-"):
+    # submissão + SUBMISSION_CREATED numa única transação (flush só para obter o id)
+    sub = _new_submission(user=user, service=service, base_path=base_path)
+    db.add(sub)
+    db.flush()
+    db.add(_created_event(sub, ip=ip, ua=ua))
+    db.commit()
+    return sub
+
+async def start_submission_async(db: AsyncSession, *, user, service: str, base_path: Path, ip: str = "-", ua: str = "-"):
+    sub = _new_submission(user=user, service=service, base_path=base_path)
+    db.add(sub)
+    await db.flush()
+    db.add(_created_event(sub, ip=ip, ua=ua))
+    await db.commit()
     return sub
 
 def log_event(db: Session, sub, *, event_type: str, message: str = "", meta: Dict[str, Any] | None = None):
@@ -46,23 +60,79 @@ def log_event(db: Session, sub, *, event_type: str, message: str = "", meta: Dic
 def bump_status(db: Session, sub, new_status: str, *, message: str = "", meta: Dict[str, Any] | None = None):
     crud.update_submission_status(db, sub.id, new_status, message=message, meta=meta)
 
-def raise_and_log(db: Session, sub, *, status: str, event_type: str, http_status: int, msg: str, meta: Dict[str, Any] | None = None):
-    log_event(db, sub, event_type=event_type, message=msg, meta=meta)
-    bump_status(db, sub, status, message=msg, meta=meta)
-    raise HTTPException(status_code=http_status, detail=msg)
-
-def record_file_movement(db: Session, sub, *, file_role: str, path: Path):
-    try:
-        crud.create_file_movement(
-            db,
-            submission_id=sub.id,
-            job_id=sub.job_id,
-            file_role=file_role,
-            file_name=path.name,
-            file_path=str(path),
-            mime_type=guess_mime(path),
-            size_bytes=file_size(path),
-            sha256=file_sha256(path),
-        )
-    except Exception:
-        pass
+
+class AuditUnitOfWork:
+    """
+    Acumula eventos, trocas de status e movimentos de arquivo de uma submissão e grava
+    tudo numa única transação por etapa (`flush`/`flush_async`), em vez de um commit por linha.
+      - a troca de status usa o status em memória da submissão como "from" (sem SELECT);
+      - `fail`/`fail_async` registram o erro, gravam o que estava pendente e levantam HTTPException
+        (com `detail` quando o cliente precisa do motivo completo; `msg` é o rótulo curto da trilha).
+    Uso: uow.event(...); uow.file(...); uow.status("FILES_SAVED"); uow.flush(db)
+    """
+    def __init__(self, sub):
+        self.sub = sub
+        # cópia dos campos usados nas linhas de auditoria: continuam válidos mesmo após um rollback
+        self._ids = dict(submission_id=sub.id, job_id=sub.job_id, user_id=sub.user_id, service_type=sub.service_type)
+        self._status = sub.status
+        self._pending: list = []
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def event(self, event_type: str, message: str = "", meta: Dict[str, Any] | None = None) -> None:
+        self._pending.append(models.SubmissionEvent(**self._ids, event_type=event_type, message=message, meta=crud._meta_to_text(meta)))
+
+    def status(self, new_status: str, *, message: str = "", meta: Dict[str, Any] | None = None) -> None:
+        old, self._status = self._status, new_status
+        self.sub.status = new_status
+        self._pending.append(self.sub)
+        self._pending.append(models.SubmissionEvent(
+            **self._ids, event_type="STATUS_CHANGED", message=message or f"{old} -> {new_status}",
+            meta=meta or {"from": old, "to": new_status},
+        ))
+
+    def file(self, *, file_role: str, path: Path, size_bytes: Optional[int] = None, sha256: Optional[str] = None) -> None:
+        ids = self._ids
+        self._pending.append(models.FileMovement(
+            submission_id=ids["submission_id"], job_id=ids["job_id"], file_role=file_role,
+            file_name=path.name, file_path=str(path), mime_type=guess_mime(path),
+            size_bytes=size_bytes if size_bytes is not None else file_size(path),
+            sha256=sha256 or file_sha256(path),
+        ))
+
+    def _take(self) -> list:
+        pending, self._pending = self._pending, []
+        return pending
+
+    def flush(self, db: Session) -> None:
+        pending = self._take()
+        if pending:
+            db.add_all(pending)
+            try:
+                db.commit()
+            except Exception:
+                db.rollback()
+                raise
+
+    async def flush_async(self, db: AsyncSession) -> None:
+        pending = self._take()
+        if pending:
+            db.add_all(pending)
+            try:
+                await db.commit()
+            except Exception:
+                await db.rollback()
+                raise
+
+    def fail(self, db: Session, *, status: str, http_status: int, msg: str, meta: Dict[str, Any] | None = None, event_type: str = "ERROR", detail: Any = None):
+        self.event(event_type, msg, meta)
+        self.status(status, message=msg, meta=meta)
+        self.flush(db)
+        raise HTTPException(status_code=http_status, detail=msg if detail is None else detail)
+
+    async def fail_async(self, db: AsyncSession, *, status: str, http_status: int, msg: str, meta: Dict[str, Any] | None = None, event_type: str = "ERROR", detail: Any = None):
+        self.event(event_type, msg, meta)
+        self.status(status, message=msg, meta=meta)
+        await self.flush_async(db)
+        raise HTTPException(status_code=http_status, detail=msg if detail is None else detail)
@@ -0,0 +1,72 @@
+# br/com/certacon/certabot/utils/blobstore.py
+"""
+Armazenamento endereçado por conteúdo dos insumos enviados (TXT, PFX, planilhas).
+
+Cada conteúdo é gravado uma única vez em UPLOAD_DIR/_blobs/ab/cd/<sha256>; a pasta do job
+recebe um hardlink para o blob (mesmo inode, nenhum byte a mais). Onde o hardlink não é
+possível (outro volume, FS sem suporte) cai para cópia — funciona igual, só não economiza.
+As referências ficam em `content_blobs` (db/blobs.py).
+"""
+from __future__ import annotations
+from pathlib import Path
+import os
+import shutil
+import uuid
+
+from br.com.certacon.certabot.api.core.config import settings
+
+
+def blob_dir() -> Path:
+    return Path(settings.UPLOAD_DIR) / "_blobs"
+
+
+def blob_path(sha256: str) -> Path:
+    return blob_dir() / sha256[:2] / sha256[2:4] / sha256
+
+
+def temp_path() -> Path:
+    # no mesmo volume dos blobs: a promoção para blob é um link/rename, sem copiar
+    tmp = blob_dir() / "tmp"
+    tmp.mkdir(parents=True, exist_ok=True)
+    return tmp / uuid.uuid4().hex
+
+
+def put(tmp: Path, sha256: str) -> tuple[Path, bool]:
+    """
+    Promove `tmp` (já com o hash calculado) a blob. Retorna (blob, reused): se o conteúdo
+    já existia, `tmp` é descartado. Duas gravações simultâneas do mesmo conteúdo: o link
+    é atômico, quem chega depois reaproveita o blob do primeiro.
+    """
+    blob = blob_path(sha256)
+    blob.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        os.link(tmp, blob)
+        reused = False
+    except FileExistsError:
+        reused = True
+    except OSError:
+        # FS sem hardlink: rename (se outro já gravou, fica o dele)
+        reused = blob.exists()
+        if not reused:
+            os.replace(tmp, blob)
+            return blob, False
+    tmp.unlink(missing_ok=True)
+    return blob, reused
+
+
+def link(blob: Path, dst: Path) -> bool:
+    """
+    Materializa o blob em `dst` (hardlink; cópia se não der). Retorna True se linkou.
+    Aceita str: também serve de `copy_function` do shutil.copytree.
+    """
+    blob, dst = Path(blob), Path(dst)
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        os.link(blob, dst)
+        return True
+    except FileExistsError:
+        dst.unlink()
+        return link(blob, dst)
+    except OSError:
+        shutil.copyfile(blob, dst)
+        return False
@@ -0,0 +1,140 @@
+# br/com/certacon/certabot/utils/chave_acesso.py
+from __future__ import annotations
+from collections import Counter
+from math import log
+from operator import mul
+from typing import Any, Dict, Tuple
+
+from br.com.certacon.certabot.utils.chave_modelo import _model_at, digits_only
+
+# Layout da chave de acesso (44 dígitos) — NF-e/NFC-e/CT-e; no CF-e-SAT as posições 22:43
+# têm outro significado (nº de série do SAT, nº do CF-e), mas cUF/AAMM/CNPJ/mod/cDV coincidem.
+CAMPOS: Dict[str, Tuple[int, int]] = {
+    "cUF":    (0, 2),
+    "AAMM":   (2, 6),
+    "CNPJ":   (6, 20),
+    "mod":    (20, 22),
+    "serie":  (22, 25),
+    "nNF":    (25, 34),
+    "tpEmis": (34, 35),
+    "cNF":    (35, 43),
+    "cDV":    (43, 44),
+}
+
+# pesos do módulo 11: 2..9 da direita para a esquerda sobre os 43 primeiros dígitos
+_PESOS = bytes(2 + (42 - i) % 8 for i in range(43))
+# a soma é feita direto sobre os códigos ASCII; desconta-se 48 * peso de cada posição
+_OFFSET_ASCII = 48 * sum(_PESOS)
+
+MOTIVOS = ("formato", "modelo", "dv")
+
+# campos usados nos histogramas do ChaveStats
+_UF, _AAMM, _CNPJ = (slice(*CAMPOS[c]) for c in ("cUF", "AAMM", "CNPJ"))
+
+# emitentes distintos depois do teto do ChaveStats: linear counting num bitmap de 2**23 bits (1 MB)
+_BITS = 1 << 23
+
+
+def dv_ok(chave: bytes) -> bool:
+    """
+    Confere o dígito verificador (módulo 11) de uma chave de 44 dígitos ASCII.
+    A soma ponderada roda inteira em C (map/sum sobre os bytes).
+    """
+    resto = (sum(map(mul, _PESOS, chave)) - _OFFSET_ASCII) % 11
+    dv = 0 if resto < 2 else 11 - resto
+    return chave[43] - 48 == dv
+
+
+def classificar(linha: bytes) -> Tuple[bytes, str | None, str | None]:
+    """
+    Normaliza e valida uma linha já sem espaços nas pontas.
+    Retorna (chave_44_digitos, modelo, motivo_rejeicao) — motivo None quando válida.
+    """
+    chave = linha if len(linha) == 44 and linha.isdigit() else digits_only(linha)
+    if len(chave) != 44:
+        return chave, None, "formato"
+    modelo = _model_at(chave)
+    if modelo is None:
+        return chave, None, "modelo"
+    if not dv_ok(chave):
+        return chave, modelo, "dv"
+    return chave, modelo, None
+
+
+class ChaveStats:
+    """
+    Histogramas por UF, mês (AAMM) e emitente (CNPJ) das chaves válidas de um job,
+    mais a contagem de rejeições por motivo. `as_dict()` vai para o meta do SPLIT_DONE.
+
+    Emitentes: no máximo `max_emitentes` contadores (Misra-Gries). Até o teto as contagens e o
+    nº de distintos são exatos; passado o teto, o top sai com contagens por baixo (erro máximo
+    em `emitentes_erro_max`) e os distintos estimados por linear counting.
+    """
+    def __init__(self, top_emitentes: int = 50, max_emitentes: int = 20_000):
+        self.top_emitentes = top_emitentes
+        self.max_emitentes = max_emitentes
+        self.validas = 0
+        self.por_uf: Counter = Counter()
+        self.por_aamm: Counter = Counter()
+        self.por_emitente: Counter = Counter()
+        self.rejeitadas: Counter = Counter()
+        self._descontado = 0
+        self._bits: bytearray | None = None
+
+    def add(self, chave: bytes) -> None:
+        self.validas += 1
+        self.por_uf[chave[_UF]] += 1
+        self.por_aamm[chave[_AAMM]] += 1
+        cnpj = chave[_CNPJ]
+        emit = self.por_emitente
+        if cnpj in emit or len(emit) < self.max_emitentes:
+            emit[cnpj] += 1
+        else:
+            self._cheio()
+        if self._bits is not None:
+            h = hash(cnpj) & (_BITS - 1)
+            self._bits[h >> 3] |= 1 << (h & 7)
+
+    def _cheio(self) -> None:
+        # emitente novo com a tabela cheia: desconta 1 de todos (ele incluso) e libera os zerados;
+        # o custo total dos descontos é limitado pelo nº de chaves
+        if self._bits is None:
+            # até aqui nada saiu da tabela: ela tem todos os distintos vistos
+            self._bits = bytearray(_BITS >> 3)
+            for c in self.por_emitente:
+                h = hash(c) & (_BITS - 1)
+                self._bits[h >> 3] |= 1 << (h & 7)
+        self._descontado += 1
+        self.por_emitente = Counter({c: n - 1 for c, n in self.por_emitente.items() if n > 1})
+
+    def _distintos(self) -> int:
+        if self._bits is None:
+            return len(self.por_emitente)
+        zeros = _BITS - bin(int.from_bytes(self._bits, "big")).count("1")
+        return round(_BITS * log(_BITS / max(zeros, 1)))
+
+    def reset_validas(self) -> None:
+        self.validas = 0
+        self.por_uf.clear()
+        self.por_aamm.clear()
+        self.por_emitente.clear()
+        self._descontado = 0
+        self._bits = None
+
+    def reject(self, motivo: str) -> None:
+        self.rejeitadas[motivo] += 1
+
+    def as_dict(self) -> Dict[str, Any]:
+        def _txt(c: Counter) -> Dict[str, int]:
+            return {k.decode("ascii"): v for k, v in sorted(c.items())}
+        return {
+            "validas": self.validas,
+            "rejeitadas": sum(self.rejeitadas.values()),
+            "rejeitadas_por_motivo": {m: self.rejeitadas.get(m, 0) for m in MOTIVOS},
+            "por_uf": _txt(self.por_uf),
+            "por_aamm": _txt(self.por_aamm),
+            "emitentes_distintos": self._distintos(),
+            "emitentes_aproximado": self._bits is not None,
+            "emitentes_erro_max": self._descontado,
+            "por_emitente_top": {k.decode("ascii"): v for k, v in self.por_emitente.most_common(self.top_emitentes)},
+        }
@@ -0,0 +1,37 @@
+# br/com/certacon/certabot/utils/chave_modelo.py
+from __future__ import annotations
+from typing import Dict
+
+# Extração do modelo (posições 20:22) direto dos bytes da linha, sem decodificar
+# e sem montar string caractere a caractere. Compartilhado entre o model guard e o splitter.
+
+MODEL_BY_CODE: Dict[int, str] = {55: "55", 65: "65", 57: "57", 59: "59"}
+
+_NON_DIGITS = bytes(b for b in range(256) if not 48 <= b <= 57)
+
+
+def digits_only(line: bytes) -> bytes:
+    """
+    Remove tudo que não for dígito ASCII (bytes.translate, em C).
+    """
+    return line.translate(None, _NON_DIGITS)
+
+
+def _model_at(s: bytes) -> str | None:
+    return MODEL_BY_CODE.get((s[20] - 48) * 10 + s[21] - 48)
+
+
+def extract_model(line: bytes) -> str | None:
+    """
+    Extrai '55'|'65'|'57'|'59' da linha (bytes).
+      - caminho rápido: chave limpa com 44 dígitos -> lê as posições 20:22 direto;
+      - fallback: linha "suja" -> filtra os dígitos via translate e lê 20:22.
+    Ignora linhas curtas (< 22 dígitos) e modelos desconhecidos.
+    """
+    s = line.strip()
+    if len(s) == 44 and s.isdigit():
+        return _model_at(s)
+    s = digits_only(s)
+    if len(s) < 22:
+        return None
+    return _model_at(s)
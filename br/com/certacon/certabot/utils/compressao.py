@@ -0,0 +1,141 @@
+# br/com/certacon/certabot/utils/compressao.py
+"""
+TXT de chaves comprimido (.txt.gz, .zip, .xz): o arquivo é guardado como veio (comprimido) e
+descomprimido em fluxo por quem precisa das linhas — a contagem por modelo na ingestão e o
+splitter. O TXT descomprimido nunca é gravado em disco.
+"""
+from __future__ import annotations
+from pathlib import Path
+from typing import BinaryIO, Iterator, Optional
+import gzip
+import io
+import lzma
+import zipfile
+import zlib
+
+from fastapi import HTTPException
+
+KEY_EXTENSIONS = (".txt", ".txt.gz", ".gz", ".txt.xz", ".xz", ".zip")
+KINDS = {".gz": "gzip", ".xz": "xz", ".zip": "zip"}
+READ_BUFFER = 1024 * 1024
+# teto de saída por chamada ao descompressor: um chunk pequeno que infla muito não vira um bloco gigante
+MAX_OUT = 8 * 1024 * 1024
+
+
+def key_suffix(name: str) -> str:
+    """
+    Extensão em lower case, composta quando o TXT vem comprimido ('chaves.TXT.GZ' -> '.txt.gz').
+    """
+    suffixes = [s.lower() for s in Path(name).suffixes]
+    if len(suffixes) >= 2 and suffixes[-2] == ".txt" and suffixes[-1] in (".gz", ".xz"):
+        return suffixes[-2] + suffixes[-1]
+    return suffixes[-1] if suffixes else ""
+
+
+def kind_of(name) -> Optional[str]:
+    """
+    'gzip' | 'xz' | 'zip' pela extensão; None para texto puro.
+    """
+    return KINDS.get(Path(str(name)).suffix.lower())
+
+
+def _invalid(kind: str, motivo: str) -> HTTPException:
+    return HTTPException(status_code=400, detail=f"chave_txt: arquivo {kind} inválido ({motivo})")
+
+
+def _zip_member(zf: zipfile.ZipFile) -> zipfile.ZipInfo:
+    membros = [i for i in zf.infolist() if not i.is_dir() and not i.filename.startswith("__MACOSX/")]
+    if len(membros) != 1:
+        raise _invalid("zip", f"deve conter exatamente um TXT, encontrados {len(membros)}")
+    return membros[0]
+
+
+def open_keys(path: Path, kind: Optional[str] = None) -> BinaryIO:
+    """
+    Abre o TXT de chaves para leitura binária linha a linha, descomprimindo em fluxo conforme a
+    extensão (ou `kind`, quando o caminho não tem extensão — ex.: temporário da ingestão).
+    """
+    kind = kind or kind_of(path)
+    if kind == "gzip":
+        return gzip.open(path, "rb")
+    if kind == "xz":
+        return lzma.open(path, "rb")
+    if kind == "zip":
+        zf = zipfile.ZipFile(path)
+        try:
+            membro = zf.open(_zip_member(zf))
+        finally:
+            zf.close()  # o arquivo só fecha de fato quando o membro for fechado
+        return io.BufferedReader(membro, READ_BUFFER)
+    return open(path, "rb", buffering=READ_BUFFER)
+
+
+def inflate_file(path: Path, kind: str, chunk_size: int = READ_BUFFER) -> Iterator[bytes]:
+    """
+    Conteúdo descomprimido de um arquivo já em disco, em blocos; erro de formato vira 400.
+    """
+    try:
+        with open_keys(path, kind) as f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+    except (zipfile.BadZipFile, zlib.error, lzma.LZMAError, EOFError, NotImplementedError) as e:
+        raise _invalid(kind, str(e))
+
+
+class Inflater:
+    """
+    Descompressão incremental (gzip/xz) de chunks que chegam do upload: `feed` devolve os
+    pedaços descomprimidos, `close` confere se o fluxo terminou. Aceita vários membros
+    concatenados (gzip -c a b > c.gz; xz idem), como o gzip.open/lzma.open.
+    ZIP não entra aqui: o diretório central fica no fim, precisa do arquivo inteiro.
+    """
+    def __init__(self, kind: str):
+        self.kind = kind
+        self.raw_bytes = 0
+        self._d = self._novo()
+
+    def _novo(self):
+        # wbits 16+MAX_WBITS: cabeçalho gzip
+        return zlib.decompressobj(16 + zlib.MAX_WBITS) if self.kind == "gzip" else lzma.LZMADecompressor()
+
+    def _inflate(self, data: bytes) -> bytes:
+        try:
+            out = self._d.decompress(data, MAX_OUT)
+        except (zlib.error, lzma.LZMAError) as e:
+            raise _invalid(self.kind, str(e))
+        self.raw_bytes += len(out)
+        return out
+
+    def feed(self, chunk: bytes) -> Iterator[bytes]:
+        data = chunk
+        while True:
+            if self._d.eof:
+                # próximo membro; zeros de preenchimento no fim são tolerados (como no gzip.open)
+                data = self._d.unused_data + data
+                if self.kind == "gzip":
+                    data = data.lstrip(b"\0")
+                if not data:
+                    return
+                self._d = self._novo()
+            out = self._inflate(data)
+            if out:
+                yield out
+            if self._d.eof:
+                data = b""
+                continue
+            # saída limitada por MAX_OUT: gzip devolve a entrada que sobrou, xz a retém internamente
+            if self.kind == "gzip":
+                data = self._d.unconsumed_tail
+                if not data:
+                    return
+            else:
+                if self._d.needs_input:
+                    return
+                data = b""
+
+    def close(self) -> None:
+        if not self._d.eof:
+            raise _invalid(self.kind, "arquivo truncado")
@@ -0,0 +1,72 @@
+# br/com/certacon/certabot/utils/extsort.py
+from __future__ import annotations
+from itertools import islice
+from pathlib import Path
+from typing import Callable, Optional, Tuple
+import heapq
+import os
+import tempfile
+
+BUFFER = 1024 * 1024
+
+
+def sort_file(
+    src: Path,
+    dst: Path,
+    *,
+    chunk_lines: int,
+    unique: bool = False,
+    on_line: Optional[Callable[[bytes], None]] = None,
+) -> Tuple[int, int]:
+    """
+    Ordenação externa (sort/merge em disco) das linhas de `src`, gravando em `dst`.
+      - Lê no máximo `chunk_lines` linhas por vez, ordena em memória e grava um "run" temporário;
+      - faz o merge dos runs com heapq.merge (memória ~ 1 linha por run);
+      - `unique=True` descarta linhas repetidas (iguais byte a byte);
+      - `on_line` é chamado para cada linha gravada (ex.: recalcular estatísticas no mesmo passe).
+    `src` e `dst` podem ser o mesmo arquivo. Retorna (linhas_lidas, linhas_gravadas).
+    """
+    dst = Path(dst)
+    runs = []
+    total = 0
+    try:
+        with open(src, "rb") as f:
+            while True:
+                chunk = list(islice(f, chunk_lines))
+                if not chunk:
+                    break
+                total += len(chunk)
+                if not chunk[-1].endswith(b"\n"):
+                    chunk[-1] += b"\n"
+                chunk.sort()
+                fd, run_path = tempfile.mkstemp(dir=dst.parent, prefix=f".{dst.name}.", suffix=".run")
+                runs.append(run_path)
+                with os.fdopen(fd, "wb", buffering=BUFFER) as run:
+                    run.writelines(chunk)
+                del chunk
+
+        written = 0
+        tmp_out = dst.with_name(f".{dst.name}.sorting")
+        files = [open(r, "rb", buffering=BUFFER) for r in runs]
+        try:
+            with open(tmp_out, "wb", buffering=BUFFER) as out:
+                prev = None
+                for line in heapq.merge(*files):
+                    if unique and line == prev:
+                        continue
+                    prev = line
+                    out.write(line)
+                    written += 1
+                    if on_line is not None:
+                        on_line(line)
+        finally:
+            for fh in files:
+                fh.close()
+        os.replace(tmp_out, dst)
+        return total, written
+    finally:
+        for r in runs:
+            try:
+                os.remove(r)
+            except OSError:
+                pass
@@ -4,6 +4,10 @@ from pathlib import Path
 from typing import Optional, Dict, Any
 import shutil
 
+from br.com.certacon.certabot.api.core.config import settings
+from br.com.certacon.certabot.utils import split_cache
+from br.com.certacon.certabot.utils.compressao import key_suffix
+from br.com.certacon.certabot.utils.filemeta import file_sha256
 from br.com.certacon.certabot.utils.separar_modelos_nfe import processar_arquivo_txt_sem_enviar
 
 
@@ -20,12 +24,13 @@ def svc_name(service_type) -> str:
 def suffix(file) -> str:
     """
     Retorna o sufixo (extensão) do UploadFile/Path-like já em lower case, ou '' se vazio.
+    TXT comprimido mantém a extensão composta ('.txt.gz', '.txt.xz').
     """
     try:
         name = getattr(file, "filename", None) or getattr(file, "name", None) or ""
     except Exception:
         name = ""
-    return Path(name).suffix.lower() if name else ""
+    return key_suffix(name) if name else ""
 
 
 def run_separator_using_jobid(
@@ -33,22 +38,53 @@ def run_separator_using_jobid(
     path_txt: Path,
     folder_base: Path,
     job_id: str,
+    dedup_max_keys: Optional[int] = None,
+    particionar: Optional[bool] = None,
+    shard_size: Optional[int] = None,
+    comprimir: Optional[bool] = None,
+    sha256: Optional[str] = None,
+    usar_cache: Optional[bool] = None,
+    path_csv: Optional[Path] = None,
+    csv_sha256: Optional[str] = None,
 ) -> Dict[str, Any]:
     """
     Executa a separação de chaves (tua função) e readequa a estrutura de saída para usar o `job_id`
     no nome da pasta final, além de reescrever os links/paths retornados.
 
     Fluxo:
+      0) Cache (SPLIT_CACHE): mesmo TXT (sha256) + mesma versão/opções (+ mesma planilha do CFE)
+         -> linka a saída já pronta e retorna
       1) Roda `processar_arquivo_txt_sem_enviar(path_txt, split_root)` -> cria split_root/{timestamp}/...
+         (CFE: `path_csv` é conciliado com as chaves no mesmo passe, ver utils/planilha_cfe.py)
       2) Move split_root/{timestamp} -> folder_base/{job_id}
       3) Reescreve os campos 'download' e 'path' para refletirem o {job_id}
+      4) Publica a saída no cache
     """
+    chave_cache = None
+    if settings.SPLIT_CACHE if usar_cache is None else usar_cache:
+        chave_cache = split_cache.cache_key(
+            sha256 or file_sha256(Path(path_txt)),
+            dedup_max_keys=dedup_max_keys or settings.SPLIT_DEDUP_MAX_KEYS,
+            particionar=settings.SPLIT_PARTITION if particionar is None else particionar,
+            shard_size=shard_size or settings.SPLIT_SHARD_SIZE,
+            comprimir=settings.SPLIT_GZIP if comprimir is None else comprimir,
+            csv=(csv_sha256 or file_sha256(Path(path_csv))) if path_csv else None,
+        )
+        cached = split_cache.load(chave_cache, folder_base / job_id, job_id)
+        if cached is not None:
+            return {"ok": True, "job_id": job_id, "split_dir": str(folder_base), "Resultado": cached, "cache": {"hit": True, "key": chave_cache}}
+
     split_root = folder_base / "split_wip"
     split_root.mkdir(parents=True, exist_ok=True)
 
     result: Dict[str, Any] = processar_arquivo_txt_sem_enviar(
         path_txt=Path(path_txt),
         pasta_saida=split_root,
+        dedup_max_keys=dedup_max_keys,
+        particionar=particionar,
+        shard_size=shard_size,
+        comprimir=comprimir,
+        path_csv=Path(path_csv) if path_csv else None,
     )
 
     ts: Optional[str] = result.get("timestamp")
@@ -76,15 +112,27 @@ def run_separator_using_jobid(
     def _rewrite_path(p: Optional[str]) -> Optional[str]:
         if not isinstance(p, str) or not p:
             return p
+        old_prefix = src.as_posix()
+        if p.startswith(old_prefix):
+            return dst.as_posix() + p[len(old_prefix):]
         return p.replace(ts, job_id)
 
-    for key in ("modelo_55", "modelo_65", "modelo_57"):
+    for key in ("modelo_55", "modelo_65", "modelo_57", "modelo_59", "rejeitadas", "manifest"):
         block = result.get(key)
         if isinstance(block, dict):
-            block["download"] = _rewrite_download(block.get("download"))
+            if "download" in block:
+                block["download"] = _rewrite_download(block.get("download"))
             block["path"] = _rewrite_path(block.get("path"))
+            if block.get("gz_path"):
+                block["gz_path"] = _rewrite_path(block["gz_path"])
             result[key] = block
 
+    conciliacao = result.get("conciliacao")
+    if isinstance(conciliacao, dict):
+        for block in conciliacao.values():
+            if isinstance(block, dict) and "path" in block:
+                block["path"] = _rewrite_path(block.get("path"))
+
     result["timestamp"] = job_id
 
     try:
@@ -93,4 +141,8 @@ def run_separator_using_jobid(
     except Exception:
         pass
 
-    return {"ok": True, "job_id": job_id, "split_dir": str(folder_base), "Resultado": result}
+    out = {"ok": True, "job_id": job_id, "split_dir": str(folder_base), "Resultado": result}
+    if chave_cache:
+        split_cache.store(chave_cache, dst, result, job_id)
+        out["cache"] = {"hit": False, "key": chave_cache}
+    return out
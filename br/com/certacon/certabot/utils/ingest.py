@@ -0,0 +1,152 @@
+# br/com/certacon/certabot/utils/ingest.py
+from __future__ import annotations
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Optional, Union
+import hashlib
+from fastapi import UploadFile
+
+from br.com.certacon.certabot.utils import blobstore
+from br.com.certacon.certabot.utils.compressao import Inflater, inflate_file, kind_of
+from br.com.certacon.certabot.utils.filemeta import file_sha256
+from br.com.certacon.certabot.utils.model_guard import AdmissionGuard, ModelCounter
+
+CHUNK_SIZE = 1024 * 1024
+
+
+@dataclass
+class IngestResult:
+    path: str
+    size_bytes: int
+    sha256: str
+    counts: Optional[Dict[str, int]] = None
+    reused: bool = False     # conteúdo já estava no blob store (nenhum byte novo em disco)
+    linked: bool = True      # `path` é hardlink do blob (False = cópia)
+    compression: Optional[str] = None   # gzip | xz | zip: guardado comprimido
+    raw_bytes: Optional[int] = None     # tamanho descomprimido (só com compressão + count_models)
+
+
+@dataclass
+class StagedFile:
+    """
+    Insumo já montado em disco (upload retomável) no lugar de um UploadFile. `filename` é o nome
+    original (validação de extensão); `sha256`, quando conhecido, evita reler o arquivo só pelo hash.
+    """
+    path: Path
+    filename: str
+    size: int
+    sha256: Optional[str] = None
+
+
+def ingest_upload(
+    up: UploadFile,
+    dst: Path,
+    *,
+    count_models: bool = False,
+    guard: Optional[AdmissionGuard] = None,
+    chunk_size: int = CHUNK_SIZE,
+) -> IngestResult:
+    """
+    Lê o UploadFile UMA única vez e distribui cada chunk para:
+      - um arquivo temporário do blob store;
+      - o sha256;
+      - o contador de bytes;
+      - (opcional) o contador de chaves por modelo (55/65/57/59).
+    Com o hash pronto, o conteúdo vira blob (ou reaproveita o existente) e `dst` é um hardlink
+    para ele. O resultado alimenta o model guard e o `AuditUnitOfWork.file` sem reler o arquivo.
+
+    TXT comprimido (extensão de `dst`): grava-se o comprimido; a contagem recebe os chunks já
+    descomprimidos em fluxo (gzip/xz). ZIP só é legível com o arquivo inteiro: conta-se ao final,
+    relendo o temporário comprimido. Arquivo comprimido corrompido -> HTTPException 400.
+
+    Com `guard` (AdmissionGuard) a contagem também aplica os limites de admissão: uma recusa
+    interrompe a leitura na hora e o temporário é descartado.
+    """
+    h = hashlib.sha256()
+    size = 0
+    counter = guard if guard is not None else ModelCounter() if count_models else None
+    kind = kind_of(dst) if counter is not None else None
+    inflater = Inflater(kind) if kind in ("gzip", "xz") else None
+    raw_bytes = None
+
+    tmp = blobstore.temp_path()
+    try:
+        up.file.seek(0)
+        with open(tmp, "wb") as f:
+            while True:
+                chunk = up.file.read(chunk_size)
+                if not chunk:
+                    break
+                f.write(chunk)
+                h.update(chunk)
+                size += len(chunk)
+                if inflater is not None:
+                    for raw in inflater.feed(chunk):
+                        counter.feed(raw)
+                elif counter is not None and kind is None:
+                    counter.feed(chunk)
+        if inflater is not None:
+            inflater.close()
+            raw_bytes = inflater.raw_bytes
+        elif kind == "zip":
+            raw_bytes = 0
+            for raw in inflate_file(tmp, kind):
+                counter.feed(raw)
+                raw_bytes += len(raw)
+        sha256 = h.hexdigest()
+        blob, reused = blobstore.put(tmp, sha256)
+    finally:
+        tmp.unlink(missing_ok=True)
+    linked = blobstore.link(blob, dst)
+
+    return IngestResult(
+        path=str(dst),
+        size_bytes=size,
+        sha256=sha256,
+        counts=counter.close() if counter is not None else None,
+        reused=reused,
+        linked=linked,
+        compression=kind,
+        raw_bytes=raw_bytes,
+    )
+
+
+def ingest_staged(
+    staged: StagedFile,
+    dst: Path,
+    *,
+    count_models: bool = False,
+    guard: Optional[AdmissionGuard] = None,
+    chunk_size: int = CHUNK_SIZE,
+) -> IngestResult:
+    """
+    Promove o arquivo montado a blob por link/rename (sem copiar os bytes); `staged.path` deixa de
+    existir. Só relê o conteúdo para a contagem por modelo e, se faltar, para o sha256.
+    """
+    sha256 = staged.sha256 or file_sha256(staged.path, chunk_size)
+    counter = guard if guard is not None else ModelCounter() if count_models else None
+    kind = raw_bytes = None
+    if counter is not None:
+        kind = kind_of(dst)
+        raw_bytes = 0
+        for chunk in inflate_file(staged.path, kind, chunk_size):
+            counter.feed(chunk)
+            raw_bytes += len(chunk)
+    blob, reused = blobstore.put(staged.path, sha256)
+    linked = blobstore.link(blob, dst)
+    return IngestResult(
+        path=str(dst),
+        size_bytes=staged.size,
+        sha256=sha256,
+        counts=counter.close() if counter is not None else None,
+        reused=reused,
+        linked=linked,
+        compression=kind,
+        raw_bytes=raw_bytes if kind else None,
+    )
+
+
+def ingest(up: Union[UploadFile, StagedFile], dst: Path, *, count_models: bool = False, guard: Optional[AdmissionGuard] = None) -> IngestResult:
+    if isinstance(up, StagedFile):
+        return ingest_staged(up, dst, count_models=count_models, guard=guard)
+    return ingest_upload(up, dst, count_models=count_models, guard=guard)
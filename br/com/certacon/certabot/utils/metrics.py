@@ -1,20 +1,50 @@
 from __future__ import annotations
 from typing import Optional, Sequence, Dict, Any, List, Tuple
-from datetime import datetime, timedelta
-from sqlalchemy.orm import Session
-from sqlalchemy import func, cast, Date, and_
-from br.com.certacon.certabot.db import models
+from datetime import date, datetime, timedelta
+from collections import Counter
+from sqlalchemy.orm import Session, joinedload
+from br.com.certacon.certabot.db import crud, models
 
-def _date_filters(since: Optional[str], until: Optional[str], days: Optional[int]):
-    where = []
+# Totais, por status/serviço e volumetria saem de `submission_daily_rollup` (db/rollup.py):
+# o custo depende do nº de dias × serviços × status no intervalo, não do histórico de submissões.
+# Só a lista "last" consulta service_submissions.
+
+def _day(d: Optional[str]) -> Optional[date]:
+    return date.fromisoformat(d[:10]) if d else None
+
+def _date_filters(db: Session, since: Optional[str], until: Optional[str], days: Optional[int]):
+    # mesmo intervalo semiaberto da busca (crud._date_range), com o bind no formato do SQLite
+    start = (datetime.utcnow() - timedelta(days=days)).date() if days and not since and not until else _day(since)
+    return crud._date_range(db, models.ServiceSubmission.created_at, start, _day(until))
+
+def _last_submissions(qbase, limit_last: int) -> List[Dict[str, Any]]:
+    if limit_last <= 0:
+        return []
+    # usuário carregado no mesmo SELECT (JOIN): sem uma consulta extra por linha
+    rows = qbase.options(joinedload(models.ServiceSubmission.user)) \
+                .order_by(models.ServiceSubmission.created_at.desc()).limit(limit_last).all()
+    return [{
+        "job_id": s.job_id,
+        "service_type": s.service_type,
+        "status": s.status,
+        "created_at": s.created_at.isoformat() if s.created_at else "",
+        "user": s.user.username if s.user else ""
+    } for s in rows]
+
+def _rollup_rows(db: Session, *, service: Optional[str], since: Optional[str], until: Optional[str], days: Optional[int], status: Optional[str]):
+    R = models.SubmissionDailyRollup
+    q = db.query(R.day, R.service_type, R.status, R.count).filter(R.count != 0)
+    if service:
+        q = q.filter(R.service_type == service)
     if days and not since and not until:
-        start = (datetime.utcnow() - timedelta(days=days)).date()
-        where.append(models.ServiceSubmission.created_at >= start)
+        q = q.filter(R.day >= (datetime.utcnow() - timedelta(days=days)).date().isoformat())
     if since:
-        where.append(models.ServiceSubmission.created_at >= since)
+        q = q.filter(R.day >= since[:10])
     if until:
-        where.append(models.ServiceSubmission.created_at < f"{until} 23:59:59.999")
-    return where
+        q = q.filter(R.day <= until[:10])
+    if status:
+        q = q.filter(R.status == status)
+    return q.all()
 
 def service_metrics(
     db: Session, service: str, *,
@@ -22,33 +52,25 @@ def service_metrics(
     status: Optional[str], limit_last: int = 10
 ) -> Dict[str, Any]:
     qbase = db.query(models.ServiceSubmission).filter(models.ServiceSubmission.service_type == service)
-    for cond in _date_filters(since, until, days):
+    for cond in _date_filters(db, since, until, days):
         qbase = qbase.filter(cond)
     if status:
         qbase = qbase.filter(models.ServiceSubmission.status == status)
 
-    total = qbase.with_entities(func.count(models.ServiceSubmission.id)).scalar() or 0
+    by_status: Counter = Counter()
+    by_day: Counter = Counter()
+    for d, _svc, st, c in _rollup_rows(db, service=service, since=since, until=until, days=days, status=status):
+        by_status[st or ""] += c
+        by_day[d] += c
+    total = sum(by_status.values())
+    volumetry = [{"date": d, "count": int(c)} for d, c in sorted(by_day.items())]
 
-    rows = qbase.with_entities(models.ServiceSubmission.status, func.count()).group_by(models.ServiceSubmission.status).all()
-    by_status = {s or "": int(c) for s, c in rows}
-
-    day = cast(models.ServiceSubmission.created_at, Date).label("day")
-    vrows = qbase.with_entities(day, func.count()).group_by(day).order_by(day).all()
-    volumetry = [{"date": d.isoformat(), "count": int(c)} for d, c in vrows]
-
-    lastq = qbase.order_by(models.ServiceSubmission.created_at.desc()).limit(limit_last).all()
-    last = [{
-        "job_id": s.job_id,
-        "service_type": s.service_type,
-        "status": s.status,
-        "created_at": s.created_at.isoformat() if s.created_at else "",
-        "user": s.user.username if s.user else ""
-    } for s in lastq]
+    last = _last_submissions(qbase, limit_last)
 
     return {
         "service_type": service,
         "total": int(total),
-        "by_status": by_status,
+        "by_status": dict(by_status),
         "volumetry": volumetry,
         "last": last,
     }
@@ -59,38 +81,27 @@ def global_metrics(
     status: Optional[str], limit_last: int = 20
 ) -> Dict[str, Any]:
     qbase = db.query(models.ServiceSubmission)
-    for cond in _date_filters(since, until, days):
+    for cond in _date_filters(db, since, until, days):
         qbase = qbase.filter(cond)
     if status:
         qbase = qbase.filter(models.ServiceSubmission.status == status)
 
-    total = qbase.with_entities(func.count(models.ServiceSubmission.id)).scalar() or 0
-
-    br = qbase.with_entities(models.ServiceSubmission.service_type, func.count()).group_by(models.ServiceSubmission.service_type).all()
-    by_service = {svc: int(c) for svc, c in br}
-
-    bs = qbase.with_entities(models.ServiceSubmission.status, func.count()).group_by(models.ServiceSubmission.status).all()
-    by_status = {s or "": int(c) for s, c in bs}
+    by_service: Counter = Counter()
+    by_status: Counter = Counter()
+    by_day_service: Counter = Counter()
+    for d, svc, st, c in _rollup_rows(db, service=None, since=since, until=until, days=days, status=status):
+        by_service[svc] += c
+        by_status[st or ""] += c
+        by_day_service[(d, svc)] += c
+    total = sum(by_status.values())
+    volumetry = [{"date": d, "service_type": svc, "count": int(c)} for (d, svc), c in sorted(by_day_service.items())]
 
-    day = cast(models.ServiceSubmission.created_at, Date).label("day")
-    vv = qbase.with_entities(day, models.ServiceSubmission.service_type, func.count()) \
-              .group_by(day, models.ServiceSubmission.service_type) \
-              .order_by(day, models.ServiceSubmission.service_type).all()
-    volumetry = [{"date": d.isoformat(), "service_type": svc, "count": int(c)} for d, svc, c in vv]
-
-    lastq = qbase.order_by(models.ServiceSubmission.created_at.desc()).limit(limit_last).all()
-    last = [{
-        "job_id": s.job_id,
-        "service_type": s.service_type,
-        "status": s.status,
-        "created_at": s.created_at.isoformat() if s.created_at else "",
-        "user": s.user.username if s.user else ""
-    } for s in lastq]
+    last = _last_submissions(qbase, limit_last)
 
     return {
         "total": int(total),
-        "by_service": by_service,
-        "by_status": by_status,
+        "by_service": dict(by_service),
+        "by_status": dict(by_status),
         "volumetry": volumetry,
         "last": last,
     }
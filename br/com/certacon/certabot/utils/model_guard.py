@@ -1,6 +1,10 @@
 from __future__ import annotations
-from typing import Dict, Iterable, Tuple
-from fastapi import HTTPException, UploadFile
+from dataclasses import dataclass
+from typing import Dict, Iterable, Optional, Tuple
+from fastapi import HTTPException
+
+from br.com.certacon.certabot.api.core.config import settings
+from br.com.certacon.certabot.utils.chave_modelo import extract_model
 
 MODEL_META: Dict[str, Tuple[str, str]] = {
     "55": ("NFE",  "/mvp/nfe/submit"),
@@ -14,39 +18,63 @@ def _extract_model(chave: str) -> str | None:
     Extrai '55'|'65'|'57'|'59' da chave (posições 20:22).
     Ignora linhas curtas e caracteres não numéricos.
     """
-    s = "".join(ch for ch in chave.strip() if ch.isdigit())
-    if len(s) < 22:
-        return None
-    m = s[20:22]
-    return m if m in MODEL_META else None
-
-def _iter_lines(up: UploadFile):
-    pos = up.file.tell()
-    up.file.seek(0)
-    try:
-        for raw in up.file:
-            try:
-                yield raw.decode("utf-8", errors="ignore")
-            except AttributeError:
-                yield raw
-    finally:
-        up.file.seek(pos)
-
-def count_models_from_txt_upload(chave_txt: UploadFile) -> Dict[str, int]:
-    counts = {"55": 0, "65": 0, "57": 0, "59": 0}
-    for line in _iter_lines(chave_txt):
-        model = _extract_model(line)
-        if model in counts:
-            counts[model] += 1
-    return counts
-
-def enforce_expected_model(chave_txt: UploadFile, expected_model: str) -> None:
+    return extract_model(chave.encode("utf-8", errors="ignore"))
+
+class ModelCounter:
+    """
+    Conta chaves por modelo a partir de chunks de bytes (linhas podem quebrar entre chunks).
+    Usado pelo pipeline de ingestão para contar no mesmo passe em que grava o arquivo.
+    """
+    def __init__(self):
+        self.counts: Dict[str, int] = {"55": 0, "65": 0, "57": 0, "59": 0}
+        self._tail = b""
+
+    def _count_line(self, raw: bytes) -> None:
+        model = extract_model(raw)
+        if model is not None:
+            self.counts[model] += 1
+
+    def feed(self, chunk: bytes) -> None:
+        lines = (self._tail + chunk).split(b"\n")
+        self._tail = lines.pop()
+        for raw in lines:
+            self._count_line(raw)
+
+    def close(self) -> Dict[str, int]:
+        if self._tail:
+            self._count_line(self._tail)
+            self._tail = b""
+        return self.counts
+
+def _mismatch_detail(counts: Dict[str, int], expected_model: str) -> str:
+    ok = counts.get(expected_model, 0)
+    others = {m: c for m, c in counts.items() if m != expected_model and c > 0}
+    service_name, this_endpoint = MODEL_META[expected_model]
+    parts = [f"Modelo {expected_model}: {ok}"]
+    parts.extend([f"Modelo {m}: {c}" for m, c in others.items()])
+    counts_msg = "; ".join(parts)
+
+    suggestions = []
+    for m, c in others.items():
+        s_name, s_ep = MODEL_META[m]
+        suggestions.append(f"{s_name} → {s_ep} ({c} chave(s))")
+
+    msg = (
+        f"{service_name}: o TXT enviado não corresponde ao endpoint.\n"
+        f"Resumo por modelo: {counts_msg}.\n"
+    )
+    if ok == 0:
+        msg += f"Nenhuma chave do modelo {expected_model} foi encontrada. "
+    if suggestions:
+        msg += "Use os endpoints adequados: " + ", ".join(suggestions)
+    return msg
+
+def enforce_model_counts(counts: Dict[str, int], expected_model: str) -> None:
     """
-    Garante que o TXT está coerente com o endpoint.
+    Garante que as contagens por modelo estão coerentes com o endpoint.
       - Se não houver nenhuma chave do modelo esperado -> erro.
       - Se houver modelos “intrusos” -> erro com sugestão de endpoints corretos.
     """
-    counts = count_models_from_txt_upload(chave_txt)
     total = sum(counts.values())
     ok = counts.get(expected_model, 0)
 
@@ -58,23 +86,102 @@ def enforce_expected_model(chave_txt: UploadFile, expected_model: str) -> None:
 
     others = {m: c for m, c in counts.items() if m != expected_model and c > 0}
     if ok == 0 or others:
-        service_name, this_endpoint = MODEL_META[expected_model]
-        parts = [f"Modelo {expected_model}: {ok}"]
-        parts.extend([f"Modelo {m}: {c}" for m, c in others.items()])
-        counts_msg = "; ".join(parts)
-
-        suggestions = []
-        for m, c in others.items():
-            s_name, s_ep = MODEL_META[m]
-            suggestions.append(f"{s_name} → {s_ep} ({c} chave(s))")
-
-        msg = (
-            f"{service_name}: o TXT enviado não corresponde ao endpoint.\n"
-            f"Resumo por modelo: {counts_msg}.\n"
+        raise HTTPException(status_code=400, detail=_mismatch_detail(counts, expected_model))
+
+@dataclass
+class GuardLimits:
+    """
+    Limites de admissão do TXT de chaves. Padrão em GUARD_*; por serviço em GUARD_LIMITS
+    (ex.: GUARD_LIMITS='{"CFE": {"max_lines": 1000000}}').
+    """
+    max_bytes: int          # conteúdo do TXT (descomprimido)
+    max_lines: int
+    max_line_length: int
+    sample_lines: int       # fail-fast: decide o modelo após estas linhas (0 = desligado)
+    foreign_ratio: float    # fração máxima de chaves de outro modelo na amostra
+
+    @classmethod
+    def for_service(cls, service: str) -> "GuardLimits":
+        base = {
+            "max_bytes": settings.GUARD_MAX_BYTES,
+            "max_lines": settings.GUARD_MAX_LINES,
+            "max_line_length": settings.GUARD_MAX_LINE_LENGTH,
+            "sample_lines": settings.GUARD_SAMPLE_LINES,
+            "foreign_ratio": settings.GUARD_FOREIGN_RATIO,
+        }
+        base.update(settings.GUARD_LIMITS.get(service, {}))
+        return cls(
+            max_bytes=int(base["max_bytes"]),
+            max_lines=int(base["max_lines"]),
+            max_line_length=int(base["max_line_length"]),
+            sample_lines=int(base["sample_lines"]),
+            foreign_ratio=float(base["foreign_ratio"]),
         )
-        if ok == 0:
-            msg += f"Nenhuma chave do modelo {expected_model} foi encontrada. "
-        if suggestions:
-            msg += "Use os endpoints adequados: " + ", ".join(suggestions)
 
-        raise HTTPException(status_code=400, detail=msg)
+class AdmissionRejected(HTTPException):
+    """
+    Recusa do guard durante a leitura; `status` é o status final da submissão.
+    """
+    def __init__(self, status_code: int, detail: str, status: str = "REJECTED_VALIDATION"):
+        super().__init__(status_code=status_code, detail=detail)
+        self.status = status
+
+class AdmissionGuard(ModelCounter):
+    """
+    ModelCounter com limites, aplicado no mesmo passe da ingestão: recusa assim que um limite
+    estoura (bytes, linhas, tamanho de linha) ou, no fail-fast, quando as primeiras
+    `sample_lines` linhas já mostram outro modelo acima de `foreign_ratio`. A leitura para ali —
+    o resto do arquivo nem é lido. A checagem completa continua em `enforce_model_counts`.
+    """
+    def __init__(self, expected_model: str, limits: GuardLimits):
+        super().__init__()
+        self.expected = expected_model
+        self.limits = limits
+        self.lines = 0
+        self.raw_bytes = 0
+        self._sampled = limits.sample_lines <= 0
+
+    @classmethod
+    def for_service(cls, service: str, expected_model: str) -> "AdmissionGuard":
+        return cls(expected_model, GuardLimits.for_service(service))
+
+    def check_size(self, size: Optional[int]) -> None:
+        # tamanho declarado do upload (Content-Length da parte, sessão retomável): recusa sem ler nada
+        if size is not None and size > self.limits.max_bytes:
+            raise AdmissionRejected(413, f"TXT com {size} bytes excede o limite de {self.limits.max_bytes} bytes")
+
+    def feed(self, chunk: bytes) -> None:
+        self.raw_bytes += len(chunk)
+        if self.raw_bytes > self.limits.max_bytes:
+            raise AdmissionRejected(413, f"TXT excede o limite de {self.limits.max_bytes} bytes")
+        lines = (self._tail + chunk).split(b"\n")
+        self._tail = lines.pop()
+        if len(self._tail) > self.limits.max_line_length or (lines and max(map(len, lines)) > self.limits.max_line_length):
+            raise AdmissionRejected(400, f"TXT com linha acima de {self.limits.max_line_length} caracteres (perto da linha {self.lines + 1}): não parece um TXT de chaves")
+        if not self._sampled and self.lines + len(lines) >= self.limits.sample_lines:
+            # amostra fechada exatamente em `sample_lines`, independente do tamanho do chunk
+            corte = self.limits.sample_lines - self.lines
+            for raw in lines[:corte]:
+                self._count_line(raw)
+            self.lines += corte
+            self._fail_fast()
+            lines = lines[corte:]
+        for raw in lines:
+            self._count_line(raw)
+        self.lines += len(lines)
+        if self.lines > self.limits.max_lines:
+            raise AdmissionRejected(413, f"TXT excede o limite de {self.limits.max_lines} linhas")
+
+    def _fail_fast(self) -> None:
+        self._sampled = True
+        total = sum(self.counts.values())
+        n = self.limits.sample_lines
+        if total == 0:
+            raise AdmissionRejected(400, f"TXT não contém chaves reconhecíveis nas primeiras {n} linhas. Verifique o arquivo.", "REJECTED_MODEL_MISMATCH")
+        if (total - self.counts[self.expected]) / total > self.limits.foreign_ratio:
+            raise AdmissionRejected(400, _mismatch_detail(self.counts, self.expected) + f" (amostra das primeiras {n} linhas)", "REJECTED_MODEL_MISMATCH")
+
+    def close(self) -> Dict[str, int]:
+        if self._tail:
+            self.lines += 1
+        return super().close()
@@ -0,0 +1,304 @@
+# br/com/certacon/certabot/utils/placas.py
+"""
+Leitura das placas da planilha SENATRAN sem carregar o workbook: o .xlsx é um zip, e a aba é
+lida em fluxo (expat direto sobre o XML da aba, sem árvore de elementos). A coluna é a
+do cabeçalho "placa" na 1ª linha; sem cabeçalho, a coluna A.
+
+Normalização e validação vão em lote (regex em C sobre blocos de linhas), nos dois formatos:
+    antigo    ABC1234
+    Mercosul  ABC1D23
+Saída: placas.txt (uma placa normalizada por linha, sem repetidas) e, se houver,
+placas_rejeitadas.txt ("linha;valor" com o texto da célula). Memória limitada: a tabela de textos
+compartilhados fica compacta (8 bytes por placa) e o dedup troca o set por sort/merge em disco
+acima do limite.
+"""
+from __future__ import annotations
+from pathlib import Path
+from posixpath import dirname, join, normpath
+from typing import Dict, Iterator, List, Optional, Tuple
+import re
+import zipfile
+from xml.etree.ElementTree import ParseError, iterparse
+from xml.parsers import expat
+
+from fastapi import HTTPException
+
+from br.com.certacon.certabot.utils.extsort import sort_file
+
+NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+NS_REL = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+NS_PKG_REL = "http://schemas.openxmlformats.org/package/2006/relationships"
+ROW, C, V, T, SI, RPH = (f"{NS}}}{t}" for t in ("row", "c", "v", "t", "si", "rPh"))
+
+BATCH = 65_536
+READ_BUFFER = 1024 * 1024
+WRITE_BUFFER = 1024 * 1024
+SAMPLE_REJEITADAS = 20
+MAX_BRUTOS = 100_000
+
+_NAO_ALNUM = re.compile(r"[^A-Z0-9\n]")
+_VALIDA = re.compile(r"^[A-Z]{3}[0-9][A-Z0-9][0-9]{2}$", re.M)
+_MERCOSUL = re.compile(r"^[A-Z]{3}[0-9][A-Z][0-9]{2}$", re.M)
+
+
+def _normalizar(texto: str) -> str:
+    # bloco inteiro de uma vez: maiúsculas e só [A-Z0-9] (hífen, espaço, ponto somem)
+    return _NAO_ALNUM.sub("", texto.upper())
+
+
+def _col(ref: str) -> str:
+    return ref.rstrip("0123456789")
+
+
+def _letra(i: int) -> str:
+    # 0 -> A, 25 -> Z, 26 -> AA (célula sem atributo r: coluna pela posição)
+    out = ""
+    i += 1
+    while i:
+        i, r = divmod(i - 1, 26)
+        out = chr(65 + r) + out
+    return out
+
+
+def _invalida(msg: str) -> HTTPException:
+    return HTTPException(status_code=400, detail=f"placa_xlsx: {msg}")
+
+
+def _parse(f, start, end, chars) -> Iterator[None]:
+    """
+    expat direto (sem montar árvore de elementos), 1 MB por vez; devolve o controle a cada bloco
+    para quem consome o que os handlers acumularam. Nomes chegam como "namespace}local".
+    """
+    p = expat.ParserCreate(namespace_separator="}")
+    p.buffer_text = True
+    p.StartElementHandler, p.EndElementHandler, p.CharacterDataHandler = start, end, chars
+    while True:
+        bloco = f.read(READ_BUFFER)
+        p.Parse(bloco, not bloco)
+        yield
+        if not bloco:
+            return
+
+
+class _SharedStrings:
+    """
+    Tabela de textos compartilhados (sharedStrings.xml). Cada texto vira a forma normalizada em
+    8 bytes (tamanho + até 7 caracteres), que basta para as placas; os que não são placa
+    (cabeçalho, lixo) guardam também o texto original, para achar o cabeçalho e para as
+    rejeitadas. Acima de MAX_BRUTOS desses, o resto sai normalizado e truncado.
+    """
+    SLOT = 8
+
+    def __init__(self):
+        self.buf = bytearray()
+        self.brutos: Dict[int, str] = {}
+
+    def load(self, zf: zipfile.ZipFile, name: str) -> None:
+        lote: List[str] = []
+        partes: List[str] = []
+        estado = {"t": False, "rph": False}
+
+        def start(tag, attrs):
+            if tag == T:
+                estado["t"] = not estado["rph"]
+            elif tag == RPH:
+                estado["rph"] = True  # leitura fonética (<rPh>) não faz parte do texto
+
+        def end(tag):
+            if tag == T:
+                estado["t"] = False
+            elif tag == RPH:
+                estado["rph"] = False
+            elif tag == SI:
+                lote.append("".join(partes).replace("\n", " "))
+                partes.clear()
+
+        def chars(data):
+            if estado["t"]:
+                partes.append(data)
+
+        with zf.open(name) as f:
+            for _ in _parse(f, start, end, chars):
+                if len(lote) >= BATCH:
+                    self._add(lote)
+                    lote.clear()
+        self._add(lote)
+
+    def _add(self, textos: List[str]) -> None:
+        if not textos:
+            return
+        i = len(self.buf) // self.SLOT
+        for bruto, s in zip(textos, _normalizar("\n".join(textos)).split("\n")):
+            b = s.encode("ascii")
+            self.buf += bytes((min(len(b), 255),)) + b[:7].ljust(7, b"\0")
+            if len(self.brutos) < MAX_BRUTOS and not _VALIDA.match(s):
+                self.brutos[i] = bruto
+            i += 1
+
+    def __getitem__(self, i: int) -> str:
+        bruto = self.brutos.get(i)
+        if bruto is not None:
+            return bruto
+        slot = self.buf[i * self.SLOT:(i + 1) * self.SLOT]
+        if not slot:
+            return ""
+        n = slot[0]
+        s = slot[1:1 + min(n, 7)].decode("ascii")
+        return s if n <= 7 else s + "…"   # truncado; "…" nunca casa com a regex: continua inválida
+
+
+def _primeira_aba(zf: zipfile.ZipFile) -> str:
+    # workbook.xml -> 1ª <sheet r:id> -> workbook.xml.rels -> caminho da aba
+    try:
+        with zf.open("xl/workbook.xml") as f:
+            rid = next((el.get(f"{{{NS_REL}}}id") for _, el in iterparse(f) if el.tag == f"{{{NS}}}sheet"), None)
+        with zf.open("xl/_rels/workbook.xml.rels") as f:
+            alvos = {el.get("Id"): el.get("Target") for _, el in iterparse(f) if el.tag == f"{{{NS_PKG_REL}}}Relationship"}
+        alvo = alvos[rid]
+        return alvo.lstrip("/") if alvo.startswith("/") else normpath(join(dirname("xl/workbook.xml"), alvo))
+    except (KeyError, StopIteration):
+        return "xl/worksheets/sheet1.xml"
+
+
+def _linhas(zf: zipfile.ZipFile, aba: str, sst: _SharedStrings) -> Iterator[Tuple[int, Dict[str, str]]]:
+    """
+    (nº da linha, {coluna: texto}) de cada <row>, em fluxo.
+    """
+    prontas: List[Tuple[int, Dict[str, str]]] = []
+    partes: List[str] = []
+    # linha atual: nº (atributo r), células, posição; célula atual: coluna, tipo, dentro de <v>/<t>
+    cur = {"r": None, "valores": {}, "pos": 0, "col": "", "tipo": None, "texto": False, "tem": False}
+
+    def start(tag, attrs):
+        if tag == C:
+            ref = attrs.get("r")
+            cur["col"] = _col(ref) if ref else _letra(cur["pos"])
+            cur["tipo"] = attrs.get("t")
+            cur["pos"] += 1
+            cur["tem"] = False
+            partes.clear()
+        elif tag == V or tag == T:
+            cur["texto"] = cur["tem"] = True
+        elif tag == ROW:
+            cur["r"], cur["valores"], cur["pos"] = attrs.get("r"), {}, 0
+
+    def end(tag):
+        if tag == V or tag == T:
+            cur["texto"] = False
+        elif tag == C:
+            if cur["tem"] and (partes or cur["tipo"] == "inlineStr"):
+                texto = "".join(partes)
+                cur["valores"][cur["col"]] = sst[int(texto)] if cur["tipo"] == "s" else texto
+        elif tag == ROW:
+            n = int(cur["r"]) if cur["r"] else (prontas[-1][0] + 1 if prontas else 1)
+            prontas.append((n, cur["valores"]))
+
+    def chars(data):
+        if cur["texto"]:
+            partes.append(data)
+
+    with zf.open(aba) as f:
+        for _ in _parse(f, start, end, chars):
+            yield from prontas
+            prontas.clear()
+
+
+class _Dedup:
+    """
+    Placas já vistas: set até `max_placas`; acima disso grava tudo e o dedup termina com
+    sort/merge em disco (como o _Deduper do split).
+    """
+    def __init__(self, max_placas: int):
+        self.max_placas = max_placas
+        self.vistas = set()
+        self.spilled = False
+
+    def novas(self, placas: List[str]) -> List[str]:
+        if self.spilled:
+            return placas
+        unicas = [p for p in dict.fromkeys(placas) if p not in self.vistas]
+        self.vistas.update(unicas)
+        if len(self.vistas) > self.max_placas:
+            self.spilled = True
+            self.vistas = set()
+        return unicas
+
+
+def extrair_placas(xlsx: Path, pasta: Path, *, max_linhas: int, dedup_max: int = 2_000_000) -> Dict[str, object]:
+    """
+    Lê a planilha e grava `pasta`/placas.txt. Retorna as contagens (e uma amostra das rejeitadas)
+    para o evento VALIDATED. Planilha ilegível ou acima de `max_linhas` -> HTTPException.
+    """
+    saida = pasta / "placas.txt"
+    caminho_rej = pasta / "placas_rejeitadas.txt"
+    stats = {"linhas": 0, "validas": 0, "antigas": 0, "mercosul": 0, "invalidas": 0, "repetidas": 0, "unicas": 0}
+    amostra: List[str] = []
+    dedup = _Dedup(dedup_max)
+    rej = None
+    coluna: Optional[str] = None
+    lote: List[Tuple[int, str]] = []
+
+    def flush(out) -> None:
+        nonlocal rej
+        if not lote:
+            return
+        normalizadas = _normalizar("\n".join(v for _, v in lote))
+        validas = _VALIDA.findall(normalizadas)
+        stats["validas"] += len(validas)
+        stats["mercosul"] += len(_MERCOSUL.findall(normalizadas))
+        if len(validas) < len(lote):
+            # caminho raro: só aqui se olha linha a linha, para registrar as rejeitadas
+            if rej is None:
+                rej = open(caminho_rej, "w", encoding="utf-8", buffering=WRITE_BUFFER)
+            for (n, bruto), norm in zip(lote, normalizadas.split("\n")):
+                if not _VALIDA.match(norm):
+                    stats["invalidas"] += 1
+                    rej.write(f"{n};{bruto}\n")
+                    if len(amostra) < SAMPLE_REJEITADAS:
+                        amostra.append(f"{n};{bruto}")
+        novas = dedup.novas(validas)
+        if novas:
+            out.write("\n".join(novas) + "\n")
+        stats["unicas"] += len(novas)
+        lote.clear()
+
+    try:
+        with zipfile.ZipFile(xlsx) as zf, open(saida, "w", encoding="ascii", buffering=WRITE_BUFFER) as out:
+            sst = _SharedStrings()
+            if "xl/sharedStrings.xml" in zf.namelist():
+                sst.load(zf, "xl/sharedStrings.xml")
+            for n, valores in _linhas(zf, _primeira_aba(zf), sst):
+                if coluna is None:
+                    # 1ª linha com conteúdo: cabeçalho "placa" define a coluna; senão é dado na coluna A
+                    coluna = next((c for c, v in valores.items() if "PLACA" in v.upper()), None)
+                    if coluna is not None:
+                        continue
+                    coluna = "A"
+                valor = valores.get(coluna, "").strip()
+                if not valor:
+                    continue
+                stats["linhas"] += 1
+                if stats["linhas"] > max_linhas:
+                    raise _invalida(f"mais de {max_linhas} linhas com placa")
+                lote.append((n, valor.replace("\n", " ")))
+                if len(lote) >= BATCH:
+                    flush(out)
+            flush(out)
+    except (zipfile.BadZipFile, KeyError, ParseError, expat.ExpatError, ValueError) as e:
+        raise _invalida(f"arquivo .xlsx ilegível ({e.__class__.__name__}: {e})")
+    finally:
+        if rej is not None:
+            rej.close()
+
+    if dedup.spilled:
+        _, unicas = sort_file(saida, saida, chunk_lines=dedup.max_placas, unique=True)
+        stats["unicas"] = unicas
+    stats["antigas"] = stats["validas"] - stats["mercosul"]
+    stats["repetidas"] = stats["validas"] - stats["unicas"]
+    return {
+        **stats,
+        "dedup": "disco" if dedup.spilled else "memoria",
+        "path": saida.as_posix(),
+        "rejeitadas_path": caminho_rej.as_posix() if rej is not None else None,
+        "amostra_rejeitadas": amostra,
+    }
@@ -0,0 +1,338 @@
+# br/com/certacon/certabot/utils/planilha_cfe.py
+"""
+Conciliação das chaves do TXT (CF-e, modelo 59) com a planilha_csv do CFE.
+
+A planilha é lida em fluxo só na coluna da chave de acesso e vira um índice das chaves; o
+split consulta o índice a cada chave 59 aceita (no mesmo passe da leitura do TXT). Saída, em
+<split>/conciliacao/:
+    casadas.txt           chave no TXT e na planilha
+    txt_sem_csv.txt       chave no TXT sem linha na planilha
+    csv_sem_txt.txt       chave na planilha que não veio no TXT
+    csv_rejeitadas.txt    "motivo;valor" das células de chave inválidas (se houver)
+
+Índice em memória (set de inteiros) até `max_chaves` chaves distintas; acima disso as chaves
+da planilha vão para disco e a conciliação vira um merge de dois arquivos ordenados
+(sort/merge do extsort), depois do split, com memória limitada.
+"""
+from __future__ import annotations
+from dataclasses import dataclass
+from pathlib import Path
+from itertools import islice
+from typing import Dict, Iterator, List, Optional, Tuple
+import csv
+import os
+import re
+import unicodedata
+
+from fastapi import HTTPException, UploadFile
+
+from br.com.certacon.certabot.utils.chave_acesso import dv_ok
+from br.com.certacon.certabot.utils.chave_modelo import digits_only
+from br.com.certacon.certabot.utils.extsort import sort_file
+
+MODELO = "59"
+DELIMITADORES = (";", ",", "\t", "|")
+READ_BUFFER = 1024 * 1024
+WRITE_BUFFER = 1024 * 1024
+SAMPLE_BYTES = 64 * 1024
+BATCH = 65_536
+
+_NAO_DIGITO = re.compile(r"[^0-9\n]")
+_CHAVE_59 = re.compile(r"^[0-9]{20}59[0-9]{22}$", re.M)
+
+# planilhas exportadas no Windows costumam vir em cp1252: a chave é ASCII, então o que não for
+# UTF-8 só precisa não quebrar a leitura (errors="replace" nos nomes de coluna)
+_ENCODING = "utf-8-sig"
+
+csv.field_size_limit(1024 * 1024)
+
+
+@dataclass(frozen=True)
+class LayoutCsv:
+    delimitador: str
+    coluna: int
+    nome_coluna: Optional[str]  # None: planilha sem cabeçalho
+    cabecalho: bool
+
+    def as_dict(self) -> Dict[str, str]:
+        return {"coluna": self.nome_coluna or f"#{self.coluna + 1}", "delimitador": self.delimitador}
+
+
+def _invalida(msg: str) -> HTTPException:
+    return HTTPException(status_code=400, detail=f"planilha_csv: {msg}")
+
+
+def _abrir(path: Path):
+    return open(path, "r", encoding=_ENCODING, errors="replace", newline="", buffering=READ_BUFFER)
+
+
+def _sem_acento(s: str) -> str:
+    return "".join(c for c in unicodedata.normalize("NFKD", s) if not unicodedata.combining(c)).strip().lower()
+
+
+def _parece_chave(valor: str) -> bool:
+    return len(digits_only(valor.encode("ascii", "ignore"))) == 44
+
+
+def _layout(amostra: str) -> LayoutCsv:
+    primeira = amostra.split("\n", 1)[0]
+    if not primeira.strip():
+        raise _invalida("arquivo vazio ou sem cabeçalho na 1ª linha")
+    delim = max(DELIMITADORES, key=primeira.count) if any(d in primeira for d in DELIMITADORES) else ";"
+
+    linhas = list(csv.reader(amostra.splitlines()[:2], delimiter=delim))
+    cab = [_sem_acento(c) for c in linhas[0]]
+    for i, nome in enumerate(cab):
+        if "chave" in nome:
+            return LayoutCsv(delim, i, linhas[0][i].strip(), True)
+    for n, linha in enumerate(linhas):
+        for i, valor in enumerate(linha):
+            if _parece_chave(valor):
+                return LayoutCsv(delim, i, linhas[0][i].strip() if n else None, n == 1)
+    raise _invalida('coluna da chave de acesso não encontrada (cabeçalho com "chave" ou valores de 44 dígitos)')
+
+
+def detectar_layout(path: Path) -> LayoutCsv:
+    """
+    Delimitador (o mais frequente na 1ª linha) e coluna da chave: cabeçalho com "chave" no nome;
+    sem isso, a coluna cujo valor tem 44 dígitos na 1ª ou 2ª linha. Lê só o começo do arquivo.
+    Sem coluna de chave reconhecível -> HTTPException 400.
+    """
+    with _abrir(path) as f:
+        return _layout(f.read(SAMPLE_BYTES))
+
+
+def detectar_layout_upload(up: UploadFile) -> LayoutCsv:
+    """
+    `detectar_layout` sobre o UploadFile, antes de gravar qualquer coisa (validação do submit).
+    """
+    up.file.seek(0)
+    amostra = up.file.read(SAMPLE_BYTES)
+    up.file.seek(0)
+    # corte no meio de um caractere UTF-8: o "replace" só afeta o fim da amostra
+    return _layout(amostra.decode(_ENCODING, errors="replace"))
+
+
+def ler_blocos(path: Path, layout: LayoutCsv) -> Iterator[Tuple[int, List[str], List[Tuple[str, str]]]]:
+    """
+    Lê a coluna da chave em blocos de BATCH linhas: (nº de linhas com a célula preenchida,
+    chaves 59 bem formadas, [(motivo, valor original)] das demais). Normalização e formato vão
+    em lote (regex sobre o bloco); linha a linha só quando o bloco tem célula vazia ou inválida.
+    O DV não é conferido aqui (ver ConciliacaoCsv).
+    """
+    col = layout.coluna
+    with _abrir(path) as f:
+        leitor = csv.reader(f, delimiter=layout.delimitador)
+        if layout.cabecalho:
+            next(leitor, None)
+        while True:
+            valores = [l[col] if len(l) > col else "" for l in islice(leitor, BATCH)]
+            if not valores:
+                return
+            norm = _NAO_DIGITO.sub("", "\n".join(valores))
+            validas = _CHAVE_59.findall(norm)
+            if len(validas) == len(valores):
+                yield len(valores), validas, []
+                continue
+            # caminho raro: célula vazia ou chave inválida no bloco
+            validas, rejeitadas, n = [], [], 0
+            for bruto, chave in zip(valores, norm.split("\n")):
+                bruto = bruto.strip()
+                if not bruto:
+                    continue
+                n += 1
+                if len(chave) != 44:
+                    rejeitadas.append(("formato", bruto))
+                elif chave[20:22] != MODELO:
+                    rejeitadas.append(("modelo", bruto))
+                else:
+                    validas.append(chave)
+            yield n, validas, rejeitadas
+
+
+class _Saidas:
+    """
+    Arquivos da conciliação, abertos sob demanda (como os writers do split).
+    """
+    NOMES = ("casadas", "txt_sem_csv", "csv_sem_txt", "csv_rejeitadas")
+
+    def __init__(self, pasta: Path):
+        self.pasta = pasta
+        self.files: Dict[str, object] = {}
+        self.counts = {n: 0 for n in self.NOMES}
+
+    def path(self, nome: str) -> Path:
+        return self.pasta / f"{nome}.txt"
+
+    def write(self, nome: str, linha: bytes) -> None:
+        f = self.files.get(nome)
+        if f is None:
+            self.pasta.mkdir(parents=True, exist_ok=True)
+            # "ab": csv_rejeitadas recebe as linhas da leitura e, no fim, as de DV inválido
+            f = self.files[nome] = open(self.path(nome), "ab", buffering=WRITE_BUFFER)
+        f.write(linha + b"\n")
+        self.counts[nome] += 1
+
+    def close(self) -> None:
+        for f in self.files.values():
+            f.close()
+        self.files.clear()
+
+
+class ConciliacaoCsv:
+    """
+    Índice das chaves da planilha + conciliação com as chaves 59 do TXT.
+      - `indexar()` lê a planilha (antes do split);
+      - `chave_txt(chave)` a cada chave 59 nova do split (só faz algo com o índice em memória);
+      - DV das chaves da planilha conferido só nas que ficam sem par (vão para csv_rejeitadas);
+      - `finalizar(modelo_59, ...)` depois do split, com o modelo_59.txt já final.
+    Com o índice em memória, chave casada sai de `pendentes` para `casadas`: o total fica no
+    tamanho da planilha e uma chave repetida no TXT (dedup do split em disco) é reconhecida.
+    """
+    def __init__(self, path_csv: Path, pasta: Path, *, max_chaves: int):
+        self.path_csv = Path(path_csv)
+        self.max_chaves = max_chaves
+        self.saidas = _Saidas(pasta)
+        self.layout: Optional[LayoutCsv] = None
+        self.pendentes = set()
+        self.casadas = set()
+        self.em_disco = False
+        self.stats = {"linhas": 0, "validas": 0, "unicas": 0, "repetidas": 0, "invalidas": 0}
+
+    @property
+    def _chaves_csv(self) -> Path:
+        return self.saidas.pasta / ".csv_chaves.tmp"
+
+    def indexar(self) -> None:
+        self.layout = detectar_layout(self.path_csv)
+        disco = None
+        try:
+            for n, validas, rejeitadas in ler_blocos(self.path_csv, self.layout):
+                self.stats["linhas"] += n
+                self.stats["validas"] += len(validas)
+                for motivo, valor in rejeitadas:
+                    self._rejeitar(motivo, valor)
+                if disco is not None:
+                    disco.write("".join(k + "\n" for k in validas).encode("ascii"))
+                    continue
+                self.pendentes.update(map(int, validas))
+                if len(self.pendentes) > self.max_chaves:
+                    # estourou: o que já está no set vai para disco e o resto da leitura segue direto
+                    self.saidas.pasta.mkdir(parents=True, exist_ok=True)
+                    disco = open(self._chaves_csv, "wb", buffering=WRITE_BUFFER)
+                    disco.writelines(b"%044d\n" % k for k in self.pendentes)
+                    self.pendentes = set()
+                    self.em_disco = True
+        finally:
+            if disco is not None:
+                disco.close()
+            self.saidas.close()
+
+        if self.em_disco:
+            _, unicas = sort_file(self._chaves_csv, self._chaves_csv, chunk_lines=self.max_chaves, unique=True)
+            self.stats["unicas"] = unicas
+        else:
+            self.stats["unicas"] = len(self.pendentes)
+
+    def _rejeitar(self, motivo: str, valor: str) -> None:
+        self.stats["invalidas"] += 1
+        self.saidas.write("csv_rejeitadas", f"{motivo};{valor}".encode("utf-8", "replace"))
+
+    def _sem_par(self, chave: bytes) -> None:
+        # DV só aqui: chave casada veio do TXT, que já passou pelo DV no split
+        if dv_ok(chave):
+            self.saidas.write("csv_sem_txt", chave)
+            return
+        self._rejeitar("dv", chave.decode("ascii"))
+        self.stats["validas"] -= 1
+        self.stats["unicas"] -= 1
+
+    def chave_txt(self, chave: bytes) -> None:
+        if self.em_disco:
+            return
+        k = int(chave)
+        if k in self.pendentes:
+            self.pendentes.remove(k)
+            self.casadas.add(k)
+            self.saidas.write("casadas", chave)
+        elif k not in self.casadas:
+            self.saidas.write("txt_sem_csv", chave)
+
+    def _merge(self, modelo_59: Optional[Path], *, txt_ordenado: bool) -> None:
+        # TXT e planilha ordenados e sem repetidas: um passe em cada, memória de uma linha
+        tmp_txt = None
+        if modelo_59 is not None and not txt_ordenado:
+            tmp_txt = self.saidas.pasta / ".txt_chaves.tmp"
+            sort_file(modelo_59, tmp_txt, chunk_lines=self.max_chaves, unique=True)
+        fonte = tmp_txt or modelo_59
+        try:
+            with open(self._chaves_csv, "rb", buffering=READ_BUFFER) as fc:
+                ft = open(fonte, "rb", buffering=READ_BUFFER) if fonte is not None else None
+                try:
+                    c = fc.readline().rstrip()
+                    t = ft.readline().rstrip() if ft is not None else b""
+                    while c and t:
+                        if c == t:
+                            self.saidas.write("casadas", t)
+                            c, t = fc.readline().rstrip(), ft.readline().rstrip()
+                        elif t < c:
+                            self.saidas.write("txt_sem_csv", t)
+                            t = ft.readline().rstrip()
+                        else:
+                            self._sem_par(c)
+                            c = fc.readline().rstrip()
+                    while c:
+                        self._sem_par(c)
+                        c = fc.readline().rstrip()
+                    while t:
+                        self.saidas.write("txt_sem_csv", t)
+                        t = ft.readline().rstrip()
+                finally:
+                    if ft is not None:
+                        ft.close()
+        finally:
+            for p in (tmp_txt, self._chaves_csv):
+                if p is not None and p.exists():
+                    os.remove(p)
+
+    def finalizar(self, modelo_59: Optional[Path], *, dedup_em_disco: bool) -> Dict[str, object]:
+        """
+        `dedup_em_disco`: o split terminou o dedup com sort/merge, então modelo_59.txt já está
+        ordenado e sem repetidas, mas durante o passe chaves repetidas podem ter chegado aqui.
+        Retorna o bloco "conciliacao" do resultado do split.
+        """
+        try:
+            if self.em_disco:
+                self._merge(modelo_59, txt_ordenado=dedup_em_disco)
+            else:
+                for k in sorted(self.pendentes):
+                    self._sem_par(b"%044d" % k)
+        finally:
+            self.saidas.close()
+
+        if not self.em_disco and dedup_em_disco and self.saidas.counts["txt_sem_csv"]:
+            path = self.saidas.path("txt_sem_csv")
+            _, self.saidas.counts["txt_sem_csv"] = sort_file(path, path, chunk_lines=self.max_chaves, unique=True)
+
+        self.stats["repetidas"] = self.stats["validas"] - self.stats["unicas"]
+        bloco: Dict[str, object] = {}
+        for nome in _Saidas.NOMES:
+            path = self.saidas.path(nome)
+            bloco[nome] = {
+                "qtd_chaves": self.saidas.counts[nome],
+                "path": path.as_posix() if path.exists() else None,
+            }
+        bloco["csv"] = {**self.stats, **self.layout.as_dict()}
+        bloco["indice"] = "disco" if self.em_disco else "memoria"
+        return bloco
+
+
+def resumo(bloco: Dict[str, object]) -> Dict[str, int]:
+    """
+    Só as contagens do bloco "conciliacao" (meta do evento CSV_JOINED).
+    """
+    out = {nome: bloco[nome]["qtd_chaves"] for nome in _Saidas.NOMES}
+    out["csv_linhas"] = bloco["csv"]["linhas"]
+    out["csv_repetidas"] = bloco["csv"]["repetidas"]
+    out["indice"] = bloco["indice"]
+    return out
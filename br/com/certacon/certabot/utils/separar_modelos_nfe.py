@@ -1,78 +1,245 @@
+import sys
+import gzip
+import json
+import re
+import shutil
 from pathlib import Path
 from datetime import datetime
+from typing import Optional
+from br.com.certacon.certabot.api.core.config import settings
 from br.com.certacon.certabot.utils.save_folder_saida import _ensure_outdir
+from br.com.certacon.certabot.utils.chave_acesso import ChaveStats, classificar
+from br.com.certacon.certabot.utils.compressao import open_keys
+from br.com.certacon.certabot.utils.extsort import sort_file
+from br.com.certacon.certabot.utils.planilha_cfe import ConciliacaoCsv
+from br.com.certacon.certabot.utils.shards import particionar_modelo
 
-def processar_arquivo_txt_sem_enviar(path_txt: Path, pasta_saida: Path) -> dict:
+MODELOS = ("55", "65", "57", "59")
+# versão do formato de saída do split: mudou a saída (arquivos, ordem, dict de resultado)? incremente —
+# invalida o cache de splits (utils/split_cache.py)
+SPLITTER_VERSION = "4"
+WRITE_BUFFER = 1024 * 1024
+
+
+def _reset_peak_rss() -> bool:
+    """
+    Zera o pico de memória residente (VmHWM) do processo, para medir só o job que começa:
+    o worker do pool é reaproveitado e o pico da vida dele não diz nada sobre este job.
+    Só Linux (/proc/self/clear_refs); False onde não dá.
+    """
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _job_peak_rss_kb() -> Optional[int]:
+    # VmHWM desde o último _reset_peak_rss (KB)
+    try:
+        with open("/proc/self/status") as f:
+            m = re.search(r"^VmHWM:\s+(\d+)", f.read(), re.M)
+    except OSError:
+        return None
+    return int(m.group(1)) if m else None
+
+
+def _worker_peak_rss_kb():
+    """
+    Pico de memória residente do worker desde que subiu (KB), somando todos os jobs que ele já
+    rodou; o do job é o `peak_rss_kb`. None onde `resource` não existe (Windows).
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == "darwin" else peak  # macOS reporta em bytes
+
+
+class _ModelWriters:
+    """
+    Um writer bufferizado por modelo, aberto só na primeira chave daquele modelo.
+    A memória fica constante: nada é acumulado além do buffer de escrita.
+    """
+    def __init__(self, pasta_base: Path):
+        self.pasta_base = pasta_base
+        self.files = {}
+        self.paths = {}
+        self.counts = {m: 0 for m in MODELOS}
+
+    def write(self, modelo: str, chave: bytes) -> None:
+        f = self.files.get(modelo)
+        if f is None:
+            pasta = self.pasta_base / f"modelo_{modelo}"
+            pasta.mkdir(parents=True, exist_ok=True)
+            path = pasta / f"modelo_{modelo}.txt"
+            f = self.files[modelo] = open(path, "wb", buffering=WRITE_BUFFER)
+            self.paths[modelo] = path
+        f.write(chave + b"\n")
+        self.counts[modelo] += 1
+
+    def close(self) -> None:
+        for f in self.files.values():
+            f.close()
+
+
+class _Deduper:
+    """
+    Descarta chaves repetidas dentro do job.
+      - Até `max_keys` chaves distintas: set de inteiros (a chave de 44 dígitos como int).
+      - Acima disso o set é liberado e tudo passa; o dedup termina com sort/merge
+        em disco de cada modelo_XX.txt (ver `sort_file`), mantendo a memória limitada.
+    """
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        self.seen = set()
+        self.spilled = False
+        self.removed = {m: 0 for m in MODELOS}
+
+    def is_new(self, modelo: str, chave: bytes) -> bool:
+        if self.spilled:
+            return True
+        k = int(chave)
+        if k in self.seen:
+            self.removed[modelo] += 1
+            return False
+        self.seen.add(k)
+        if len(self.seen) > self.max_keys:
+            self.spilled = True
+            self.seen = set()
+        return True
+
+
+def _escrever_manifest(pasta_base: Path, writers: "_ModelWriters", shard_size: int, chunk_lines: int) -> dict:
+    """
+    Gera os shards de cada modelo e o manifest.json (um registro por shard, com
+    qtd_chaves e bytes) para que vários workers possam reivindicar shards de forma independente.
+    """
+    shards = []
+    for modelo, path in writers.paths.items():
+        shards.extend(particionar_modelo(path, pasta_base, modelo, shard_size=shard_size, chunk_lines=chunk_lines))
+    caminho = pasta_base / "manifest.json"
+    manifest = {
+        "shard_size": shard_size,
+        "total_shards": len(shards),
+        "total_chaves": sum(s["qtd_chaves"] for s in shards),
+        "shards": shards,
+    }
+    caminho.write_text(json.dumps(manifest, ensure_ascii=False, indent=2), encoding="utf-8")
+    return {"path": caminho.as_posix(), "shard_size": shard_size, "total_shards": len(shards)}
+
+
+def _gzip_copia(path: Path) -> Path:
+    """
+    Grava `path`.gz ao lado do original (variante pré-comprimida servida no download).
+    """
+    destino = path.with_name(path.name + ".gz")
+    with open(path, "rb") as src, gzip.open(destino, "wb", compresslevel=6) as dst:
+        shutil.copyfileobj(src, dst, WRITE_BUFFER)
+    return destino
+
+
+def processar_arquivo_txt_sem_enviar(
+    path_txt: Path,
+    pasta_saida: Path,
+    *,
+    dedup_max_keys: Optional[int] = None,
+    particionar: Optional[bool] = None,
+    shard_size: Optional[int] = None,
+    comprimir: Optional[bool] = None,
+    path_csv: Optional[Path] = None,
+) -> dict:
     _ensure_outdir()
+    mede_pico = _reset_peak_rss()
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     pasta_base = pasta_saida / timestamp
-    pasta_modelo_55 = pasta_base / "modelo_55"
-    pasta_modelo_65 = pasta_base / "modelo_65"
-    pasta_modelo_57 = pasta_base / "modelo_57"
-    pasta_modelo_59 = pasta_base / "modelo_59"  # <<< novo
-
-    for p in (pasta_modelo_55, pasta_modelo_65, pasta_modelo_57, pasta_modelo_59):
-        p.mkdir(parents=True, exist_ok=True)
-
-    ch55, ch65, ch57, ch59 = [], [], [], []  # <<< novo
-    with open(path_txt, "r", encoding="utf-8", errors="ignore") as f:
-        for linha in f:
-            chave = linha.strip()
-            if len(chave) > 22:
-                modelo = "".join(c for c in chave if c.isdigit())[20:22] if not chave[20:22].isdigit() else chave[20:22]
-                if   modelo == "55": ch55.append(chave)
-                elif modelo == "65": ch65.append(chave)
-                elif modelo == "57": ch57.append(chave)
-                elif modelo == "59": ch59.append(chave)  # <<< novo
-
-    caminho_55 = pasta_modelo_55 / "modelo_55.txt"
-    caminho_65 = pasta_modelo_65 / "modelo_65.txt"
-    caminho_57 = pasta_modelo_57 / "modelo_57.txt"
-    caminho_59 = pasta_modelo_59 / "modelo_59.txt"  # <<< novo
+    pasta_base.mkdir(parents=True, exist_ok=True)
+
+    # chaves inválidas (formato, modelo desconhecido ou DV errado) vão para rejeitadas.txt
+    # no formato "motivo;linha original" e não seguem para os robôs
+    caminho_rej = pasta_base / "rejeitadas.txt"
+    rej = None
+    stats = ChaveStats()
+    writers = _ModelWriters(pasta_base)
+    dedup = _Deduper(dedup_max_keys or settings.SPLIT_DEDUP_MAX_KEYS)
+
+    # CFE: planilha_csv indexada antes do passe; cada chave 59 aceita é conciliada na hora
+    conciliacao = None
+    if path_csv is not None:
+        conciliacao = ConciliacaoCsv(Path(path_csv), pasta_base / "conciliacao", max_chaves=dedup.max_keys)
+        conciliacao.indexar()
 
+    try:
+        # .txt.gz/.xz/.zip: lido descomprimindo em fluxo, sem extrair para disco
+        with open_keys(path_txt) as f:
+            for linha in f:
+                linha = linha.strip()
+                if not linha:
+                    continue
+                chave, modelo, motivo = classificar(linha)
+                if motivo:
+                    stats.reject(motivo)
+                    if rej is None:
+                        rej = open(caminho_rej, "wb", buffering=WRITE_BUFFER)
+                    rej.write(motivo.encode() + b";" + linha + b"\n")
+                    continue
+                if not dedup.is_new(modelo, chave):
+                    continue
+                stats.add(chave)
+                writers.write(modelo, chave)
+                if conciliacao is not None and modelo == "59":
+                    conciliacao.chave_txt(chave)
+    finally:
+        writers.close()
+        if rej is not None:
+            rej.close()
+
+    if dedup.spilled:
+        # dedup em disco: as estatísticas das válidas são refeitas no mesmo passe do merge
+        stats.reset_validas()
+        for modelo, path in writers.paths.items():
+            total, unicas = sort_file(path, path, chunk_lines=dedup.max_keys, unique=True, on_line=stats.add)
+            dedup.removed[modelo] += total - unicas
+            writers.counts[modelo] = unicas
+
+    bloco_conciliacao = None
+    if conciliacao is not None:
+        bloco_conciliacao = conciliacao.finalizar(writers.paths.get("59"), dedup_em_disco=dedup.spilled)
+
+    manifest = None
+    if settings.SPLIT_PARTITION if particionar is None else particionar:
+        manifest = _escrever_manifest(pasta_base, writers, shard_size or settings.SPLIT_SHARD_SIZE, dedup.max_keys)
+
+    gz_paths = {}
+    if settings.SPLIT_GZIP if comprimir is None else comprimir:
+        gz_paths = {modelo: _gzip_copia(path) for modelo, path in writers.paths.items()}
+
+    estatisticas = stats.as_dict()
     links = {
         "mensagem": "Separação concluída!",
         "timestamp": timestamp,
-        "modelo_55": {
-            "qtd_chaves": len(ch55),
-            "download": f"/nfe-55-65/download/modelo_55/{timestamp}" if ch55 else None,
-            "path": None,
-        },
-        "modelo_65": {
-            "qtd_chaves": len(ch65),
-            "download": f"/nfe-55-65/download/modelo_65/{timestamp}" if ch65 else None,
-            "path": None,
-        },
-        "modelo_57": {
-            "qtd_chaves": len(ch57),
-            "download": f"/nfe-55-65/download/modelo_57/{timestamp}" if ch57 else None,
-            "path": None,
-        },
-        "modelo_59": {  # <<< novo
-            "qtd_chaves": len(ch59),
-            "download": f"/nfe-55-65/download/modelo_59/{timestamp}" if ch59 else None,
-            "path": None,
-        },
     }
-
-    if ch55:
-        with open(caminho_55, "w", encoding="utf-8") as f:
-            f.writelines(ch + "\n" for ch in ch55)
-        links["modelo_55"]["path"] = caminho_55.as_posix()
-
-    if ch65:
-        with open(caminho_65, "w", encoding="utf-8") as f:
-            f.writelines(ch + "\n" for ch in ch65)
-        links["modelo_65"]["path"] = caminho_65.as_posix()
-
-    if ch57:
-        with open(caminho_57, "w", encoding="utf-8") as f:
-            f.writelines(ch + "\n" for ch in ch57)
-        links["modelo_57"]["path"] = caminho_57.as_posix()
-
-    if ch59:  # <<< novo
-        with open(caminho_59, "w", encoding="utf-8") as f:
-            f.writelines(ch + "\n" for ch in ch59)
-        links["modelo_59"]["path"] = caminho_59.as_posix()
+    for modelo in MODELOS:
+        path = writers.paths.get(modelo)
+        links[f"modelo_{modelo}"] = {
+            "qtd_chaves": writers.counts[modelo],
+            "download": f"/nfe-55-65/download/modelo_{modelo}/{timestamp}" if path else None,
+            "path": path.as_posix() if path else None,
+            "gz_path": gz_paths[modelo].as_posix() if modelo in gz_paths else None,
+            "duplicates_removed": dedup.removed[modelo],
+        }
+    links["rejeitadas"] = {
+        "qtd_chaves": estatisticas["rejeitadas"],
+        "path": caminho_rej.as_posix() if rej is not None else None,
+    }
+    links["estatisticas"] = estatisticas
+    links["dedup"] = "disco" if dedup.spilled else "memoria"
+    links["manifest"] = manifest
+    links["conciliacao"] = bloco_conciliacao
+    # p/ dimensionar containers: pico deste job (None fora do Linux) e o do worker, acumulado
+    links["peak_rss_kb"] = _job_peak_rss_kb() if mede_pico else None
+    links["worker_peak_rss_kb"] = _worker_peak_rss_kb()
 
     return links
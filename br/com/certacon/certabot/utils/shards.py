@@ -0,0 +1,95 @@
+# br/com/certacon/certabot/utils/shards.py
+from __future__ import annotations
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List
+import os
+
+from br.com.certacon.certabot.utils.extsort import sort_file
+
+BUFFER = 256 * 1024
+MAX_OPEN_BUCKETS = 128
+
+
+class _BucketWriters:
+    """
+    Um arquivo temporário por (UF, AAMM). Mantém no máximo `MAX_OPEN_BUCKETS` abertos
+    (LRU); os demais são reabertos em append quando voltam a receber chaves.
+    """
+    def __init__(self, pasta: Path):
+        self.pasta = pasta
+        self.open: "OrderedDict[bytes, Any]" = OrderedDict()
+        self.paths: Dict[bytes, Path] = {}
+
+    def write(self, bucket: bytes, line: bytes) -> None:
+        f = self.open.get(bucket)
+        if f is None:
+            path = self.paths.get(bucket)
+            if path is None:
+                path = self.paths[bucket] = self.pasta / f".bucket_{bucket.decode('ascii')}.txt"
+            if len(self.open) >= MAX_OPEN_BUCKETS:
+                _, oldest = self.open.popitem(last=False)
+                oldest.close()
+            f = self.open[bucket] = open(path, "ab", buffering=BUFFER)
+        else:
+            self.open.move_to_end(bucket)
+        f.write(line)
+
+    def close(self) -> None:
+        for f in self.open.values():
+            f.close()
+        self.open.clear()
+
+
+def particionar_modelo(path_modelo: Path, pasta_base: Path, modelo: str, *, shard_size: int, chunk_lines: int) -> List[Dict[str, Any]]:
+    """
+    Quebra `modelo_XX.txt` em shards `modelo_XX/uf=UU/aamm=AAMM/part-NNNN.txt` com no máximo
+    `shard_size` chaves cada. Dentro de cada (UF, AAMM) as chaves saem ordenadas; como UF e AAMM
+    são o prefixo da chave, a ordem lexicográfica equivale à ordem por CNPJ do emitente.
+    Retorna as entradas do manifest (paths relativos a `pasta_base`).
+    """
+    pasta_modelo = path_modelo.parent
+    buckets = _BucketWriters(pasta_modelo)
+    try:
+        with open(path_modelo, "rb") as f:
+            for line in f:
+                buckets.write(line[0:6], line)
+    finally:
+        buckets.close()
+
+    shards: List[Dict[str, Any]] = []
+    for bucket, tmp in sorted(buckets.paths.items()):
+        uf, aamm = bucket[0:2].decode("ascii"), bucket[2:6].decode("ascii")
+        pasta = pasta_modelo / f"uf={uf}" / f"aamm={aamm}"
+        pasta.mkdir(parents=True, exist_ok=True)
+        sort_file(tmp, tmp, chunk_lines=chunk_lines)
+
+        part, out, qtd = 0, None, 0
+
+        def _fecha():
+            out.close()
+            shards.append({
+                "modelo": modelo,
+                "uf": uf,
+                "aamm": aamm,
+                "part": part,
+                "path": out_path.relative_to(pasta_base).as_posix(),
+                "qtd_chaves": qtd,
+                "bytes": out_path.stat().st_size,
+            })
+
+        with open(tmp, "rb") as f:
+            for line in f:
+                if out is None or qtd >= shard_size:
+                    if out is not None:
+                        _fecha()
+                    part += 1
+                    qtd = 0
+                    out_path = pasta / f"part-{part:04d}.txt"
+                    out = open(out_path, "wb", buffering=BUFFER)
+                out.write(line)
+                qtd += 1
+        if out is not None:
+            _fecha()
+        os.remove(tmp)
+    return shards
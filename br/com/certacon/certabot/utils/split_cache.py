@@ -0,0 +1,97 @@
+# br/com/certacon/certabot/utils/split_cache.py
+"""
+Cache do resultado do split, por conteúdo: chave = sha256 do TXT + SPLITTER_VERSION + opções
+que mudam a saída. Guarda a árvore de saída (hardlinks, ver blobstore.link) e o dict de
+resultado com os caminhos/job_id trocados por marcadores; num hit a pasta do novo job recebe
+links para os mesmos arquivos e o dict é reescrito para ela, sem reler o TXT.
+
+    UPLOAD_DIR/_split_cache/ab/<chave>/tree/...      (modelo_XX/, rejeitadas.txt, manifest.json)
+    UPLOAD_DIR/_split_cache/ab/<chave>/result.json
+"""
+from __future__ import annotations
+from pathlib import Path
+from typing import Any, Dict, Optional
+import hashlib
+import json
+import os
+import shutil
+import time
+import uuid
+
+from br.com.certacon.certabot.api.core.config import settings
+from br.com.certacon.certabot.utils import blobstore
+from br.com.certacon.certabot.utils.separar_modelos_nfe import SPLITTER_VERSION
+
+DIR_MARK = "{split_dir}"
+JOB_MARK = "{job_id}"
+TMP_MAX_AGE_S = 3600
+
+
+def cache_root() -> Path:
+    return Path(settings.UPLOAD_DIR) / "_split_cache"
+
+
+def cache_key(sha256: str, **opcoes) -> str:
+    raw = json.dumps({"sha256": sha256, "versao": SPLITTER_VERSION, **opcoes}, sort_keys=True)
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def _entry(key: str) -> Path:
+    return cache_root() / key[:2] / key
+
+
+def _link_tree(src: Path, dst: Path) -> None:
+    shutil.copytree(src, dst, copy_function=blobstore.link)
+
+
+def load(key: str, dst: Path, job_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Hit: materializa a saída em `dst` e devolve o dict de resultado já apontando para ela.
+    """
+    entry = _entry(key)
+    try:
+        text = (entry / "result.json").read_text(encoding="utf-8")
+    except FileNotFoundError:
+        return None
+    if dst.exists():
+        shutil.rmtree(dst)
+    _link_tree(entry / "tree", dst)
+    # marcadores trocados dentro das strings JSON (escapadas, p/ caminhos do Windows)
+    text = text.replace(DIR_MARK, json.dumps(dst.as_posix())[1:-1]).replace(JOB_MARK, job_id)
+    return json.loads(text)
+
+
+def _sweep_tmp() -> None:
+    limite = time.time() - TMP_MAX_AGE_S
+    try:
+        velhas = [p for p in cache_root().glob("tmp-*") if p.stat().st_mtime < limite]
+    except OSError:
+        return
+    for p in velhas:
+        shutil.rmtree(p, ignore_errors=True)
+
+
+def store(key: str, src: Path, result: Dict[str, Any], job_id: str) -> None:
+    """
+    Publica a saída de um split. Escreve numa pasta temporária e renomeia: quem lê nunca vê
+    entrada pela metade; se outro worker publicou a mesma chave antes, a nossa é descartada.
+    A temporária sai em qualquer caso (inclusive rename recusado); as de um worker morto no
+    meio são varridas aqui, depois de TMP_MAX_AGE_S.
+    """
+    entry = _entry(key)
+    if entry.exists():
+        return
+    _sweep_tmp()
+    tmp = cache_root() / f"tmp-{uuid.uuid4().hex}"
+    try:
+        _link_tree(src, tmp / "tree")
+        text = json.dumps(result, ensure_ascii=False)
+        text = text.replace(json.dumps(src.as_posix())[1:-1], DIR_MARK).replace(job_id, JOB_MARK)
+        (tmp / "result.json").write_text(text, encoding="utf-8")
+        entry.parent.mkdir(parents=True, exist_ok=True)
+        os.rename(tmp, entry)
+    except OSError:
+        if not entry.exists():
+            raise
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
@@ -1,10 +1,11 @@
 from __future__ import annotations
 from typing import Iterable, Optional
-from pathlib import Path
 from fastapi import HTTPException, UploadFile
 
+from br.com.certacon.certabot.utils.compressao import KEY_EXTENSIONS, key_suffix
+
 def _assert_extension(file: UploadFile, allowed_ext: Iterable[str], field_name: str) -> None:
-    ext = Path(file.filename or "").suffix.lower()
+    ext = key_suffix(file.filename or "")
     allowed = set(allowed_ext)
     if ext not in allowed:
         raise HTTPException(
@@ -12,19 +13,22 @@ def _assert_extension(file: UploadFile, allowed_ext: Iterable[str], field_name:
             detail=f"{field_name}: extensão inválida '{ext}'. Permitidas: {sorted(allowed)}",
         )
 
-def validate_nfe_like(service_name: str, *, chave_txt: UploadFile, pfx_file: UploadFile, pfx_password: Optional[str]) -> None:
-    if not chave_txt:   raise HTTPException(400, detail=f"{service_name}: arquivo .txt (chave_txt) é obrigatório")
+def validate_pfx(service_name: str, *, pfx_file: UploadFile, pfx_password: Optional[str]) -> None:
     if not pfx_file:    raise HTTPException(400, detail=f"{service_name}: certificado .pfx (pfx_file) é obrigatório")
     if not pfx_password:raise HTTPException(400, detail=f"{service_name}: senha do .pfx (pfx_password) é obrigatória")
-    _assert_extension(chave_txt, {".txt"}, "chave_txt")
     _assert_extension(pfx_file, {".pfx"}, "pfx_file")
 
+def validate_nfe_like(service_name: str, *, chave_txt: UploadFile, pfx_file: UploadFile, pfx_password: Optional[str]) -> None:
+    if not chave_txt:   raise HTTPException(400, detail=f"{service_name}: arquivo .txt (chave_txt) é obrigatório")
+    validate_pfx(service_name, pfx_file=pfx_file, pfx_password=pfx_password)
+    _assert_extension(chave_txt, KEY_EXTENSIONS, "chave_txt")
+
 def validate_cfe(*, chave_txt: UploadFile, pfx_file: UploadFile, pfx_password: Optional[str], planilha_csv: UploadFile) -> None:
     if not chave_txt:   raise HTTPException(400, detail="CFE: arquivo .txt (chave_txt) é obrigatório")
     if not pfx_file:    raise HTTPException(400, detail="CFE: certificado .pfx (pfx_file) é obrigatório")
     if not pfx_password:raise HTTPException(400, detail="CFE: senha do .pfx (pfx_password) é obrigatória")
     if not planilha_csv:raise HTTPException(400, detail="CFE: planilha .csv (planilha_csv) é obrigatória")
-    _assert_extension(chave_txt, {".txt"}, "chave_txt")
+    _assert_extension(chave_txt, KEY_EXTENSIONS, "chave_txt")
     _assert_extension(pfx_file, {".pfx"}, "pfx_file")
     _assert_extension(planilha_csv, {".csv"}, "planilha_csv")
 
@@ -4,17 +4,24 @@ from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.orm import Session
 
 from br.com.certacon.certabot.api.core.config import settings
-from br.com.certacon.certabot.db.session import engine, SessionLocal
+from br.com.certacon.certabot.db.session import engine, SessionLocal, async_engine
 from br.com.certacon.certabot.db.base import Base
-from br.com.certacon.certabot.db import crud
-from br.com.certacon.certabot.db.models import User
+from br.com.certacon.certabot.db import crud, rollup
+from br.com.certacon.certabot.db.models import User, ServiceSubmission, SubmissionEvent, FileMovement, LoginLog
+from br.com.certacon.certabot.service import job_runner
 from br.com.certacon.certabot.api.routers import auth as auth_router
 from br.com.certacon.certabot.api.routers.post.NFE.nfe_route import router as nfe_router
 from br.com.certacon.certabot.api.routers.post.NFCE.nfce_route import router as nfce_router
 from br.com.certacon.certabot.api.routers.post.CTE.cte_route import router as cfe_router
 from br.com.certacon.certabot.api.routers.post.CFE.cfe_route import router as cte_router
 from br.com.certacon.certabot.api.routers.get.get_global import router as get_global
+from br.com.certacon.certabot.api.routers.get.jobs import router as jobs_router
+from br.com.certacon.certabot.api.routers.get.submissions import router as submissions_router
+from br.com.certacon.certabot.api.routers.get.audit_export import router as audit_export_router
+from br.com.certacon.certabot.api.routers.get.downloads import router as downloads_router
+from br.com.certacon.certabot.api.routers.get.storage import router as storage_router
 from br.com.certacon.certabot.api.routers.post.SENATRAN.senatran_route import router as senatran_router
+from br.com.certacon.certabot.api.routers.uploads import router as uploads_router
 
 tags_metadata = [
     {
@@ -72,10 +79,28 @@ def seed_users():
     finally:
         db.close()
 
+def ensure_indexes():
+    # create_all não cria índices novos em tabelas que já existem
+    for model in (ServiceSubmission, SubmissionEvent, FileMovement, LoginLog):
+        for ix in model.__table__.indexes:
+            ix.create(bind=engine, checkfirst=True)
+
 @app.on_event("startup")
 def on_startup():
     Base.metadata.create_all(bind=engine)
+    ensure_indexes()
     seed_users()
+    db: Session = SessionLocal()
+    try:
+        rollup.ensure(db)
+    finally:
+        db.close()
+    job_runner.start()
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    job_runner.shutdown()
+    await async_engine.dispose()
 
 app.include_router(auth_router.router)
 app.include_router(nfe_router,      prefix="/mvp/nfe")
@@ -83,7 +108,13 @@ app.include_router(nfce_router,     prefix="/mvp/nfce")
 app.include_router(cfe_router,      prefix="/mvp/cfe")
 app.include_router(cte_router,      prefix="/mvp/cte")
 app.include_router(senatran_router, prefix="/mvp/senatran")
+app.include_router(uploads_router,  prefix="/mvp/uploads")
 app.include_router(get_global, prefix="/mvp/metrics")
+app.include_router(jobs_router, prefix="/mvp/jobs")
+app.include_router(submissions_router, prefix="/mvp/submissions")
+app.include_router(audit_export_router, prefix="/mvp/audit")
+app.include_router(downloads_router, prefix="/nfe-55-65")
+app.include_router(storage_router, prefix="/mvp/storage")
 
 @app.get("/health", tags=["health"], summary="Verifica se o serviço está de pé", description="Retorna informações básicas de saúde da API.")
 def health():